@@ -0,0 +1,205 @@
+"""
+Per-file artifact store — in-process, LRU-bounded.
+
+Why this exists:
+  Some structures derived from an uploaded file (filter indexes, row
+  partitions, tokenized columns, …) are expensive to build. They hold numpy
+  arrays, so they can't go through the JSON cache in app.core.cache — they
+  live in this process instead, grouped by file_id so every artifact of a
+  file can be dropped together.
+
+  A file only changes by rows appended to it (POST /files/{id}/append):
+  artifacts record how many rows they cover and are extended in place with
+  the new ones, under their own lock. When an append changes a column's
+  type, extending is no longer valid: the file's metadata gets a new
+  "schema" number and every worker drops the file's artifacts when it
+  next loads the file (app.services.frames.load_frame).
+
+  Only the most recently used files are kept: the least recently used file
+  loses all its artifacts when there are more than ARTIFACT_CACHE_MAX_FILES
+  files or their artifacts pass ARTIFACT_CACHE_MAX_MB. Sizes are estimates
+  (arrays exactly, Python objects from a sample), taken when an artifact is
+  stored and again once it has grown. Admission control
+  (app.core.memory.admit) also releases the least recently used files when
+  the worker is over its memory budget.
+
+Usage:
+  from app.core.artifacts import artifact_get_or_build, artifact_drop
+
+  index = artifact_get_or_build("abc123", "filter_index", lambda: build(df))
+  artifact_drop("abc123")   # e.g. when the file's content changes
+  artifact_release(50 * 2**20)   # free ~50 MB of other files' artifacts
+"""
+
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.lazy import lazy_import
+from app.core.metrics import describe, inc
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# file_id → {artifact name → value}, most recently used file last
+_files: "OrderedDict[str, dict]" = OrderedDict()
+# file_id → {artifact name → (version, estimated bytes)}
+_sizes: Dict[str, Dict[Hashable, Tuple[tuple, int]]] = {}
+_lock = threading.RLock()
+
+# Items of a container measured to estimate the rest, by nesting depth
+_SAMPLE_ITEMS = (64, 8, 2)
+
+
+def _max_files() -> int:
+    from app.core.config import settings
+    return max(1, settings.ARTIFACT_CACHE_MAX_FILES)
+
+
+def _max_bytes() -> int:
+    from app.core.config import settings
+    return max(0, settings.ARTIFACT_CACHE_MAX_MB) * 2 ** 20
+
+
+# ── Sizes ─────────────────────────────────────────────────────────────────────
+
+def _footprint(value: Any, depth: int = 0) -> int:
+    """Estimated bytes held by *value*: arrays exactly, containers from a sample."""
+    if isinstance(value, pd.DataFrame):
+        from app.core.memory import tracked_footprint
+        return tracked_footprint(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float)) or value is None or depth >= len(_SAMPLE_ITEMS):
+        return size
+    if isinstance(value, (list, tuple)):
+        items = value[:: max(1, len(value) // _SAMPLE_ITEMS[depth])]
+    elif isinstance(value, dict):
+        items = [i for item in islice(value.items(), _SAMPLE_ITEMS[depth]) for i in item]
+        return size + _scaled(items, len(value) * 2, depth)
+    elif isinstance(value, (set, frozenset)):
+        items = list(islice(value, _SAMPLE_ITEMS[depth]))
+    elif hasattr(value, "__dict__"):
+        # Every attribute: one of them is usually most of the object
+        return size + sum(_footprint(v, depth) for v in vars(value).values())
+    else:
+        return size
+    return size + _scaled(items, len(value), depth)
+
+
+def _scaled(items: list, total: int, depth: int) -> int:
+    if not items:
+        return 0
+    return int(sum(_footprint(item, depth + 1) for item in items) * total / len(items))
+
+
+def _version(value: Any) -> tuple:
+    """Changes when *value* is replaced or grows (rows appended, lazy parts built)."""
+    attrs = vars(value).values() if hasattr(value, "__dict__") and not isinstance(value, pd.DataFrame) else ()
+    return (id(value),) + tuple(
+        v if isinstance(v, int) else len(v) if hasattr(v, "__len__") else None for v in attrs
+    )
+
+
+def _file_bytes(file_id: str) -> int:
+    """Estimated bytes of *file_id*'s artifacts, measuring the new or grown ones (lock held)."""
+    sizes = _sizes.setdefault(file_id, {})
+    total = 0
+    for name, value in _files[file_id].items():
+        try:
+            version = _version(value)
+            known = sizes.get(name)
+            if known is None or known[0] != version:
+                known = sizes[name] = (version, _footprint(value))
+        except (RuntimeError, TypeError):  # changed while measured: keep the last size
+            known = sizes.get(name, ((), 0))
+        total += known[1]
+    return total
+
+
+def _evict(file_id: str, reason: str) -> None:
+    del _files[file_id]
+    _sizes.pop(file_id, None)
+    inc("evalplatform_artifact_evictions_total", reason=reason)
+    logger.info("Artifacts evicted for file %s (%s)", file_id, reason)
+
+
+def artifact_bytes() -> int:
+    """Estimated bytes held by every file's artifacts."""
+    with _lock:
+        return sum(_file_bytes(file_id) for file_id in list(_files))
+
+
+def artifact_release(nbytes: int) -> int:
+    """
+    Drop the artifacts of the least recently used files — never the most
+    recently used one — until about *nbytes* are freed. Returns the
+    estimated bytes released.
+    """
+    released = 0
+    with _lock:
+        while released < nbytes and len(_files) > 1:
+            file_id = next(iter(_files))
+            released += _file_bytes(file_id)
+            _evict(file_id, "memory")
+    return released
+
+
+def artifact_get(file_id: str, name: Hashable) -> Any:
+    """Return the artifact *name* of *file_id*, or None if it isn't built."""
+    with _lock:
+        artifacts = _files.get(file_id)
+        if artifacts is None:
+            return None
+        _files.move_to_end(file_id)
+        return artifacts.get(name)
+
+
+def artifact_set(file_id: str, name: Hashable, value: Any) -> None:
+    """Store *value* as the artifact *name* of *file_id*."""
+    with _lock:
+        artifacts = _files.setdefault(file_id, {})
+        artifacts[name] = value
+        _files.move_to_end(file_id)
+        while len(_files) > _max_files():
+            _evict(next(iter(_files)), "files")
+        limit = _max_bytes()
+        if limit:
+            total = artifact_bytes()
+            while total > limit and len(_files) > 1:
+                evicted = next(iter(_files))
+                total -= _file_bytes(evicted)
+                _evict(evicted, "bytes")
+
+
+def artifact_get_or_build(file_id: str, name: Hashable, builder: Callable[[], Any]) -> Any:
+    """
+    Return the artifact *name* of *file_id*, building it with *builder* on a
+    miss. The builder runs outside the lock; if two threads race, both build
+    and the last one wins — artifacts are deterministic so either is correct.
+    """
+    value = artifact_get(file_id, name)
+    if value is None:
+        value = builder()
+        artifact_set(file_id, name, value)
+    return value
+
+
+def artifact_drop(file_id: str, name: Optional[Hashable] = None) -> None:
+    """Forget the artifact *name* of *file_id*, or every artifact of it."""
+    with _lock:
+        if name is not None:
+            _files.get(file_id, {}).pop(name, None)
+            _sizes.get(file_id, {}).pop(name, None)
+            return
+        _files.pop(file_id, None)
+        _sizes.pop(file_id, None)
+
+
+describe("evalplatform_artifact_evictions_total", "Files whose artifacts were dropped, by reason (files / bytes / memory).")
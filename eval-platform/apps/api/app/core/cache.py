@@ -11,24 +11,38 @@ Why this exists:
   automatically falls back to an in-memory dict with TTL support so the code
   works identically — just not shared across workers.
 
+  cache_lock() is a short-lived mutual-exclusion lock on top of the same
+  backend (SET NX in Redis), so one worker can claim a piece of work the
+  others would otherwise duplicate. In-memory it only spans this process.
+
 Usage:
   from app.core.cache import cache_set, cache_get, cache_delete, cache_health
 
   cache_set("file:abc123", {"filepath": "...", "rows": 70000}, ttl=7200)
   meta = cache_get("file:abc123")   # → dict or None
   cache_delete("file:abc123")
+
+  token = cache_lock("lock:report", ttl=60)   # → token, or None if held
+  if token:
+      try: ...
+      finally: cache_unlock("lock:report", token)
 """
 
 import json
 import logging
+import threading
 import time
+import uuid
 from typing import Any, Optional
 
+from app.core.metrics import inc, span
+
 logger = logging.getLogger(__name__)
 
 # ── In-memory fallback store ──────────────────────────────────────────────────
 _store: dict = {}
 _expiry: dict = {}
+_locks_lock = threading.Lock()
 
 # ── Redis connection state ─────────────────────────────────────────────────────
 _redis_client = None
@@ -75,10 +89,20 @@ def _get_redis():
         return None
 
 
+def _namespace(key: str) -> str:
+    """"file:abc123" → "file" (metric label; keeps key ids out of metrics)."""
+    return key.split(":", 1)[0]
+
+
 # ── Public API ────────────────────────────────────────────────────────────────
 
 def cache_set(key: str, value: Any, ttl: int = 3600) -> None:
     """Store *value* under *key* with a time-to-live in seconds."""
+    with span("cache"):
+        _cache_set(key, value, ttl)
+
+
+def _cache_set(key: str, value: Any, ttl: int) -> None:
     r = _get_redis()
     if r:
         try:
@@ -94,6 +118,17 @@ def cache_set(key: str, value: Any, ttl: int = 3600) -> None:
 
 def cache_get(key: str) -> Optional[Any]:
     """Return the cached value for *key*, or None if missing / expired."""
+    with span("cache"):
+        value = _cache_get(key)
+    inc(
+        "evalplatform_cache_requests_total",
+        namespace=_namespace(key),
+        result="miss" if value is None else "hit",
+    )
+    return value
+
+
+def _cache_get(key: str) -> Optional[Any]:
     r = _get_redis()
     if r:
         try:
@@ -124,6 +159,59 @@ def cache_delete(key: str) -> None:
     _expiry.pop(key, None)
 
 
+def cache_shared() -> bool:
+    """True when the cache is shared between workers (Redis), not per process."""
+    return _get_redis() is not None
+
+
+# Delete the lock only if it still holds our token (it may have expired and
+# been taken by another worker meanwhile)
+_UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def cache_lock(key: str, ttl: int = 60) -> Optional[str]:
+    """
+    Take the lock *key* for at most *ttl* seconds. Returns a token to pass
+    to cache_unlock(), or None if someone else holds the lock.
+    """
+    token = uuid.uuid4().hex
+    r = _get_redis()
+    if r:
+        try:
+            return token if r.set(key, token, nx=True, ex=ttl) else None
+        except Exception as exc:
+            logger.warning("Redis lock failed (%s) — falling back to memory", exc)
+
+    # In-memory fallback
+    with _locks_lock:
+        if _cache_get(key) is not None:
+            return None
+        _store[key] = token
+        _expiry[key] = time.time() + ttl
+    return token
+
+
+def cache_unlock(key: str, token: str) -> None:
+    """Release the lock *key* taken with *token* (no-op if it expired meanwhile)."""
+    r = _get_redis()
+    if r:
+        try:
+            r.eval(_UNLOCK_SCRIPT, 1, key, token)
+            return
+        except Exception as exc:
+            logger.warning("Redis unlock failed (%s) — falling back to memory", exc)
+
+    with _locks_lock:
+        if _store.get(key) == token:
+            _store.pop(key, None)
+            _expiry.pop(key, None)
+
+
 def cache_health() -> dict:
     """Return a dict describing the current cache backend and its status."""
     r = _get_redis()
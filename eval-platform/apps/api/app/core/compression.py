@@ -0,0 +1,179 @@
+"""
+Content-negotiated response compression — brotli or gzip.
+
+Why this exists:
+  A 40-department, 20-question /multi-analyze result is several MB of JSON;
+  it compresses ~10x. CompressionMiddleware picks the best encoding the
+  client accepts (brotli when the `brotli` package is installed, else gzip),
+  compresses whole bodies in one go and streamed bodies chunk by chunk, and
+  leaves small or already-encoded responses alone.
+
+  A strong ETag names one exact byte sequence, so a compressed response's
+  ETag gets the encoding appended ("abc" → "abc-br"); plain_etag() undoes
+  that when a client revalidates.
+"""
+
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency — gzip only
+    brotli = None
+
+MIN_SIZE = 1024  # smaller bodies aren't worth the CPU
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+BROTLI_QUALITY = 5  # dynamic content: far cheaper than 11 for ~the same ratio
+GZIP_LEVEL = 6
+
+
+def _accepted(header: str) -> List[str]:
+    """Encodings with q > 0 from an Accept-Encoding header."""
+    accepted = []
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.append(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._finish = self._obj.process, self._obj.finish
+        else:
+            # wbits=31 → gzip container
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._compress, self._finish = self._obj.compress, self._obj.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def plain_etag(etag: str) -> str:
+    """The ETag of the uncompressed response, given that of any encoding."""
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def _encoded_etag(headers: List[Tuple[bytes, bytes]], encoding: str) -> List[Tuple[bytes, bytes]]:
+    """*headers* with a strong ETag suffixed with *encoding* (one tag per encoding)."""
+    return [
+        (key, value[:-1] + f'-{encoding}"'.encode())
+        if key.lower() == b"etag" and value.startswith(b'"') else (key, value)
+        for key, value in headers
+    ]
+
+
+def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str) -> List[Tuple[bytes, bytes]]:
+    """Response headers once the body is compressed with *encoding*."""
+    out = [(k, v) for k, v in _encoded_etag(headers, encoding) if k.lower() != b"content-length"]
+    out.append((b"content-encoding", encoding.encode()))
+    out.append((b"vary", b"Accept-Encoding"))
+    return out
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON / text responses per Accept-Encoding."""
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if message.get("status") == 304:
+                    # Revalidation: same ETag as the compressed 200 it stands for
+                    await send({**message, "headers": _encoded_etag(headers, encoding)})
+                    passthrough = True
+                    return
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if _header(headers, b"content-encoding") or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # held until we see the body
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    # Small single-chunk body: send unchanged
+                    await send(start_message)
+                    start_message = None
+                    passthrough = True
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers = _encoded_headers(start_message.get("headers", []), encoding)
+                if not more_body:
+                    payload = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(payload)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": payload})
+                    return
+                await send({**start_message, "headers": headers})
+                start_message = None
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
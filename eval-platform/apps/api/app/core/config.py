@@ -24,6 +24,44 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE_MB: int = 100
     UPLOAD_DIR: str = "./uploads"
 
+    # Excel reader: "auto" (calamine if installed, else openpyxl streaming),
+    # "calamine", "stream" or "pandas" (plain pd.read_excel); any engine
+    # falls back to pd.read_excel if it fails on a file
+    EXCEL_ENGINE: str = "auto"
+    # CSV reader: "auto" (pyarrow's multithreaded reader if installed, else
+    # pandas), "arrow" or "c"; encoding and delimiter are sniffed either way
+    CSV_ENGINE: str = "auto"
+
+    # Startup: import pandas / openpyxl and connect Redis / S3 in the
+    # background right after boot instead of on the first request
+    PRELOAD_ON_STARTUP: bool = True
+
+    # Thread pools per workload (app.core.executors): threads, and how many
+    # tasks may wait for one before requests get 503 / 429 + Retry-After
+    EXECUTOR_CPU_WORKERS: int = 2
+    EXECUTOR_CPU_MAX_QUEUE: int = 8
+    EXECUTOR_IO_WORKERS: int = 8
+    EXECUTOR_IO_MAX_QUEUE: int = 32
+    EXECUTOR_LLM_WORKERS: int = 4
+    EXECUTOR_LLM_MAX_QUEUE: int = 4
+    # Worker processes for batch jobs (per-evaluee reports); 0 runs them in
+    # the cpu thread pool instead
+    EXECUTOR_PROCESS_WORKERS: int = 2
+    # Per-evaluee report jobs running at once in a worker (more get 429)
+    REPORT_MAX_JOBS: int = 2
+
+    # Identical concurrent /analyze and /multi-analyze requests share one
+    # computation (app.core.singleflight). Across workers: the longest a
+    # worker holds the lock on a computation, and how long its result stays
+    # in the cache for the others
+    SINGLE_FLIGHT_LOCK_SECONDS: int = 300
+    SINGLE_FLIGHT_RESULT_SECONDS: int = 60
+
+    # Most rows of an XLSX export (/export/responses): the workbook is built
+    # whole before its first byte is sent, so this keeps that within the
+    # proxy's read timeout. Larger selections go to CSV or Parquet
+    EXPORT_XLSX_MAX_ROWS: int = 200_000
+
     # Cache
     # Redis URL — leave empty to use the in-memory fallback (fine for local dev)
     REDIS_URL: str = ""
@@ -31,6 +69,48 @@ class Settings(BaseSettings):
     CACHE_TTL_FILES: int = 86400
     # How long analysis results stay in cache (12 hours)
     CACHE_TTL_ANALYSIS: int = 43200
+    # How long browsers / the proxy reuse a GET /analyses/{id} result before
+    # revalidating it with If-None-Match (seconds)
+    ANALYSIS_MAX_AGE: int = 60
+    # How many files keep their in-process artifacts (filter indexes, …)
+    ARTIFACT_CACHE_MAX_FILES: int = 8
+    # …and how much they may hold in all (estimated MB); the least recently
+    # used files are dropped past it (0 = bounded by file count only)
+    ARTIFACT_CACHE_MAX_MB: int = 256
+    # Distinct response strings whose text analysis (tokens, sentiment,
+    # suggestion flag) and name matches are kept across requests, per kind;
+    # least recently used first out (0 = no memo)
+    TEXT_MEMO_SIZE: int = 50000
+
+    # Memory guardrails (app.core.memory): the resident memory one worker
+    # may reach, in MB. /analyze and /multi-analyze whose estimated working
+    # memory would pass it run with approximate_ngrams or get 503. Size it
+    # as the container limit / WEB_CONCURRENCY minus headroom; 0 = measure
+    # only, never refuse
+    MEMORY_BUDGET_MB: int = 0
+
+    # Approximate n-gram counting (requests with approximate_ngrams=true):
+    # most distinct bigrams / trigrams tracked per counter (~150 bytes each)
+    NGRAM_SKETCH_CAPACITY: int = 20000
+    # Requests with collapse_near_duplicates=true: estimated Jaccard
+    # similarity (of character 3-grams) from which two responses count as
+    # near-duplicates
+    NEAR_DUPLICATE_THRESHOLD: float = 0.75
+
+    # Build indexes / tokenized text of likely columns in the background
+    # right after upload, so the first analysis is served warm
+    WARMUP_AFTER_UPLOAD: bool = True
+    # Most free-text columns tokenized by the warmup
+    WARMUP_MAX_TEXT_COLUMNS: int = 2
+
+    # Multi-worker mode (WEB_CONCURRENCY > 1, needs REDIS_URL): publish parsed
+    # files as memory-mapped Arrow files every worker attaches to instead of
+    # re-parsing them (needs pyarrow)
+    SHARED_FRAMES: bool = False
+    # Where the shared files go — empty: <UPLOAD_DIR>/shared
+    SHARED_FRAMES_DIR: str = ""
+    # How often each worker releases / deletes segments of expired files
+    SHARED_FRAMES_SWEEP_SECONDS: int = 300
 
     # AWS / S3 file storage
     # Leave all empty to use local disk (default for dev and single-server deploy)
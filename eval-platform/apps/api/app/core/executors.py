@@ -0,0 +1,261 @@
+"""
+Bounded thread pools for blocking work, per workload, with admission control.
+
+Why this exists:
+  Routes push pandas parsing, the analyzers, S3 transfers and LLM calls off
+  the event loop. They used to share asyncio's default thread pool, so a
+  burst of 300-second AI summaries could take every thread and starve
+  /analyze, and nothing limited how many heavy analyses ran (and held
+  memory) at once. Each workload class now has its own size-limited pool:
+
+    cpu   parsing, analyses, index / feature building   (few threads: GIL + memory)
+    io    S3 / disk transfers, stored aggregates, shared frames
+    llm   AI summary calls                               (slow, mostly waiting)
+
+  A pool also bounds its queue: once EXECUTOR_<POOL>_MAX_QUEUE tasks are
+  already waiting for a thread, run_blocking() raises PoolSaturated — an
+  HTTPException (503, or 429 for llm) with a Retry-After estimated from the
+  pool's recent task durations — instead of queueing work the client would
+  time out on anyway.
+
+  run_blocking() also copies the caller's context, so spans opened inside
+  the worker thread still land in the request's Server-Timing header, and
+  keeps per-pool gauges (queued / running tasks, utilization) for /metrics.
+
+  Long batch jobs whose work is pure Python (the per-evaluee reports) use
+  run_in_process() instead: EXECUTOR_PROCESS_WORKERS worker processes, so
+  they run in parallel past the GIL without holding the cpu pool's threads.
+  Their function and arguments must be picklable.
+
+Usage:
+  from app.core.executors import run_blocking
+
+  df = await run_blocking(read_table, filepath)                  # cpu pool
+  await run_blocking(ensure_local, path, file_id, pool="io")
+  summary = await run_blocking(generate_general_summary, ..., pool="llm")
+  results = await run_in_process(analyze_evaluees, batch)
+"""
+
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.core.metrics import describe, gauge_labels, inc, observe, register_gauge
+
+# Status answered when a pool's queue is full, and its message
+_REJECTION = {
+    "cpu": (503, "El servidor está ocupado con otros análisis. Intenta de nuevo en unos segundos."),
+    "io": (503, "El servidor está ocupado. Intenta de nuevo en unos segundos."),
+    "llm": (429, "Hay demasiados resúmenes con IA en curso. Intenta de nuevo en unos segundos."),
+}
+# Typical task duration (seconds) before a pool has measured its own
+_INITIAL_TASK_SECONDS = {"cpu": 2.0, "io": 1.0, "llm": 30.0}
+# Weight of the newest task in the running average duration
+_EWMA_ALPHA = 0.2
+
+
+class PoolSaturated(HTTPException):
+    """A pool's queue is full: the request is turned away, to retry later."""
+
+    def __init__(self, pool: str, retry_after: int):
+        status, message = _REJECTION[pool]
+        super().__init__(status, message, headers={"Retry-After": str(retry_after)})
+        self.pool = pool
+
+
+class _Pool:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.queued = 0
+        self.running = 0
+        self.avg_seconds = _INITIAL_TASK_SECONDS[name]
+        self.lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self.lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix=f"evalplatform-{self.name}"
+                    )
+        return self._executor
+
+    def admit(self) -> None:
+        """Count a new task as queued, or raise PoolSaturated if the queue is full."""
+        with self.lock:
+            if self.queued >= self.max_queue:
+                # Time for the tasks ahead to drain through the pool's threads
+                waves = (self.queued + self.running) / self.workers
+                retry_after = min(300, max(1, math.ceil(self.avg_seconds * waves)))
+            else:
+                self.queued += 1
+                return
+        inc("evalplatform_executor_rejected_total", pool=self.name)
+        raise PoolSaturated(self.name, retry_after)
+
+    def adjust(self, queued: int = 0, running: int = 0) -> None:
+        with self.lock:
+            self.queued += queued
+            self.running += running
+
+    def finished(self, seconds: float) -> None:
+        with self.lock:
+            self.running -= 1
+            self.avg_seconds += _EWMA_ALPHA * (seconds - self.avg_seconds)
+
+
+_pools: Dict[str, _Pool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool(name: str) -> _Pool:
+    pool = _pools.get(name)
+    if pool is None:
+        from app.core.config import settings
+        sizes = {
+            "cpu": (settings.EXECUTOR_CPU_WORKERS, settings.EXECUTOR_CPU_MAX_QUEUE),
+            "io": (settings.EXECUTOR_IO_WORKERS, settings.EXECUTOR_IO_MAX_QUEUE),
+            "llm": (settings.EXECUTOR_LLM_WORKERS, settings.EXECUTOR_LLM_MAX_QUEUE),
+        }
+        if name not in sizes:
+            raise ValueError(f"unknown executor pool {name!r}")
+        with _pools_lock:
+            pool = _pools.setdefault(name, _Pool(name, *sizes[name]))
+    return pool
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, pool: str = "cpu", **kwargs: Any) -> Any:
+    """
+    Run ``func(*args, **kwargs)`` in the *pool* thread pool and await it.
+    Raises PoolSaturated when the pool's queue is full.
+    """
+    target = _pool(pool)
+    target.admit()
+    ctx = contextvars.copy_context()
+    submitted = time.perf_counter()
+    state = {"started": False, "abandoned": False}
+    state_lock = threading.Lock()
+
+    def call() -> Any:
+        with state_lock:
+            if state["abandoned"]:
+                return None
+            state["started"] = True
+        target.adjust(queued=-1, running=1)
+        started = time.perf_counter()
+        observe("evalplatform_executor_wait_seconds", started - submitted, pool=pool)
+        try:
+            return ctx.run(partial(func, *args, **kwargs))
+        finally:
+            target.finished(time.perf_counter() - started)
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(target.executor, call)
+    except asyncio.CancelledError:
+        # Client went away before a thread picked the task up: drop it
+        with state_lock:
+            if not state["started"]:
+                state["abandoned"] = True
+                target.adjust(queued=-1)
+        raise
+
+
+# ── Worker processes ──────────────────────────────────────────────────────────
+
+_processes: Optional[ProcessPoolExecutor] = None
+_processes_lock = threading.Lock()
+
+
+def _process_pool() -> Optional[ProcessPoolExecutor]:
+    """The worker processes, started on first use (None when disabled)."""
+    global _processes
+    if _processes is None:
+        from app.core.config import settings
+        if settings.EXECUTOR_PROCESS_WORKERS <= 0:
+            return None
+        with _processes_lock:
+            if _processes is None:
+                # spawn: forking a process that runs threads (pools, Redis,
+                # the event loop) can copy a lock mid-use into the child
+                _processes = ProcessPoolExecutor(
+                    settings.EXECUTOR_PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _processes
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run ``func(*args)`` in a worker process and await it — or in the cpu
+    thread pool when EXECUTOR_PROCESS_WORKERS is 0.
+    """
+    global _processes
+    executor = _process_pool()
+    if executor is None:
+        return await run_blocking(func, *args)
+    loop = asyncio.get_running_loop()
+    inc("evalplatform_process_tasks_total")
+    try:
+        return await loop.run_in_executor(executor, partial(func, *args))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): start fresh ones next time
+        with _processes_lock:
+            if _processes is executor:
+                _processes = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+
+def shutdown_processes() -> None:
+    """Stop the worker processes (at application shutdown)."""
+    global _processes
+    with _processes_lock:
+        executor, _processes = _processes, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _depth() -> Dict:
+    series = {}
+    for name, pool in list(_pools.items()):
+        with pool.lock:
+            series[gauge_labels(pool=name, state="queued")] = pool.queued
+            series[gauge_labels(pool=name, state="running")] = pool.running
+    return series
+
+
+def _utilization() -> Dict:
+    series = {}
+    for name, pool in list(_pools.items()):
+        with pool.lock:
+            series[gauge_labels(pool=name)] = pool.running / pool.workers
+    return series
+
+
+def _workers() -> Dict:
+    return {gauge_labels(pool=name): pool.workers for name, pool in list(_pools.items())}
+
+
+register_gauge("evalplatform_executor_tasks", _depth)
+register_gauge("evalplatform_executor_utilization", _utilization)
+register_gauge("evalplatform_executor_workers", _workers)
+describe("evalplatform_executor_tasks", "Thread-pool tasks waiting for a thread (queued) or running, per pool.")
+describe("evalplatform_executor_utilization", "Share of each pool's threads busy (running / workers).")
+describe("evalplatform_executor_workers", "Threads per pool.")
+describe("evalplatform_executor_wait_seconds", "Time tasks spent queued before a thread picked them up, per pool.")
+describe("evalplatform_executor_rejected_total", "Tasks turned away because their pool's queue was full.")
+describe("evalplatform_process_tasks_total", "Tasks sent to the worker processes.")
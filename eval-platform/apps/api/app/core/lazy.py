@@ -0,0 +1,60 @@
+"""
+Deferred imports of heavy libraries.
+
+Why this exists:
+  pandas + numpy take about half of the API's import time, and every router
+  imported them at module level — so a sleeping container (Render free tier)
+  couldn't answer anything, not even /health, before they were loaded.
+  Modules now bind them with lazy_import(): the name is a stand-in module
+  that performs the real import on first attribute access and then behaves
+  exactly like the real module. The startup preload (app.core.startup)
+  touches them in the background right after the server starts, so
+  normally no request pays for it.
+
+  Every deferred import holds import_lock. importlib's per-module locks
+  aren't enough: when two threads import pandas' C extensions at once
+  (the preload and the first upload), importlib breaks the apparent
+  deadlock by handing one of them a partially initialised module, and the
+  upload fails or the worker crashes. Import statements inside functions
+  that may be the first to load a heavy library take the lock too.
+
+  Modules using a lazy name in annotations need
+  ``from __future__ import annotations`` so defining a function doesn't
+  trigger the import.
+
+Usage:
+  from app.core.lazy import lazy_import
+
+  pd = lazy_import("pandas")
+  df = pd.read_csv(path)      # pandas is imported here, once
+
+  with import_lock:
+      import pyarrow.csv as pacsv
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+# Held by every deferred import of a heavy library (reentrant: importing
+# one may trigger another)
+import_lock = threading.RLock()
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # Only reached for attributes not copied in yet, i.e. before the
+        # first load (and for names the real module doesn't have)
+        with import_lock:
+            module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """The module *name*, imported on first use (or right away if already loaded)."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return _LazyModule(name)
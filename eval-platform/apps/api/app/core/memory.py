@@ -0,0 +1,316 @@
+"""
+Memory accounting and admission control for one API worker.
+
+Why this exists:
+  In production the API container has a hard memory limit (1500M in
+  docker-compose.prod.yml) shared by its uvicorn workers. One large
+  /multi-analyze with group_by could push a worker past it; the kernel
+  then kills the worker and every in-flight request and in-process cache
+  (parsed frames, tokenized columns) is lost with it. This module keeps
+  the numbers that prevent that:
+
+    * frame footprints — each parsed DataFrame's size (memory_usage, deep
+      on a sample of rows) is estimated when it's loaded; the live frames'
+      total is a gauge
+    * per-analysis peaks — while analyses run, one shared thread samples
+      the process's resident memory (RSS); each analysis gets its starting
+      RSS, its peak and its growth (a histogram per route, and
+      `config.memory` in the response)
+    * admission — before allocating anything, a route estimates what the
+      analysis will need and enters admit(): when the current RSS, plus
+      what the running analyses are still expected to allocate, plus this
+      estimate would pass MEMORY_BUDGET_MB, the artifacts of the least
+      recently used files are released first (app.core.artifacts) and freed
+      heap handed back; if it still doesn't fit, the analysis runs in its
+      bounded-memory mode instead (downgraded) or, if even that doesn't
+      fit, is turned away with 503
+
+  Estimates are coarse on purpose (bytes per row measured on evaluation
+  files): the point is to stay clear of the limit, not to predict usage.
+
+Usage:
+  from app.core.memory import admit, track_frame
+
+  track_frame(df)                                           # on load
+  with admit("multi-analyze", estimate, fallback=bounded) as usage:
+      approximate = usage.downgraded
+      ...
+  result["config"]["memory"] = usage.report()
+"""
+
+import ctypes
+import functools
+import gc
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Set
+
+from fastapi import HTTPException
+
+from app.core.metrics import describe, gauge_labels, inc, observe, register_gauge, set_buckets
+
+MB = 2 ** 20
+# Rows of a frame whose Python objects are measured to estimate the rest
+FOOTPRINT_SAMPLE_ROWS = 2000
+# Seconds between RSS samples while analyses run
+SAMPLE_INTERVAL = 0.05
+# After an analysis that grew RSS by this much, freed heap is handed back
+TRIM_AFTER_BYTES = 64 * MB
+# Retry-After (seconds) when other analyses hold the memory
+_RETRY_AFTER = 10
+
+
+# ── Resident memory ───────────────────────────────────────────────────────────
+
+def rss() -> int:
+    """Resident memory of this process in bytes (0 if it can't be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, not current
+    except ImportError:
+        return 0
+
+
+class PeakRss:
+    """Peak resident memory while the block runs, sampled every *interval* s."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss())
+
+    def __enter__(self) -> "PeakRss":
+        self.start = self.peak = rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss())
+
+
+@functools.lru_cache(maxsize=1)
+def _libc():
+    try:
+        return ctypes.CDLL("libc.so.6")
+    except OSError:
+        return None
+
+
+def _trim() -> None:
+    """Hand freed heap pages back to the OS (glibc only), so RSS reflects what's in use."""
+    libc = _libc()
+    if libc is not None and hasattr(libc, "malloc_trim"):
+        libc.malloc_trim(0)
+
+
+# ── Frame footprints ──────────────────────────────────────────────────────────
+
+# id(frame) → estimated bytes, for the frames still alive
+_frames: Dict[int, int] = {}
+_frames_lock = threading.Lock()
+
+
+def frame_footprint(df) -> int:
+    """
+    Estimated bytes held by *df*: its arrays exactly, plus the Python
+    objects of its object / string columns extrapolated from a sample.
+    """
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    if len(df):
+        sample = df.iloc[:: max(1, len(df) // FOOTPRINT_SAMPLE_ROWS)]
+        objects = sample.memory_usage(index=False, deep=True) - sample.memory_usage(index=False, deep=False)
+        total += int(objects.sum() * len(df) / len(sample))
+    return total
+
+
+def _forget_frame(key: int) -> None:
+    with _frames_lock:
+        _frames.pop(key, None)
+
+
+def tracked_footprint(df) -> int:
+    """*df*'s footprint as recorded when it was loaded (estimated now if it wasn't)."""
+    with _frames_lock:
+        footprint = _frames.get(id(df))
+    return footprint if footprint is not None else track_frame(df)
+
+
+def track_frame(df) -> int:
+    """Count *df*'s footprint in the frames gauge until it's garbage-collected; returns it."""
+    footprint = frame_footprint(df)
+    key = id(df)
+    with _frames_lock:
+        if key not in _frames:
+            weakref.finalize(df, _forget_frame, key)
+        _frames[key] = footprint
+    return footprint
+
+
+# ── Admission and per-analysis usage ──────────────────────────────────────────
+
+class MemoryBudgetExceeded(HTTPException):
+    """An analysis wouldn't fit in MEMORY_BUDGET_MB: it's turned away before allocating."""
+
+    def __init__(self, busy: bool):
+        if busy:
+            super().__init__(
+                503,
+                "El servidor no tiene memoria libre para este análisis ahora. "
+                "Intenta de nuevo en unos segundos.",
+                headers={"Retry-After": str(_RETRY_AFTER)},
+            )
+        else:
+            super().__init__(
+                503,
+                "Este análisis necesita más memoria de la disponible. "
+                "Aplica filtros o analiza menos preguntas a la vez.",
+            )
+
+
+class Usage:
+    """Memory of one admitted analysis: its estimate, mode and sampled RSS."""
+
+    def __init__(self, route: str, estimate: int, downgraded: bool, budget: int):
+        self.route = route
+        self.estimate = estimate
+        self.downgraded = downgraded
+        self.budget = budget
+        self.start = self.peak = rss()
+
+    @property
+    def growth(self) -> int:
+        return max(0, self.peak - self.start)
+
+    def outstanding(self) -> int:
+        """What the analysis is still expected to allocate."""
+        return max(0, self.estimate - self.growth)
+
+    def report(self) -> dict:
+        return {
+            "budget_mb": round(self.budget / MB) if self.budget else None,
+            "estimate_mb": round(self.estimate / MB, 1),
+            "downgraded": self.downgraded,
+            "rss_start_mb": round(self.start / MB, 1),
+            "peak_rss_mb": round(self.peak / MB, 1),
+            "rss_growth_mb": round(self.growth / MB, 1),
+        }
+
+
+_active: Set[Usage] = set()
+_lock = threading.Lock()
+_sampler: Optional[threading.Thread] = None
+
+
+def _sample() -> None:
+    """Raise every running analysis's peak to the current RSS, until none is left."""
+    global _sampler
+    while True:
+        with _lock:
+            if not _active:
+                _sampler = None
+                return
+            running = list(_active)
+        current = rss()
+        for usage in running:
+            if current > usage.peak:
+                usage.peak = current
+        time.sleep(SAMPLE_INTERVAL)
+
+
+def _budget() -> int:
+    from app.core.config import settings
+    return max(0, settings.MEMORY_BUDGET_MB) * MB
+
+
+def _committed() -> int:
+    """Current RSS plus what the running analyses are still expected to allocate (lock held)."""
+    return rss() + sum(usage.outstanding() for usage in _active)
+
+
+def _release(nbytes: int) -> None:
+    """Free about *nbytes* of cached artifacts of other files and hand the heap back."""
+    from app.core.artifacts import artifact_release
+    if artifact_release(nbytes):
+        gc.collect()
+    _trim()
+
+
+@contextmanager
+def admit(route: str, estimate: int, fallback: Optional[int] = None) -> Iterator[Usage]:
+    """
+    Run the enclosed analysis, expected to allocate *estimate* bytes, if it
+    fits in the budget; otherwise, when its bounded-memory mode (*fallback*
+    bytes, None = there is none) fits, run it with usage.downgraded set;
+    otherwise raise MemoryBudgetExceeded. Before either, cached artifacts of
+    the least recently used files are released to make room. Its RSS is
+    sampled throughout.
+    """
+    global _sampler
+    budget = _budget()
+    with _lock:
+        downgraded = False
+        if budget:
+            committed = _committed()
+            if committed + estimate > budget:
+                _release(committed + estimate - budget)
+                committed = _committed()
+            if committed + estimate > budget:
+                if fallback is None or committed + fallback > budget:
+                    inc("evalplatform_memory_admissions_total", route=route, outcome="rejected")
+                    raise MemoryBudgetExceeded(busy=bool(_active))
+                downgraded = True
+        usage = Usage(route, fallback if downgraded else estimate, downgraded, budget)
+        _active.add(usage)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, name="evalplatform-memory", daemon=True)
+            _sampler.start()
+    inc("evalplatform_memory_admissions_total", route=route,
+        outcome="downgraded" if downgraded else "admitted")
+    try:
+        yield usage
+    finally:
+        with _lock:
+            _active.discard(usage)
+        usage.peak = max(usage.peak, rss())
+        observe("evalplatform_analysis_memory_bytes", usage.growth, route=route)
+        if usage.growth >= TRIM_AFTER_BYTES:
+            _trim()
+
+
+def _memory_gauge() -> Dict:
+    with _lock:
+        outstanding = sum(usage.outstanding() for usage in _active)
+    with _frames_lock:
+        frames = sum(_frames.values())
+    from app.core.artifacts import artifact_bytes
+    series = {
+        gauge_labels(kind="resident"): rss(),
+        gauge_labels(kind="frames"): frames,
+        gauge_labels(kind="artifacts"): artifact_bytes(),
+        gauge_labels(kind="outstanding"): outstanding,
+    }
+    if _budget():
+        series[gauge_labels(kind="budget")] = _budget()
+    return series
+
+
+set_buckets("evalplatform_analysis_memory_bytes", tuple(n * MB for n in (8, 16, 32, 64, 128, 256, 512, 1024, 2048)))
+register_gauge("evalplatform_memory_bytes", _memory_gauge)
+describe("evalplatform_memory_bytes", "Worker memory: resident (RSS), live DataFrames and cached artifacts (estimated), still expected by running analyses (outstanding) and the budget.")
+describe("evalplatform_analysis_memory_bytes", "RSS growth (peak - start) of each analysis, by route.")
+describe("evalplatform_memory_admissions_total", "Analyses by memory admission outcome (admitted / downgraded / rejected).")
@@ -0,0 +1,278 @@
+"""
+Metrics and per-request timing — dependency-free, Prometheus text format.
+
+Why this exists:
+  When a request is slow we need to know which stage the time went to
+  (loading the file, restoring it from S3, filtering, the analyzers, cache I/O,
+  serialization). Stages are wrapped in named spans:
+
+    with span("load"):
+        df = ...
+
+  Each span feeds a per-stage latency histogram and, when it runs inside an
+  HTTP request, that request's timings — TimingMiddleware sends them back as a
+  `Server-Timing` header (visible in the browser's network panel) and records
+  the request latency and rows processed per route. GET /api/v1/metrics
+  renders everything in the Prometheus text format.
+
+  Metrics live in this process only; with several workers each one reports
+  its own numbers (the usual Prometheus model — scrape and sum).
+
+Usage:
+  from app.core.metrics import span, add_rows, inc
+
+  with span("analyze"):
+      result = analyze_responses(responses)
+  add_rows(len(df))                         # rows processed by this request
+  inc("evalplatform_cache_requests_total", namespace="file", result="hit")
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds — from cache lookups up to multi-minute LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[_LabelKey, float]] = {}
+_histograms: Dict[str, Dict[_LabelKey, List[float]]] = {}  # bucket counts + [sum, count]
+_gauges: Dict[str, Callable[[], Dict[_LabelKey, float]]] = {}
+_help: Dict[str, str] = {}
+_bounds: Dict[str, Tuple[float, ...]] = {}  # histograms not measured in seconds
+
+
+def _key(labels: Dict[str, str]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name: str, text: str) -> None:
+    """Set the # HELP line of a metric."""
+    _help[name] = text
+
+
+def set_buckets(name: str, buckets: Tuple[float, ...]) -> None:
+    """Bucket bounds of the histogram *name*, instead of DEFAULT_BUCKETS (set before observing)."""
+    _bounds[name] = tuple(buckets)
+
+
+# ── Primitives ────────────────────────────────────────────────────────────────
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Increase the counter *name* (with *labels*) by *amount*."""
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record *value* in the histogram *name* (with *labels*)."""
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        bounds = _bounds.get(name, DEFAULT_BUCKETS)
+        buckets = series.get(key)
+        if buckets is None:
+            buckets = series[key] = [0.0] * (len(bounds) + 2)
+        idx = bisect_left(bounds, value)
+        if idx < len(bounds):
+            buckets[idx] += 1
+        buckets[-2] += value
+        buckets[-1] += 1
+
+
+def register_gauge(name: str, collect: Callable[[], Dict[_LabelKey, float]]) -> None:
+    """
+    Register a gauge whose values are read by *collect* at scrape time.
+    *collect* returns {label key: value}; use gauge_labels() to build keys.
+    """
+    _gauges[name] = collect
+
+
+def gauge_labels(**labels: str) -> _LabelKey:
+    return _key(labels)
+
+
+# ── Per-request timings ───────────────────────────────────────────────────────
+
+class RequestTimings:
+    """Accumulated stage durations and rows processed for one request."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as *stage* (histogram + current request)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("evalplatform_stage_duration_seconds", elapsed, stage=stage)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, elapsed)
+
+
+def add_rows(n: int) -> None:
+    """Count *n* rows as processed by the current request."""
+    timings = _current.get()
+    if timings is not None:
+        with timings._lock:
+            timings.rows += int(n)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: opens a RequestTimings for every HTTP request, adds the
+    `Server-Timing` header and records latency / rows per route template.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                value = timings.server_timing(time.perf_counter() - start)
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            labels = {"route": path, "method": scope.get("method", "")}
+            observe(
+                "evalplatform_request_duration_seconds",
+                time.perf_counter() - start,
+                status=str(status["code"]),
+                **labels,
+            )
+            if timings.rows:
+                inc("evalplatform_rows_processed_total", timings.rows, **labels)
+
+
+# ── Exposition ────────────────────────────────────────────────────────────────
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: _LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus() -> str:
+    """Every metric in the Prometheus text exposition format (0.0.4)."""
+    lines: List[str] = []
+
+    def header(name: str, kind: str) -> None:
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        histograms = {n: {k: list(b) for k, b in s.items()} for n, s in _histograms.items()}
+
+    for name, series in sorted(counters.items()):
+        header(name, "counter")
+        for key, value in sorted(series.items()):
+            lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+
+    for name, series in sorted(histograms.items()):
+        header(name, "histogram")
+        for key, buckets in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(_bounds.get(name, DEFAULT_BUCKETS), buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{_fmt_labels(key, (('le', repr(float(bound))),))} {_fmt_value(cumulative)}")
+            lines.append(f"{name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {_fmt_value(buckets[-1])}")
+            lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(buckets[-2])}")
+            lines.append(f"{name}_count{_fmt_labels(key)} {_fmt_value(buckets[-1])}")
+
+    for name, collect in sorted(_gauges.items()):
+        header(name, "gauge")
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _cache_hit_ratio() -> Dict[_LabelKey, float]:
+    totals: Dict[str, List[float]] = {}
+    with _lock:
+        series = dict(_counters.get("evalplatform_cache_requests_total", {}))
+    for key, value in series.items():
+        labels = dict(key)
+        hits_total = totals.setdefault(labels.get("namespace", ""), [0.0, 0.0])
+        if labels.get("result") == "hit":
+            hits_total[0] += value
+        hits_total[1] += value
+    return {
+        gauge_labels(namespace=ns): hits / total
+        for ns, (hits, total) in totals.items() if total
+    }
+
+
+register_gauge("evalplatform_cache_hit_ratio", _cache_hit_ratio)
+
+describe("evalplatform_cache_hit_ratio", "Share of cache lookups that were hits, by key namespace.")
+describe("evalplatform_request_duration_seconds", "HTTP request latency by route template.")
+describe("evalplatform_stage_duration_seconds", "Duration of named processing stages (spans).")
+describe("evalplatform_rows_processed_total", "DataFrame rows processed, by route.")
+describe("evalplatform_cache_requests_total", "Cache lookups by key namespace and result (hit/miss).")
@@ -0,0 +1,135 @@
+"""
+Fast JSON responses and client-side field selection for large payloads.
+
+Why this exists:
+  /analyze and /multi-analyze return big nested dicts (per-group top words,
+  trigrams, suggestions, highlights). Returning a plain dict makes FastAPI walk
+  the whole structure with jsonable_encoder and then encode it again with the
+  standard json module. Returning FastJSONResponse skips both: the payload is
+  already JSON-native, so it goes straight to orjson (stdlib json when orjson
+  isn't installed).
+
+  Clients that only render a few sections can send a `fields` list of dotted
+  paths; select_fields() prunes the payload before it is encoded.
+
+  etag_matches() evaluates If-None-Match for routes that serve cacheable
+  results with an ETag.
+
+Usage:
+  from app.core.responses import FastJSONResponse, select_fields
+
+  return FastJSONResponse(select_fields(result, ["general.sentiment", "by_group.*.summary"]))
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.core.compression import plain_etag
+from app.core.metrics import span
+
+try:
+    import orjson
+except ImportError:  # optional dependency — stdlib json fallback
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode *content* as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return json.dumps(
+        content, default=str, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the time shows up as the "serialize" span."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return dumps(content)
+
+
+# ── Field selection ───────────────────────────────────────────────────────────
+
+_WHOLE = None  # leaf marker: keep the value as-is
+
+
+def _field_tree(fields: Iterable[str]) -> Dict[str, Any]:
+    """["a.b", "a.c", "d"] → {"a": {"b": None, "c": None}, "d": None}."""
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            if part in node and node[part] is _WHOLE:
+                break  # an ancestor is already kept whole
+            if last:
+                node[part] = _WHOLE
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _prune(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is _WHOLE:
+        return value
+    if isinstance(value, list):
+        return [_prune(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    out: Dict[str, Any] = {}
+    if "*" in tree:
+        for key, item in value.items():
+            out[key] = _prune(item, tree["*"])
+    for key, subtree in tree.items():
+        if key != "*" and key in value:
+            out[key] = _prune(value[key], subtree)
+    return out
+
+
+def select_fields(
+    data: Dict[str, Any],
+    fields: Optional[List[str]],
+    keep: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """
+    Keep only the dotted *fields* of *data* (``*`` matches every key of a
+    mapping, lists are traversed element-wise) plus the top-level *keep* keys.
+    No *fields* → *data* unchanged. Unknown paths are ignored.
+    """
+    if not fields:
+        return data
+    tree = _field_tree(list(fields) + list(keep))
+    return _prune(data, tree)
+
+
+# ── Conditional requests ──────────────────────────────────────────────────────
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches *etag*. Weak comparison, as
+    If-None-Match calls for; tags the compression middleware suffixed with
+    their encoding match the uncompressed tag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if plain_etag(tag) == etag:
+            return True
+    return False
@@ -0,0 +1,140 @@
+"""
+Single-flight coalescing of identical concurrent computations.
+
+Why this exists:
+  When a department head shares a report link, many people open it at once
+  and the frontend sends the same /multi-analyze body for each of them.
+  Every copy used to load the file and run every analyzer on its own. Now
+  the routes compute their result through single_flight() under a
+  fingerprint of the request: the first caller computes it and every
+  identical request that arrives meanwhile awaits that same task.
+
+  Across workers (REDIS_URL set) the first caller also takes a cache_lock()
+  on the fingerprint and publishes its result in the cache for a short
+  while — or, when the computation stores its result in the cache itself
+  (`stored`), nothing more: callers in other workers wait for that result
+  instead of computing it again. A caller that gets the lock looks for the
+  result once more before computing, in case the holder finished just
+  before. If the holder fails (or takes longer than the lock's TTL) the
+  lock is released and the next waiter computes it itself.
+
+  Only the computation is shared: each caller still applies its own
+  response shaping (e.g. `fields`) to the result, which must not be
+  mutated.
+
+Usage:
+  from app.core.singleflight import fingerprint, single_flight
+
+  key = fingerprint("multi-analyze", file_id, rows, body)
+  result = await single_flight(key, lambda: compute(...), route="multi-analyze",
+                               stored=lambda: cache_get(f"result:{key}"))
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import cache_get, cache_lock, cache_set, cache_shared, cache_unlock
+from app.core.metrics import describe, inc, span
+
+logger = logging.getLogger(__name__)
+
+# fingerprint → task computing it in this worker (kept referenced until it finishes)
+_flights: Dict[str, asyncio.Task] = {}
+
+# Polling interval bounds while another worker computes (seconds)
+_POLL_MIN = 0.05
+_POLL_MAX = 1.0
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable key of *parts* (JSON-like values; dict key order doesn't matter)."""
+    canonical = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def _across_workers(key: str, compute: Callable[[], Awaitable[Any]], route: str,
+                          stored: Optional[Callable[[], Any]]) -> Any:
+    """Compute under the cross-worker lock of *key*, or wait for its holder's result."""
+    from app.core.config import settings
+
+    lock_key, result_key = f"lock:flight:{key}", f"flight:{key}"
+    published = stored or (lambda: cache_get(result_key))
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_LOCK_SECONDS
+    delay = _POLL_MIN
+    waiting = False
+    while True:
+        if waiting:
+            result = published()
+            if result is not None:
+                inc("evalplatform_singleflight_total", route=route, role="remote")
+                return result
+
+        token = cache_lock(lock_key, ttl=settings.SINGLE_FLIGHT_LOCK_SECONDS)
+        if token:
+            try:
+                # The previous holder may have published and unlocked since
+                # this caller last looked (or before it first did)
+                result = published()
+                if result is not None:
+                    inc("evalplatform_singleflight_total", route=route, role="remote")
+                    return result
+                result = await compute()
+                if stored is None:
+                    cache_set(result_key, result, ttl=settings.SINGLE_FLIGHT_RESULT_SECONDS)
+                return result
+            finally:
+                cache_unlock(lock_key, token)
+
+        # Another worker is computing it: wait for its result (or its lock
+        # to go away, if it failed)
+        waiting = True
+        if time.monotonic() >= deadline:
+            logger.warning("Single-flight wait for %s timed out — computing locally", route)
+            return await compute()
+        await asyncio.sleep(delay)
+        delay = min(_POLL_MAX, delay * 2)
+
+
+def _finished(key: str, task: asyncio.Task) -> None:
+    _flights.pop(key, None)
+    if not task.cancelled():
+        task.exception()  # retrieved: every caller may have gone away
+
+
+async def single_flight(key: str, compute: Callable[[], Awaitable[Any]], route: str,
+                        stored: Optional[Callable[[], Any]] = None) -> Any:
+    """
+    Result of ``await compute()``, shared with every concurrent caller
+    passing the same *key*. Exceptions are shared too. *stored*, when
+    given, returns the result compute() stored in the cache itself (None
+    until then): other workers read it there instead of a copy published
+    under *key*.
+    """
+    task = _flights.get(key)
+    if task is not None:
+        inc("evalplatform_singleflight_total", route=route, role="follower")
+        with span("coalesced"):
+            # shield: a follower that disconnects must not cancel the others' result
+            return await asyncio.shield(task)
+
+    inc("evalplatform_singleflight_total", route=route, role="leader")
+    if cache_shared():
+        task = asyncio.create_task(_across_workers(key, compute, route, stored))
+    else:
+        task = asyncio.create_task(compute())
+    _flights[key] = task
+    task.add_done_callback(lambda done: _finished(key, done))
+    # The task runs in a copy of this request's context, so its spans still
+    # land in this request's Server-Timing; shielded for the followers' sake
+    return await asyncio.shield(task)
+
+
+describe(
+    "evalplatform_singleflight_total",
+    "Coalesced requests by role: leader (first in this worker), follower "
+    "(awaited the leader) or remote (took another worker's result).",
+)
@@ -0,0 +1,143 @@
+"""
+Startup timing, background preload and readiness.
+
+Why this exists:
+  On a sleeping container the first request used to pay for everything at
+  once: importing pandas, opening openpyxl, probing Redis and S3. Now the
+  process only imports what it needs to bind the port (heavy libraries are
+  lazy, see app.core.lazy); right after startup, start_preload() warms them
+  in a background thread, one step at a time:
+
+    pandas   → import pandas + numpy
+    excel    → import openpyxl (pd.read_excel's engine)
+    csv      → import pyarrow's CSV reader, when installed
+    cache    → connect to Redis (or settle on the in-memory fallback)
+    storage  → connect to S3 (or settle on local disk)
+    ai       → import httpx (LLM client)
+
+  /health stays a liveness probe; /ready answers 503 until the preload has
+  finished, so an orchestrator can hold traffic until the first request
+  would be served warm. Both startup phases are exported to /metrics.
+
+Usage:
+  from app.core import startup
+
+  startup.mark_started()     # in the app's startup hook
+  startup.start_preload()
+  startup.readiness()        # → {"ready": bool, ...}
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.executors import run_blocking
+from app.core.lazy import import_lock
+from app.core.metrics import describe, gauge_labels, register_gauge
+
+logger = logging.getLogger(__name__)
+
+# app.main imports this module before anything else, so this is ~process start
+_IMPORT_STARTED = time.perf_counter()
+
+_lock = threading.Lock()
+_phases: Dict[str, float] = {}                  # phase → seconds
+_steps: Dict[str, Dict[str, object]] = {}       # preload step → status / seconds
+_preload_task: Optional[asyncio.Task] = None
+_preload_done = False
+
+
+def _import(*modules: str) -> Callable[[], None]:
+    def step() -> None:
+        for name in modules:
+            with import_lock:
+                importlib.import_module(name)
+    return step
+
+
+def _import_installed(*modules: str) -> Callable[[], None]:
+    """Like _import(), for optional packages: skipped when not installed."""
+    def step() -> None:
+        for name in modules:
+            if importlib.util.find_spec(name.split(".")[0]) is not None:
+                with import_lock:
+                    importlib.import_module(name)
+    return step
+
+
+def _connect_cache() -> None:
+    from app.core.cache import _get_redis
+    _get_redis()
+
+
+def _connect_storage() -> None:
+    from app.core.storage import _get_s3
+    _get_s3()
+
+
+PRELOAD_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("pandas", _import("numpy", "pandas")),
+    ("excel", _import("openpyxl")),
+    ("csv", _import_installed("pyarrow.csv", "pyarrow.compute")),
+    ("cache", _connect_cache),
+    ("storage", _connect_storage),
+    ("ai", _import("httpx")),
+]
+
+
+def mark_started() -> None:
+    """Record the time from the first app import to the startup hook."""
+    with _lock:
+        _phases.setdefault("import", time.perf_counter() - _IMPORT_STARTED)
+
+
+def _preload() -> None:
+    """Run every preload step (in the io pool); failures are recorded, not raised."""
+    global _preload_done
+    start = time.perf_counter()
+    for name, step in PRELOAD_STEPS:
+        t0 = time.perf_counter()
+        try:
+            step()
+            status = "ok"
+        except Exception as exc:
+            # Not fatal: the request that needs it will retry / fail on its own
+            status = "error"
+            logger.warning("⚠️  Preload step %s failed: %s", name, exc)
+        with _lock:
+            _steps[name] = {"status": status, "seconds": round(time.perf_counter() - t0, 3)}
+    with _lock:
+        _phases["preload"] = time.perf_counter() - start
+        _preload_done = True
+    logger.info("✅ Preload finished in %.2fs", _phases["preload"])
+
+
+def start_preload(enabled: bool = True) -> None:
+    """Start the background preload (or mark the process ready at once if disabled)."""
+    global _preload_task, _preload_done
+    if not enabled:
+        _preload_done = True
+        return
+    _preload_task = asyncio.get_running_loop().create_task(run_blocking(_preload, pool="io"))
+
+
+def readiness() -> Dict[str, object]:
+    with _lock:
+        return {
+            "ready": _preload_done,
+            "startup_seconds": {k: round(v, 3) for k, v in _phases.items()},
+            "preload": dict(_steps),
+        }
+
+
+def _startup_gauge() -> Dict:
+    with _lock:
+        return {gauge_labels(phase=phase): seconds for phase, seconds in _phases.items()}
+
+
+register_gauge("evalplatform_startup_seconds", _startup_gauge)
+describe("evalplatform_startup_seconds", "Process startup phases: import (to startup hook) and background preload.")
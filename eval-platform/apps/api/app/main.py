@@ -1,7 +1,13 @@
+from app.core import startup  # first: starts the startup clock
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.routers import health, upload, analyze
+from app.core.executors import shutdown_processes
+from app.core.metrics import TimingMiddleware
+from app.routers import health, upload, analyze, compare, export, metrics, reports, rollups, topics
+from app.services import shared_frames
 ## MAIN.PY
 
 app = FastAPI(
@@ -16,14 +22,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser's network panel show per-stage timings cross-origin,
+    # and the frontend read when to retry a 503 / 429 and where a computed
+    # analysis can be fetched again
+    expose_headers=["Server-Timing", "Retry-After", "ETag", "Content-Location"],
 )
+# gzip / brotli per Accept-Encoding; added before TimingMiddleware so the
+# timing (outermost) includes compression
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(TimingMiddleware)
 
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(upload.router, prefix="/api/v1", tags=["upload"])
 app.include_router(analyze.router, prefix="/api/v1", tags=["analyze"])
+app.include_router(compare.router, prefix="/api/v1", tags=["compare"])
+app.include_router(export.router, prefix="/api/v1", tags=["export"])
+app.include_router(rollups.router, prefix="/api/v1", tags=["rollups"])
+app.include_router(topics.router, prefix="/api/v1", tags=["topics"])
+app.include_router(reports.router, prefix="/api/v1", tags=["reports"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 
 
 @app.on_event("startup")
-async def startup():
+async def on_startup():
+    startup.mark_started()
+    # pandas / openpyxl / Redis / S3 warm up in the background while the
+    # server starts accepting requests (see /api/v1/ready)
+    startup.start_preload(settings.PRELOAD_ON_STARTUP)
+    # Multi-worker mode: drop shared frames of expired files
+    shared_frames.start_sweeper()
     print(f"🚀 {settings.PROJECT_NAME} v{settings.VERSION} running")
-    print(f"📄 Docs: http://localhost:8000/api/v1/docs")
\ No newline at end of file
+    print(f"📄 Docs: http://localhost:8000/api/v1/docs")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Worker processes of batch jobs (per-evaluee reports)
+    shutdown_processes()
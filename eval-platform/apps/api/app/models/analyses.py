@@ -0,0 +1,51 @@
+"""
+Request bodies of the analyses (/analyze, /multi-analyze), shared by the
+routes that run them and app.services.analyses, which stores a request
+with its result and runs it again when the result expires.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class AnalyzeRequest(BaseModel):
+    file_id: str
+    response_column: str
+    filters: Optional[Dict[str, List[str]]] = None
+    group_by: Optional[str] = None
+    # Count bigrams / trigrams with bounded-memory sketches (for very large
+    # files); the result's "ngram_counting" says whether they stayed exact
+    approximate_ngrams: bool = False
+    # Analyze one response per cluster of near-duplicates (copy-pasted
+    # comments with small variations), weighted by the cluster's size; the
+    # result's "near_duplicates" reports the clusters. Not combinable with
+    # approximate_ngrams.
+    collapse_near_duplicates: bool = False
+    # Dotted paths of the result to return, e.g. ["general.sentiment",
+    # "by_group.*.summary"]; None returns everything. "config" is always kept.
+    fields: Optional[List[str]] = None
+
+
+class QuestionConfig(BaseModel):
+    question_number: str
+    analysis_type: str  # "quantitative" | "qualitative"
+
+
+class MultiAnalyzeRequest(BaseModel):
+    file_id: str
+    pregunta_column: str
+    respuesta_column: str
+    questions: List[QuestionConfig]
+    filters: Optional[Dict[str, List[str]]] = None
+    group_by: Optional[str] = None
+    # See AnalyzeRequest.approximate_ngrams (applies to qualitative questions)
+    approximate_ngrams: bool = False
+    # See AnalyzeRequest.collapse_near_duplicates (qualitative questions)
+    collapse_near_duplicates: bool = False
+    # Dotted paths inside each question result, e.g. ["quantitative.summary",
+    # "qualitative.sentiment"]; None returns everything. The question's
+    # number, type and total, and "config", are always kept.
+    fields: Optional[List[str]] = None
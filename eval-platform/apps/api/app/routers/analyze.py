@@ -1,32 +1,34 @@
-import asyncio
-import os
-from functools import partial
+from __future__ import annotations
+
 from typing import Any, Dict, List, Optional
 
-import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
-from app.core.cache import cache_get, cache_set
+from app.core.cache import cache_get
 from app.core.config import settings
-from app.core.storage import ensure_local
-from app.services.quantitative_analyzer import (
-    analyze_quantitative,
-    analyze_quantitative_by_group,
-)
-from app.services.text_analyzer import analyze_by_group, analyze_responses, search_responses
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.memory import admit
+from app.core.metrics import span
+from app.core.responses import FastJSONResponse, etag_matches, select_fields
+from app.core.singleflight import fingerprint
+from app.models.analyses import AnalyzeRequest, MultiAnalyzeRequest
+from app.services.analyses import analysis, search_estimate, stored_entry, stored_result
+from app.services.frames import get_file_meta, load_df
+from app.services.indexes import filter_mask
+from app.services.text_analyzer import search_responses
+from app.services.text_features import built_features
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
 router = APIRouter()
 
 
 # ── Pydantic models ────────────────────────────────────────────────────────────
-
-class AnalyzeRequest(BaseModel):
-    file_id: str
-    response_column: str
-    filters: Optional[Dict[str, List[str]]] = None
-    group_by: Optional[str] = None
-
+#
+# The analyses' own request bodies live in app.models.analyses.
 
 class DrilldownRequest(BaseModel):
     file_id: str
@@ -42,248 +44,117 @@ class AISummaryRequest(BaseModel):
     department: Optional[str] = None
 
 
-class QuestionConfig(BaseModel):
-    question_number: str
-    analysis_type: str  # "quantitative" | "qualitative"
-
-
-class MultiAnalyzeRequest(BaseModel):
-    file_id: str
-    pregunta_column: str
-    respuesta_column: str
-    questions: List[QuestionConfig]
-    filters: Optional[Dict[str, List[str]]] = None
-    group_by: Optional[str] = None
-
-
 # ── Internal helpers ───────────────────────────────────────────────────────────
 
-def _get_file_meta(file_id: str) -> dict:
-    """Fetch file metadata from the shared cache or raise 404."""
-    meta = cache_get(f"file:{file_id}")
-    if not meta:
-        raise HTTPException(
-            404,
-            "Archivo no encontrado. Es posible que haya expirado — vuelve a subirlo.",
-        )
-    return meta
-
-
-def _read_dataframe(filepath: str) -> pd.DataFrame:
-    """Load a file from disk (runs in a thread pool)."""
-    ext = os.path.splitext(filepath)[1].lower()
-    return pd.read_csv(filepath, low_memory=False) if ext == ".csv" else pd.read_excel(filepath)
-
-
-def _apply_filters(df: pd.DataFrame, filters: Optional[Dict[str, List[str]]]) -> pd.DataFrame:
-    if filters:
-        for col_name, values in filters.items():
-            if col_name in df.columns and values:
-                df = df[df[col_name].astype(str).isin(values)]
-    return df
-
+def _search_rows(series: pd.Series, rows: np.ndarray, query: str, limit: int) -> Dict[str, Any]:
+    """search_responses() over the responses at *rows* (runs in a thread pool)."""
+    return search_responses(series.iloc[rows].astype(str).tolist(), query, limit)
 
-def _extract_known_names(df: pd.DataFrame) -> Optional[set]:
-    if "EVALUADO" not in df.columns:
-        return None
-    known = set()
-    for full_name in df["EVALUADO"].dropna().unique().tolist():
-        for part in str(full_name).strip().split():
-            if len(part) > 2:
-                known.add(part.capitalize())
-    return known
-
-
-async def _load_df(filepath: str, file_id: str) -> pd.DataFrame:
-    """
-    Non-blocking DataFrame load — heavy I/O runs in a thread pool.
-    If the file is missing locally (e.g. container restarted), tries to
-    restore it from S3 before raising an error.
-    """
-    if not os.path.exists(filepath):
-        # Attempt to restore from S3
-        if not ensure_local(filepath, file_id):
-            raise HTTPException(
-                404,
-                "Archivo no encontrado en el servidor. "
-                "Si fue subido hace más de 2 horas vuelve a cargarlo.",
-            )
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, partial(_read_dataframe, filepath))
-
-
-def _run_qualitative(df, response_col, group_by, known_names):
-    """Synchronous qualitative analysis (called inside run_in_executor)."""
-    responses = df[response_col].astype(str).tolist()
-    general = analyze_responses(responses, known_names)
-    by_group = None
-    if group_by and group_by in df.columns:
-        groups = df[group_by].astype(str).tolist()
-        by_group = analyze_by_group(responses, groups, known_names)
-    return general, by_group, responses
-
-
-def _run_multi_analysis(df, req_dict):
-    """
-    Run all question analyses synchronously.
-    Called via run_in_executor so it doesn't block the event loop.
-    """
-    pregunta_col = req_dict["pregunta_column"]
-    respuesta_col = req_dict["respuesta_column"]
-    group_by = req_dict.get("group_by")
-    questions = req_dict["questions"]
 
-    known_names = _extract_known_names(df)
-    results: List[Dict[str, Any]] = []
+# ── Response shaping ───────────────────────────────────────────────────────────
 
-    for q in questions:
-        q_num = str(q["question_number"]).strip()
-        q_type = q["analysis_type"]
+# Kept in every /multi-analyze response regardless of `fields`
+_MULTI_ALWAYS_KEPT = [
+    "config",
+    "questions.question_number",
+    "questions.analysis_type",
+    "questions.total_responses",
+]
 
-        q_df = df[df[pregunta_col].astype(str).str.strip() == q_num]
-        q_df = q_df[q_df[respuesta_col].notna()]
-        responses = q_df[respuesta_col].astype(str).tolist()
 
-        q_result: Dict[str, Any] = {
-            "question_number": q_num,
-            "analysis_type": q_type,
-            "total_responses": len(responses),
-            "quantitative": None,
-            "qualitative": None,
-            "by_group": None,
-        }
+def _shape(route: str, result: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """The `fields` selection of a full result."""
+    if route == "analyze":
+        return select_fields(result, fields, keep=["config"])
+    fields = [f"questions.{f}" for f in fields] if fields else None
+    return select_fields(result, fields, keep=_MULTI_ALWAYS_KEPT)
 
-        if not responses:
-            results.append(q_result)
-            continue
 
-        if q_type == "quantitative":
-            q_result["quantitative"] = analyze_quantitative(responses)
-            if group_by and group_by in q_df.columns:
-                groups = q_df[group_by].astype(str).tolist()
-                q_result["by_group"] = analyze_quantitative_by_group(responses, groups)
-
-        elif q_type == "qualitative":
-            q_result["qualitative"] = analyze_responses(responses, known_names)
-            if group_by and group_by in q_df.columns:
-                groups = q_df[group_by].astype(str).tolist()
-                q_result["by_group"] = analyze_by_group(responses, groups, known_names)
-
-        results.append(q_result)
-
-    return results
+def _result_headers(analysis_id: str, entry: dict, fields: Optional[List[str]]) -> Dict[str, str]:
+    etag = entry["etag"]
+    if fields:  # a different selection is a different representation
+        etag += "-" + fingerprint(fields)[:8]
+    return {
+        "ETag": f'"{etag}"',
+        # Browsers and the proxy reuse it briefly, then revalidate (→ 304)
+        "Cache-Control": f"public, max-age={settings.ANALYSIS_MAX_AGE}, must-revalidate",
+        "Content-Location": f"/api/v1/analyses/{analysis_id}",
+    }
 
 
 # ── Routes ─────────────────────────────────────────────────────────────────────
 
 @router.post("/analyze")
 async def run_analysis(req: AnalyzeRequest):
-    meta = _get_file_meta(req.file_id)
-    df = await _load_df(meta["filepath"], req.file_id)
-
-    if req.response_column not in df.columns:
-        raise HTTPException(400, f"Columna '{req.response_column}' no existe")
-
-    df = _apply_filters(df, req.filters)
-    df = df[df[req.response_column].notna()]
-
-    if df.empty:
-        raise HTTPException(400, "No hay respuestas con los filtros seleccionados.")
-
-    known_names = _extract_known_names(df)
-
-    # Run analysis in thread pool (CPU-bound)
-    loop = asyncio.get_event_loop()
-    general, by_group, responses = await loop.run_in_executor(
-        None,
-        partial(_run_qualitative, df, req.response_column, req.group_by, known_names),
+    meta = get_file_meta(req.file_id)
+    analysis_id, entry, result = await analysis("analyze", req, meta)
+    return FastJSONResponse(
+        _shape("analyze", result, req.fields),
+        headers=_result_headers(analysis_id, entry, req.fields),
     )
 
-    result = {
-        "general": general,
-        "by_group": by_group,
-        "config": {
-            "file": meta["filename"],
-            "response_column": req.response_column,
-            "filters": req.filters or {},
-            "group_by": req.group_by,
-            "total_rows_after_filter": len(responses),
-        },
-    }
-
-    # Cache for AI summary reuse
-    cache_set(f"analysis:{req.file_id}", result, ttl=settings.CACHE_TTL_ANALYSIS)
-    return result
-
 
 @router.post("/multi-analyze")
 async def multi_analyze(req: MultiAnalyzeRequest):
-    meta = _get_file_meta(req.file_id)
-    df = await _load_df(meta["filepath"], req.file_id)
-
-    if req.pregunta_column not in df.columns:
-        raise HTTPException(400, f"Columna '{req.pregunta_column}' no existe")
-    if req.respuesta_column not in df.columns:
-        raise HTTPException(400, f"Columna '{req.respuesta_column}' no existe")
-
-    df = _apply_filters(df, req.filters)
-
-    # Run all question analyses in a single thread-pool call to avoid
-    # repeated executor overhead and keep pandas operations serialised.
-    loop = asyncio.get_event_loop()
-    req_dict = {
-        "pregunta_column": req.pregunta_column,
-        "respuesta_column": req.respuesta_column,
-        "group_by": req.group_by,
-        "questions": [q.model_dump() for q in req.questions],
-    }
-    questions_results = await loop.run_in_executor(
-        None, partial(_run_multi_analysis, df, req_dict)
+    meta = get_file_meta(req.file_id)
+    analysis_id, entry, result = await analysis("multi-analyze", req, meta)
+    return FastJSONResponse(
+        _shape("multi-analyze", result, req.fields),
+        headers=_result_headers(analysis_id, entry, req.fields),
     )
 
-    result = {
-        "questions": questions_results,
-        "config": {
-            "file": meta["filename"],
-            "pregunta_column": req.pregunta_column,
-            "respuesta_column": req.respuesta_column,
-            "questions_config": [q.model_dump() for q in req.questions],
-            "filters": req.filters or {},
-            "group_by": req.group_by,
-            "total_rows": len(df),
-        },
-    }
 
-    # Cache for AI summary reuse
-    cache_set(f"analysis:{req.file_id}", result, ttl=settings.CACHE_TTL_ANALYSIS)
-    return result
+@router.get("/analyses/{analysis_id}")
+async def get_analysis(analysis_id: str, request: Request, fields: Optional[List[str]] = Query(None)):
+    """
+    A computed /analyze or /multi-analyze result by its id (the POST
+    response's Content-Location). Send If-None-Match with the ETag you hold:
+    an unchanged result answers 304 without reading the result.
+    """
+    entry = stored_entry(analysis_id)
+    headers = _result_headers(analysis_id, entry, fields)
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    entry, result = await stored_result(analysis_id, entry)
+    headers = _result_headers(analysis_id, entry, fields)
+    return FastJSONResponse(_shape(entry["route"], result, fields), headers=headers)
 
 
 @router.post("/drilldown")
 async def drilldown(req: DrilldownRequest):
-    meta = _get_file_meta(req.file_id)
-    df = await _load_df(meta["filepath"], req.file_id)
+    meta = get_file_meta(req.file_id)
+    df = await load_df(meta, req.file_id)
 
     if req.response_column not in df.columns:
         raise HTTPException(400, f"Columna '{req.response_column}' no existe")
 
-    df = _apply_filters(df, req.filters)
-
-    if req.department and "DEPARTAMENTO" in df.columns:
-        df = df[df["DEPARTAMENTO"].astype(str) == req.department]
-
-    df = df[df[req.response_column].notna()]
+    with span("filter"):
+        mask = filter_mask(
+            df, req.file_id, req.filters,
+            department=req.department, not_null=req.response_column,
+        )
+        rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
 
-    if df.empty:
+    if not len(rows):
         raise HTTPException(400, "No hay respuestas con los filtros seleccionados.")
 
-    responses = df[req.response_column].astype(str).tolist()
-
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(
-        None, partial(search_responses, responses, req.query, req.limit or 50)
-    )
-    return result
+    # A search is one pass over the selected rows: it reuses the column's
+    # tokenized form when an analysis already built it, but doesn't
+    # tokenize the whole column for itself
+    with admit("drilldown", search_estimate(df, req.file_id, req.response_column, len(rows))):
+        with span("tokenize"):
+            features = await run_blocking(built_features, df, req.file_id, req.response_column)
+        with span("analyze"):
+            if features is not None:
+                result = await run_blocking(
+                    features.search, rows, df[req.response_column], req.query, req.limit or 50
+                )
+            else:
+                result = await run_blocking(
+                    _search_rows, df[req.response_column], rows, req.query, req.limit or 50
+                )
+    return FastJSONResponse(result)
 
 
 @router.post("/ai-summary")
@@ -311,43 +182,37 @@ async def ai_summary(req: AISummaryRequest):
     try:
         if is_multi:
             # Multi-question format — use the rich context builder
-            # run_in_executor so the blocking LLM call doesn't stall the event loop
-            loop = asyncio.get_event_loop()
-            summary = await loop.run_in_executor(
-                None,
-                partial(
+            # run_blocking so the blocking LLM call doesn't stall the event loop
+            with span("llm"):
+                summary = await run_blocking(
                     generate_multi_summary,
                     cached["questions"],
                     cached.get("config", {}),
-                ),
-            )
+                    pool="llm",
+                )
         elif req.department:
             # Legacy: per-department qualitative summary
             by_group = cached.get("by_group") or {}
             if req.department not in by_group:
                 raise HTTPException(404, f"Departamento '{req.department}' no encontrado")
-            loop = asyncio.get_event_loop()
-            summary = await loop.run_in_executor(
-                None,
-                partial(
+            with span("llm"):
+                summary = await run_blocking(
                     generate_department_summary,
                     req.department,
                     by_group[req.department],
                     cached.get("general"),
-                ),
-            )
+                    pool="llm",
+                )
         else:
             # Legacy: general qualitative summary
-            loop = asyncio.get_event_loop()
-            summary = await loop.run_in_executor(
-                None,
-                partial(
+            with span("llm"):
+                summary = await run_blocking(
                     generate_general_summary,
                     cached.get("general"),
                     cached.get("by_group"),
                     cached.get("config"),
-                ),
-            )
+                    pool="llm",
+                )
 
         return {"summary": summary, "department": req.department}
 
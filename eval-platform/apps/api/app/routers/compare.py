@@ -0,0 +1,49 @@
+import asyncio
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.core.executors import run_blocking
+from app.core.metrics import span
+from app.core.responses import FastJSONResponse
+from app.services.comparison import AGGREGATE_KINDS, compare_aggregates, load_aggregates
+
+router = APIRouter()
+
+
+class CompareRequest(BaseModel):
+    # Uploads to compare, oldest first (e.g. one per semester)
+    file_ids: List[str]
+    # Which stored analysis of each file to compare
+    kind: str = "multi-analyze"  # "multi-analyze" | "analyze"
+
+
+@router.post("/compare")
+async def compare(req: CompareRequest):
+    """
+    Compare the latest analysis of several uploads using only their stored
+    aggregates — the raw files aren't reloaded.
+    """
+    if req.kind not in AGGREGATE_KINDS:
+        raise HTTPException(400, f"Tipo de análisis no válido: '{req.kind}'")
+    if len(req.file_ids) < 2:
+        raise HTTPException(400, "Selecciona al menos dos archivos para comparar.")
+    if len(set(req.file_ids)) != len(req.file_ids):
+        raise HTTPException(400, "Hay archivos repetidos en la comparación.")
+
+    with span("storage"):
+        aggregates = await asyncio.gather(
+            *(run_blocking(load_aggregates, file_id, req.kind, pool="io") for file_id in req.file_ids)
+        )
+    missing = [fid for fid, agg in zip(req.file_ids, aggregates) if agg is None]
+    if missing:
+        raise HTTPException(
+            404,
+            f"No hay análisis guardados para: {', '.join(missing)}. "
+            "Ejecuta el análisis de cada archivo antes de compararlos.",
+        )
+
+    with span("analyze"):
+        result = compare_aggregates(aggregates)
+    return FastJSONResponse(result)
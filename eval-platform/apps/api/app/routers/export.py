@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.executors import PoolSaturated, run_blocking
+from app.core.lazy import lazy_import
+from app.core.memory import admit
+from app.core.metrics import describe, inc, span
+from app.services.analyses import stored_entry, stored_result, tokenize_estimate
+from app.services.exports import (
+    CHUNK_ROWS,
+    XLSX_MAX_ROWS,
+    formats,
+    media_type,
+    quantitative_table,
+    write_table,
+)
+from app.services.frames import get_file_meta, load_df
+from app.services.indexes import filter_mask, question_partition
+from app.services.text_features import TextFeatures, column_features
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+router = APIRouter()
+
+# Computed columns added to every exported response
+SENTIMENT_COLUMN = "SENTIMIENTO"
+SUGGESTION_COLUMN = "SUGERENCIA"
+
+
+class ExportResponsesRequest(BaseModel):
+    file_id: str
+    response_column: str
+    format: str = "csv"  # "csv" | "xlsx" | "parquet"
+    filters: Optional[Dict[str, List[str]]] = None
+    department: Optional[str] = None
+    # Only the rows of one question of a long-format file
+    pregunta_column: Optional[str] = None
+    question_number: Optional[str] = None
+    # Columns exported next to the computed ones; None exports every column
+    columns: Optional[List[str]] = None
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _check_format(fmt: str) -> None:
+    if fmt not in formats():
+        raise HTTPException(400, f"Formato no soportado: '{fmt}'. Usa {', '.join(formats())}.")
+
+
+def _response_chunks(df: pd.DataFrame, rows: np.ndarray, columns: List, response_col: str,
+                     features: TextFeatures) -> Iterator[pd.DataFrame]:
+    """The selected *rows* with their sentiment / suggestion, CHUNK_ROWS at a time."""
+    positions = df.columns.get_indexer(columns)
+    for start in range(0, max(len(rows), 1), CHUNK_ROWS):
+        picked = rows[start:start + CHUNK_ROWS]
+        chunk = df.iloc[picked, positions].reset_index(drop=True)
+        sentiments, suggestions = features.labels(picked, df[response_col])
+        chunk[SENTIMENT_COLUMN] = pd.Series(sentiments, dtype=object)
+        chunk[SUGGESTION_COLUMN] = pd.Series(suggestions, dtype=bool)
+        yield chunk
+
+
+async def _next_piece(body: Iterator[bytes]) -> Optional[bytes]:
+    """The next piece of *body* (None when done), waiting out a saturated pool."""
+    while True:
+        try:
+            return await run_blocking(next, body, None)
+        except PoolSaturated:
+            # Headers are already sent: slow down instead of failing the download
+            await asyncio.sleep(0.5)
+
+
+async def _first_piece(body: Iterator[bytes]) -> Optional[bytes]:
+    """
+    The first non-empty piece of *body* (None if there is none), produced
+    before answering so bad requests and a saturated pool still get a
+    proper status code. One pool task per piece: an XLSX sheet is built a
+    chunk per task instead of holding a thread throughout.
+    """
+    while True:
+        piece = await run_blocking(next, body, None)
+        if piece is None or piece:
+            return piece
+
+
+def _stream(first: Optional[bytes], body: Iterator[bytes], fmt: str, filename: str,
+            kind: str) -> StreamingResponse:
+    """Stream *first* (see _first_piece) and the rest of *body* as a *fmt* download."""
+
+    async def pieces() -> AsyncIterator[bytes]:
+        piece = first
+        while piece is not None:
+            yield piece
+            piece = await _next_piece(body)
+        inc("evalplatform_exports_total", kind=kind, format=fmt)
+
+    return StreamingResponse(
+        pieces(),
+        media_type=media_type(fmt),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@router.post("/export/responses")
+async def export_responses(req: ExportResponsesRequest):
+    """
+    The filtered responses of a file, with the sentiment and suggestion flag
+    the analyses computed for each one, as a CSV / XLSX / Parquet download.
+    Rows are written and sent in chunks: memory stays flat for any size.
+    """
+    _check_format(req.format)
+    meta = get_file_meta(req.file_id)
+    df = await load_df(meta, req.file_id)
+
+    columns = list(df.columns) if req.columns is None else req.columns
+    for column in [req.response_column, *columns, *([req.pregunta_column] if req.pregunta_column else [])]:
+        if column not in df.columns:
+            raise HTTPException(400, f"Columna '{column}' no existe")
+    if req.question_number is not None and not req.pregunta_column:
+        raise HTTPException(400, "Indica la columna de pregunta para exportar una sola pregunta.")
+
+    with span("filter"):
+        mask = filter_mask(
+            df, req.file_id, req.filters,
+            department=req.department, not_null=req.response_column,
+        )
+        if req.question_number is not None:
+            partition = question_partition(df, req.file_id, req.pregunta_column)
+            rows = partition.rows(str(req.question_number).strip(), mask)
+        else:
+            rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+
+    if req.format == "xlsx" and len(rows) > min(XLSX_MAX_ROWS - 1, settings.EXPORT_XLSX_MAX_ROWS):
+        raise HTTPException(
+            400,
+            f"Demasiadas filas para Excel ({len(rows):,}). Usa CSV o Parquet, o filtra más.",
+        )
+
+    with admit("export", tokenize_estimate(df, req.file_id, req.response_column)):
+        with span("tokenize"):
+            features = await run_blocking(column_features, df, req.file_id, req.response_column)
+        chunks = _response_chunks(df, rows, columns, req.response_column, features)
+        body = write_table(chunks, req.format)
+        # An XLSX sheet is built whole before its first byte: admitted too
+        with span("write"):
+            first = await _first_piece(body)
+    return _stream(first, body, req.format, f"respuestas_{req.file_id}", "responses")
+
+
+@router.get("/analyses/{analysis_id}/export")
+async def export_analysis(analysis_id: str, format: str = "csv"):
+    """
+    The quantitative questions of a /multi-analyze result (GET /analyses/{id})
+    as a table — overall and per group — as a CSV / XLSX / Parquet download.
+    """
+    _check_format(format)
+    entry, result = await stored_result(analysis_id, stored_entry(analysis_id))
+    table = quantitative_table(result)
+    if table.empty:
+        raise HTTPException(400, "Este análisis no tiene preguntas cuantitativas para exportar.")
+    body = write_table(iter([table]), format)
+    first = await _first_piece(body)
+    return _stream(first, body, format, f"cuantitativo_{analysis_id[:8]}", "quantitative")
+
+
+describe("evalplatform_exports_total", "Completed export downloads by kind and format.")
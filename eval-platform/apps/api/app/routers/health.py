@@ -1,5 +1,7 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
+from app.core import startup
 from app.core.cache import cache_health
 from app.core.config import settings
 from app.core.storage import storage_health
@@ -16,3 +18,10 @@ async def health_check():
         "cache": cache_health(),
         "storage": storage_health(),
     }
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the startup preload has finished."""
+    state = startup.readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.core.executors import PoolSaturated, run_blocking, run_in_process
+from app.core.lazy import lazy_import
+from app.core.metrics import describe, inc, observe, span
+from app.core.responses import FastJSONResponse, dumps
+from app.models.analyses import QuestionConfig
+from app.services.frames import get_file_meta, load_df
+from app.services.indexes import filter_mask, question_partition
+from app.services.reports import analyze_evaluees, evaluee_batches
+from app.services.text_analyzer import extract_known_names
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# job_id → running job task in this worker (kept referenced until it finishes)
+_jobs: Dict[str, asyncio.Task] = {}
+
+# Seconds between checks for new results while streaming a running job
+_STREAM_POLL = 0.5
+
+
+class EvalueeReportsRequest(BaseModel):
+    file_id: str
+    pregunta_column: str
+    respuesta_column: str
+    questions: List[QuestionConfig]
+    evaluado_column: str = "EVALUADO"
+    filters: Optional[Dict[str, List[str]]] = None
+    # Only these evaluees; None = every evaluee with selected rows
+    evaluees: Optional[List[str]] = None
+
+
+# ── Job state ─────────────────────────────────────────────────────────────────
+#
+# A job's status lives in the cache under "report-job:<id>" and each
+# evaluee's report under "report:<id>:<index>", so any worker can answer
+# status polls and serve results while the job runs in the worker that
+# accepted it.
+
+def _save(job: dict) -> None:
+    job["updated"] = time.time()
+    cache_set(f"report-job:{job['job_id']}", job, ttl=settings.CACHE_TTL_ANALYSIS)
+
+
+def _job(job_id: str) -> dict:
+    job = cache_get(f"report-job:{job_id}")
+    if not job:
+        raise HTTPException(404, "Trabajo no encontrado. Es posible que haya expirado.")
+    return job
+
+
+def _store(job: dict, results: List) -> None:
+    for index, report in results:
+        report["config"] = {**job["config"], "evaluee": report["evaluee"]}
+        cache_set(f"report:{job['job_id']}:{index}", report, ttl=settings.CACHE_TTL_ANALYSIS)
+        job["ready"].append(index)
+    job["completed"] = len(job["ready"])
+    _save(job)
+
+
+async def _next_batch(batches: Iterator) -> Optional[list]:
+    """The next batch of partitions (None when done), waiting out a saturated pool."""
+    while True:
+        try:
+            return await run_blocking(next, batches, None)
+        except PoolSaturated:
+            # A background job yields to interactive requests
+            await asyncio.sleep(1)
+
+
+async def _run_job(job: dict, batches: Iterator) -> None:
+    """Analyze every batch in the worker processes, storing reports as they finish."""
+    start = time.perf_counter()
+    job["status"] = "running"
+    _save(job)
+    in_flight: set = set()
+    # Batches built ahead of the workers: enough to keep them busy, few
+    # enough that pending partitions don't pile up in memory
+    ahead = 2 * max(1, settings.EXECUTOR_PROCESS_WORKERS)
+    try:
+        while True:
+            batch = await _next_batch(batches)
+            if batch is not None:
+                in_flight.add(asyncio.ensure_future(run_in_process(analyze_evaluees, batch)))
+            if in_flight and (batch is None or len(in_flight) >= ahead):
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    _store(job, future.result())
+            if batch is None and not in_flight:
+                break
+    except Exception as exc:
+        for future in in_flight:
+            future.cancel()
+        # Collect the other batches' outcomes so none is left unretrieved
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        job["status"], job["error"] = "error", str(exc)
+        inc("evalplatform_report_jobs_total", outcome="error")
+        logger.exception("Report job %s failed", job["job_id"])
+    else:
+        job["status"] = "done"
+        inc("evalplatform_report_jobs_total", outcome="done")
+        observe("evalplatform_report_job_seconds", time.perf_counter() - start)
+    finally:
+        job["seconds"] = round(time.perf_counter() - start, 2)
+        _save(job)
+        _jobs.pop(job["job_id"], None)
+
+
+def _progress(job: dict) -> dict:
+    """The job's status with its progress and a completion estimate."""
+    total, completed = job["total"], job["completed"]
+    elapsed = (job.get("updated") or job["created"]) - job["created"]
+    ready = set(job["ready"])
+    return {
+        **{k: v for k, v in job.items() if k not in ("ready", "evaluees")},
+        "progress": round(completed / total * 100, 1) if total else 100.0,
+        "eta_seconds": (
+            round(elapsed / completed * (total - completed), 1)
+            if completed and job["status"] == "running" else None
+        ),
+        "evaluees": [
+            {"index": i, "evaluee": name, "ready": i in ready}
+            for i, name in enumerate(job["evaluees"])
+        ],
+    }
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@router.post("/reports/evaluees", status_code=202)
+async def start_evaluee_reports(req: EvalueeReportsRequest):
+    """
+    Start a job building one report per evaluee: every requested question
+    analyzed on that evaluee's rows — the same results as /multi-analyze
+    filtered to the evaluee. The file is partitioned once and the
+    partitions are analyzed in the worker processes. Poll the returned
+    status URL for progress; fetch each report as soon as it's ready, or
+    stream them all.
+    """
+    if len(_jobs) >= settings.REPORT_MAX_JOBS:
+        raise HTTPException(
+            429,
+            "Ya hay reportes por evaluado en curso. Intenta de nuevo en unos minutos.",
+            headers={"Retry-After": "60"},
+        )
+    meta = get_file_meta(req.file_id)
+    df = await load_df(meta, req.file_id)
+    for column in (req.pregunta_column, req.respuesta_column, req.evaluado_column):
+        if column not in df.columns:
+            raise HTTPException(400, f"Columna '{column}' no existe")
+    if not req.questions:
+        raise HTTPException(400, "Selecciona al menos una pregunta.")
+
+    with span("filter"):
+        mask = filter_mask(df, req.file_id, req.filters)
+        by_evaluee = question_partition(df, req.file_id, req.evaluado_column)
+        by_question = question_partition(df, req.file_id, req.pregunta_column)
+        names = sorted(by_evaluee.parts) if req.evaluees is None else [
+            str(name).strip() for name in req.evaluees
+        ]
+        evaluees = [(name, by_evaluee.rows(name, mask)) for name in dict.fromkeys(names)]
+        evaluees = [(name, rows) for name, rows in evaluees if len(rows)]
+        questions = [(str(q.question_number).strip(), q.analysis_type) for q in req.questions]
+        question_rows = {q_num: by_question.rows(q_num, mask) for q_num, _ in questions}
+    if not evaluees:
+        raise HTTPException(400, "No hay evaluados con los filtros seleccionados.")
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "file_id": req.file_id,
+        "total": len(evaluees),
+        "completed": 0,
+        "created": time.time(),
+        "evaluees": [name for name, _ in evaluees],
+        "ready": [],
+        "config": {
+            "file": meta["filename"],
+            "pregunta_column": req.pregunta_column,
+            "respuesta_column": req.respuesta_column,
+            "evaluado_column": req.evaluado_column,
+            "questions_config": [q.model_dump() for q in req.questions],
+            "filters": req.filters or {},
+        },
+    }
+    _save(job)
+    batches = evaluee_batches(
+        df, evaluees, questions, question_rows, req.respuesta_column,
+        lambda rows: extract_known_names(df.iloc[rows]),
+    )
+    # Fresh context: the job's spans must not land in this request's Server-Timing
+    _jobs[job_id] = asyncio.create_task(_run_job(job, batches), context=contextvars.Context())
+
+    return JSONResponse(
+        {
+            "job_id": job_id,
+            "status": "queued",
+            "total": len(evaluees),
+            "status_url": f"/api/v1/reports/jobs/{job_id}",
+            "stream_url": f"/api/v1/reports/jobs/{job_id}/stream",
+        },
+        status_code=202,
+        headers={"Location": f"/api/v1/reports/jobs/{job_id}"},
+    )
+
+
+@router.get("/reports/jobs/{job_id}")
+async def report_job_status(job_id: str):
+    """Status and progress of a report job, and which evaluees' reports are ready."""
+    return FastJSONResponse(_progress(_job(job_id)))
+
+
+@router.get("/reports/jobs/{job_id}/evaluees/{index}")
+async def report_job_result(job_id: str, index: int):
+    """The report of the evaluee at *index* (see the job status) once it's ready."""
+    job = _job(job_id)
+    if not 0 <= index < job["total"]:
+        raise HTTPException(404, "Evaluado no encontrado en este trabajo.")
+    report = cache_get(f"report:{job_id}:{index}")
+    if report is None:
+        if index in job["ready"]:
+            raise HTTPException(404, "Este reporte expiró. Vuelve a generar los reportes.")
+        raise HTTPException(409, "El reporte de este evaluado aún no está listo.")
+    return FastJSONResponse(report)
+
+
+@router.get("/reports/jobs/{job_id}/stream")
+async def report_job_stream(job_id: str):
+    """
+    Every report of the job as NDJSON (one JSON object per line, with its
+    "index"), sent as each one is ready; ends when the job does.
+    """
+    _job(job_id)
+
+    async def lines() -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            job = cache_get(f"report-job:{job_id}")
+            if not job:
+                return
+            for index in job["ready"][sent:]:
+                report = cache_get(f"report:{job_id}:{index}")
+                if report is not None:
+                    yield dumps({"index": index, **report}) + b"\n"
+            sent = len(job["ready"])
+            if job["status"] in ("done", "error"):
+                if job["status"] == "error":
+                    yield dumps({"error": job.get("error")}) + b"\n"
+                return
+            await asyncio.sleep(_STREAM_POLL)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+describe("evalplatform_report_jobs_total", "Per-evaluee report jobs by outcome.")
+describe("evalplatform_report_job_seconds", "Duration of completed per-evaluee report jobs.")
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.core.executors import run_blocking
+from app.core.memory import admit
+from app.core.metrics import span
+from app.core.responses import FastJSONResponse
+from app.services.analyses import tokenize_estimate
+from app.services.frames import get_file_meta, load_df
+from app.services.rollups import default_dimensions, rollup_cube
+
+router = APIRouter()
+
+
+class RollupQueryRequest(BaseModel):
+    file_id: str
+    pregunta_column: str
+    respuesta_column: str
+    # Dimensions of the rollup; None = the question column, DEPARTAMENTO and
+    # EVALUADO (those the file has). Each distinct list is its own rollup.
+    dimensions: Optional[List[str]] = None
+    # Dimension → accepted values, e.g. {"DEPARTAMENTO": ["Lenguas"]}
+    filters: Optional[Dict[str, List[str]]] = None
+    # Dimensions to break the result down by; none = one overall group
+    group_by: Optional[List[str]] = None
+
+
+@router.post("/rollups/query")
+async def query_rollup(req: RollupQueryRequest):
+    """
+    Roll up or drill down a file by question, department and evaluee (or
+    the requested dimensions): means, 1-5 distributions, response counts
+    and sentiment tallies per group, summed from precomputed cells instead
+    of scanning the rows.
+    """
+    meta = get_file_meta(req.file_id)
+    df = await load_df(meta, req.file_id)
+
+    dims = req.dimensions or default_dimensions(df, req.pregunta_column)
+    for column in [req.respuesta_column, *dims]:
+        if column not in df.columns:
+            raise HTTPException(400, f"Columna '{column}' no existe")
+    if len(set(dims)) != len(dims):
+        raise HTTPException(400, "Hay dimensiones repetidas.")
+    outside = [c for c in [*(req.filters or {}), *(req.group_by or [])] if c not in dims]
+    if outside:
+        raise HTTPException(
+            400,
+            f"Solo se puede filtrar o agrupar por las dimensiones del rollup "
+            f"({', '.join(dims)}); no por: {', '.join(outside)}",
+        )
+
+    # Building the cube tokenizes the response column (its text tallies)
+    with admit("rollups", tokenize_estimate(df, req.file_id, req.respuesta_column)):
+        with span("rollup"):
+            cube = await run_blocking(rollup_cube, df, req.file_id, dims, req.respuesta_column)
+    with span("analyze"):
+        groups = await run_blocking(cube.query, req.filters, req.group_by)
+
+    return FastJSONResponse({
+        "groups": groups,
+        "config": {
+            "file": meta["filename"],
+            "dimensions": dims,
+            "respuesta_column": req.respuesta_column,
+            "filters": req.filters or {},
+            "group_by": req.group_by or [],
+            "cells": len(cube.cell_codes),
+        },
+    })
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.memory import admit
+from app.core.metrics import span
+from app.core.responses import FastJSONResponse
+from app.core.singleflight import fingerprint, single_flight
+from app.services.analyses import tokenize_estimate
+from app.services.frames import get_file_meta, load_df
+from app.services.indexes import filter_mask
+from app.services.text_features import column_features
+from app.services.topics import MAX_TOPICS, MIN_TOPICS, find_topics
+
+np = lazy_import("numpy")
+
+router = APIRouter()
+
+
+class TopicsRequest(BaseModel):
+    file_id: str
+    response_column: str
+    filters: Optional[Dict[str, List[str]]] = None
+    n_topics: int = 8
+
+
+async def _topics_result(req: TopicsRequest, meta: dict) -> dict:
+    df = await load_df(meta, req.file_id)
+    if req.response_column not in df.columns:
+        raise HTTPException(400, f"Columna '{req.response_column}' no existe")
+
+    with span("filter"):
+        mask = filter_mask(df, req.file_id, req.filters, not_null=req.response_column)
+        rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+    if not len(rows):
+        raise HTTPException(400, "No hay respuestas con los filtros seleccionados.")
+
+    with admit("topics", tokenize_estimate(df, req.file_id, req.response_column)):
+        with span("tokenize"):
+            features = await run_blocking(column_features, df, req.file_id, req.response_column)
+        with span("analyze"):
+            result = await run_blocking(find_topics, features, rows, df[req.response_column], req.n_topics)
+
+    result["config"] = {
+        "file": meta["filename"],
+        "response_column": req.response_column,
+        "filters": req.filters or {},
+        "n_topics": req.n_topics,
+        "total_rows_after_filter": len(rows),
+    }
+    return result
+
+
+@router.post("/topics")
+async def topics(req: TopicsRequest):
+    """
+    Group the comments of a column (after filters) into topics: per topic,
+    its size, top terms, most representative comments and sentiment.
+    Results are cached per file content, column, filters and topic count.
+    """
+    if not MIN_TOPICS <= req.n_topics <= MAX_TOPICS:
+        raise HTTPException(400, f"n_topics debe estar entre {MIN_TOPICS} y {MAX_TOPICS}.")
+    meta = get_file_meta(req.file_id)
+
+    key = fingerprint("topics", meta.get("content_hash") or meta.get("rows"), req.model_dump())
+    result = cache_get(f"topics:{key}")
+    if result is None:
+        async def compute() -> dict:
+            computed = await _topics_result(req, meta)
+            cache_set(f"topics:{key}", computed, ttl=settings.CACHE_TTL_ANALYSIS)
+            return computed
+
+        result = await single_flight(
+            key, compute, route="topics", stored=lambda: cache_get(f"topics:{key}")
+        )
+    return FastJSONResponse(result)
@@ -1,14 +1,28 @@
+from __future__ import annotations
+
 import asyncio
+import hashlib
 import os
+import time
 import uuid
-from functools import partial
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
 
-import pandas as pd
 from fastapi import APIRouter, File, HTTPException, UploadFile
 
-from app.core.cache import cache_set
+from app.core.cache import cache_delete, cache_get, cache_lock, cache_set, cache_unlock
 from app.core.config import settings
+from app.core.executors import PoolSaturated, run_blocking
+from app.core.lazy import lazy_import
+from app.core.metrics import add_rows, span
 from app.core.storage import save_file
+from app.services.frames import check_schema, load_frame, remember_frame, stack_rows
+from app.services.indexes import MAX_LISTED_VALUES
+from app.services.ingest import ingest_progress, read_table
+from app.services.shared_frames import share_frame
+from app.services.warmup import schedule_warmup, wait_for_warmup
+
+pd = lazy_import("pandas")
 
 router = APIRouter()
 
@@ -17,13 +31,6 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
-def _parse_file(filepath: str, ext: str) -> pd.DataFrame:
-    """Load a CSV or Excel file (runs in a thread pool, not the event loop)."""
-    if ext == ".csv":
-        return pd.read_csv(filepath, low_memory=False)
-    return pd.read_excel(filepath)
-
-
 def _build_columns_info(df: pd.DataFrame) -> list:
     result = []
     for col in df.columns:
@@ -35,7 +42,7 @@ def _build_columns_info(df: pd.DataFrame) -> list:
             "unique_count": nunique,
             "total_count": int(df[col].count()),
         }
-        if nunique <= 200:
+        if nunique <= MAX_LISTED_VALUES:
             info["unique_values"] = sorted(
                 [str(v) for v in df[col].dropna().unique().tolist()]
             )
@@ -43,16 +50,12 @@ def _build_columns_info(df: pd.DataFrame) -> list:
     return result
 
 
-# ── Route ─────────────────────────────────────────────────────────────────────
-
-@router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    # Validate extension
+async def _read_upload(file: UploadFile):
+    """Validate extension and size of an uploaded file → (contents, size_mb)."""
     ext = os.path.splitext(file.filename or "")[1].lower()
     if ext not in (".xlsx", ".csv"):
         raise HTTPException(400, "Solo se aceptan archivos .xlsx o .csv")
 
-    # Read & validate size
     contents = await file.read()
     size_mb = len(contents) / (1024 * 1024)
     if size_mb > settings.MAX_FILE_SIZE_MB:
@@ -60,24 +63,85 @@ async def upload_file(file: UploadFile = File(...)):
             400,
             f"Archivo muy grande ({size_mb:.1f} MB). Máximo: {settings.MAX_FILE_SIZE_MB} MB",
         )
+    return contents, size_mb
+
+
+async def _parse_saved(filepath: str, upload_id: Optional[str] = None) -> Tuple[pd.DataFrame, dict]:
+    """Parse a just-saved upload → (df, ingest report); on failure delete it and answer 400."""
+    try:
+        with span("parse"):
+            return await run_blocking(read_table, filepath, upload_id)
+    except PoolSaturated:
+        os.remove(filepath)
+        raise
+    except Exception as exc:
+        os.remove(filepath)
+        raise HTTPException(400, f"Error al leer archivo: {exc}") from exc
+
+
+# Appends to the same file are serialised (segment numbering, metadata update):
+# within a worker by an asyncio lock, across workers by a cache_lock()
+_append_locks: Dict[str, asyncio.Lock] = {}
+
+# Polling interval bounds while another worker appends to the file (seconds)
+_POLL_MIN = 0.05
+_POLL_MAX = 1.0
+
+
+@asynccontextmanager
+async def _appending(file_id: str) -> AsyncIterator[None]:
+    """Hold *file_id*'s append lock in this worker and across workers."""
+    async with _append_locks.setdefault(file_id, asyncio.Lock()):
+        key = f"lock:append:{file_id}"
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_LOCK_SECONDS
+        delay = _POLL_MIN
+        while True:
+            token = cache_lock(key, ttl=settings.SINGLE_FLIGHT_LOCK_SECONDS)
+            if token:
+                break
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    409,
+                    "Hay otra carga de respuestas en curso para este archivo. "
+                    "Intenta de nuevo en unos segundos.",
+                    headers={"Retry-After": "10"},
+                )
+            await asyncio.sleep(delay)
+            delay = min(_POLL_MAX, delay * 2)
+        try:
+            yield
+        finally:
+            cache_unlock(key, token)
+
+
+# ── Routes ────────────────────────────────────────────────────────────────────
+
+@router.post("/upload")
+async def upload_file(file: UploadFile = File(...), upload_id: Optional[str] = None):
+    """
+    Upload a CSV / Excel file. Pass any unique *upload_id* to follow the
+    parse with GET /uploads/{upload_id}/progress while this request runs.
+    """
+    # Validate extension & size
+    contents, size_mb = await _read_upload(file)
 
     # Persist to disk (and to S3 if configured)
     file_id = str(uuid.uuid4())[:8]
     safe_name = f"{file_id}_{file.filename}"
     filepath = os.path.join(settings.UPLOAD_DIR, safe_name)
-    save_file(filepath, contents, file_id)
+    with span("storage"):
+        save_file(filepath, contents, file_id)
 
     # Parse in a thread pool so we don't block the event loop.
-    # pd.read_excel on a 70 K-row file can take several seconds —
-    # without run_in_executor that would stall every other concurrent request.
-    loop = asyncio.get_event_loop()
-    try:
-        df = await loop.run_in_executor(None, partial(_parse_file, filepath, ext))
-    except Exception as exc:
-        os.remove(filepath)
-        raise HTTPException(400, f"Error al leer archivo: {exc}") from exc
+    # Reading a 70 K-row Excel file can take several seconds —
+    # without run_blocking that would stall every other concurrent request.
+    df, ingest = await _parse_saved(filepath, upload_id)
+    add_rows(len(df))
+    # Keep the parsed frame so the first analysis doesn't parse it again
+    remember_frame(file_id, df)
 
-    columns_info = _build_columns_info(df)
+    with span("profile"):
+        columns_info = _build_columns_info(df)
 
     file_meta = {
         "file_id": file_id,
@@ -86,10 +150,109 @@ async def upload_file(file: UploadFile = File(...)):
         "size_mb": round(size_mb, 2),
         "rows": len(df),
         "columns": columns_info,
+        # Part of every analysis id (GET /analyses/{id})
+        "content_hash": hashlib.sha256(contents).hexdigest(),
     }
 
     # Store metadata in shared cache so all workers can find it.
     # Key is namespaced ("file:<id>") to avoid collisions.
     cache_set(f"file:{file_id}", file_meta, ttl=settings.CACHE_TTL_FILES)
+    # Other workers attach to the parsed frame instead of parsing the file
+    share_frame(file_id, df)
+    # Indexes + tokenized text of the likely columns, while the user maps columns
+    schedule_warmup(file_id, df, columns_info)
+
+    return {**file_meta, "ingest": ingest}
+
+
+@router.get("/uploads/{upload_id}/progress")
+async def upload_progress(upload_id: str):
+    """Parse progress of an upload started with ?upload_id=… (rows read so far)."""
+    progress = ingest_progress(upload_id)
+    if progress is None:
+        raise HTTPException(404, "No hay una carga en curso con ese identificador.")
+    return progress
+
+
+@router.post("/files/{file_id}/append")
+async def append_rows(file_id: str, file: UploadFile = File(...)):
+    """
+    Add a new wave of responses (same columns) to an uploaded file.
+    Analyses already computed for the file are updated with the new rows
+    only the next time they are requested.
+    """
+    contents, size_mb = await _read_upload(file)
+
+    async with _appending(file_id):
+        # Artifacts must not be built from the pre-append frame behind our back
+        await wait_for_warmup(file_id)
+        # Read under the lock: another worker's append may just have updated it
+        meta = cache_get(f"file:{file_id}")
+        if not meta:
+            raise HTTPException(
+                404,
+                "Archivo no encontrado. Es posible que haya expirado — vuelve a subirlo.",
+            )
+        try:
+            df = await load_frame(meta, file_id)
+        except FileNotFoundError:
+            raise HTTPException(
+                404,
+                "Archivo no encontrado en el servidor. "
+                "Si fue subido hace más de 2 horas vuelve a cargarlo.",
+            )
+
+        segments = list(meta.get("segments", []))
+        safe_name = f"{file_id}_append{len(segments) + 1}_{file.filename}"
+        filepath = os.path.join(settings.UPLOAD_DIR, safe_name)
+        with span("storage"):
+            save_file(filepath, contents, file_id)
+
+        new_rows, ingest = await _parse_saved(filepath)
+        add_rows(len(new_rows))
+
+        missing = [str(c) for c in df.columns if c not in new_rows.columns]
+        extra = [str(c) for c in new_rows.columns if c not in df.columns]
+        if missing or extra:
+            os.remove(filepath)
+            detail = []
+            if missing:
+                detail.append(f"faltan: {', '.join(missing)}")
+            if extra:
+                detail.append(f"sobran: {', '.join(extra)}")
+            raise HTTPException(
+                400,
+                "Las columnas no coinciden con el archivo original (" + "; ".join(detail) + ")",
+            )
+
+        with span("append"):
+            combined = await run_blocking(stack_rows, df, new_rows)
+            columns_info = await run_blocking(_build_columns_info, combined)
+
+        if any(combined[c].dtype != df[c].dtype for c in df.columns):
+            # A column changed type (e.g. ints became floats): indexes and
+            # analysis states built on the old spellings can't be extended.
+            # A new schema number makes every worker drop its own
+            meta["schema"] = meta.get("schema", 0) + 1
+            check_schema(meta, file_id)
+        remember_frame(file_id, combined)
+
+        segments.append({"filepath": filepath, "filename": file.filename, "rows": len(new_rows)})
+        if meta.get("content_hash"):
+            # Hash of the previous content chained with the new segment's
+            appended = hashlib.sha256(contents).hexdigest()
+            meta["content_hash"] = hashlib.sha256(
+                (meta["content_hash"] + appended).encode()
+            ).hexdigest()
+        meta.update({
+            "rows": len(combined),
+            "size_mb": round(meta.get("size_mb", 0) + size_mb, 2),
+            "columns": columns_info,
+            "segments": segments,
+        })
+        cache_set(f"file:{file_id}", meta, ttl=settings.CACHE_TTL_FILES)
+        # The cached analysis (used by /ai-summary) no longer covers every row
+        cache_delete(f"analysis:{file_id}")
+        share_frame(file_id, combined)
 
-    return file_meta
+    return {**meta, "appended_rows": len(new_rows), "ingest": ingest}
@@ -0,0 +1,609 @@
+"""
+Running /analyze and /multi-analyze, and keeping their results addressable.
+
+Why this exists:
+  The analysis pipeline — memory admission, the accumulated state reused
+  after appends, the tokenized-column fast path, result ids and the stored
+  results behind GET /analyses/{id} — is shared by several routes: the
+  analyze router runs it, the export router downloads a stored result, the
+  benchmarks time run_multi_analysis(). Keeping it here lets every router
+  import it from a service instead of from another router.
+
+Usage:
+  analysis_id, entry, result = await analysis("multi-analyze", req, meta)
+  entry, result = await stored_result(analysis_id, stored_entry(analysis_id))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.core.artifacts import artifact_drop, artifact_get, artifact_set
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.memory import admit, tracked_footprint
+from app.core.metrics import span
+from app.core.responses import dumps
+from app.core.singleflight import fingerprint, single_flight
+from app.models.analyses import AnalyzeRequest, MultiAnalyzeRequest
+from app.services.comparison import save_aggregates
+from app.services.frames import get_file_meta, load_df
+from app.services.indexes import MAX_LISTED_VALUES, filter_index, filter_mask, question_partition
+from app.services.near_duplicates import column_near_duplicates
+from app.services.quantitative_analyzer import GroupedQuantAccumulator, QuantAccumulator
+from app.services.text_analyzer import GroupedTextAccumulator, KnownNames, TextAccumulator, extract_known_names
+from app.services.text_features import column_features, qualitative_from_features
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+def _check_collapse(collapse_near_duplicates: bool, approximate_ngrams: bool) -> None:
+    if collapse_near_duplicates and approximate_ngrams:
+        raise HTTPException(
+            400, "collapse_near_duplicates no se puede combinar con approximate_ngrams."
+        )
+
+
+# ── Memory admission ───────────────────────────────────────────────────────────
+#
+# Before an analysis allocates anything its working memory is estimated from
+# the rows it will touch and checked against the worker's budget (see
+# app.core.memory): over budget, an exact analysis falls back to
+# approximate_ngrams — responses streamed STREAM_CHUNK_ROWS at a time through
+# bounded n-gram sketches, no tokenized column to build — or is turned away.
+# Bytes per row are peak RSS growth measured on 700k-row evaluation files,
+# rounded up.
+
+# Tokenizing a response column (TextFeatures), per row not tokenized yet
+_TOKENIZE_BYTES_PER_ROW = 700
+# Clustering a column's near-duplicates, per row not clustered yet
+_DEDUP_BYTES_PER_ROW = 300
+# Analyzing the selected rows as row selections of the tokenized column, on
+# top of a copy of the rows themselves
+_EXACT_BYTES_PER_ROW = 150
+# Streaming rows through accumulators: per row of the slice in flight, and
+# what a text accumulator keeps per row it has seen — up to its two n-gram
+# sketches' NGRAM_SKETCH_CAPACITY entries, once they're full
+_STREAMED_BYTES_PER_ROW = 500
+_STREAMED_KEPT_BYTES_PER_ROW = 2000
+_SKETCH_ENTRY_BYTES = 260
+# Rows handed to the accumulators at a time
+STREAM_CHUNK_ROWS = 50_000
+# Each group's result of each question, with group_by
+_GROUP_RESULT_BYTES = 4000
+
+
+def _pending_rows(file_id: str, name: Tuple, n_rows: int) -> int:
+    """Rows of the file the artifact *name* would still have to process."""
+    artifact = artifact_get(file_id, name)
+    if artifact is None or artifact.n_rows > n_rows:
+        return n_rows
+    return n_rows - artifact.n_rows
+
+
+def tokenize_estimate(df: pd.DataFrame, file_id: str, column: str) -> int:
+    """
+    Working memory (bytes) of getting *column*'s TextFeatures up to date —
+    for any route that needs the tokenized column (topics, exports, rollups).
+    """
+    return _pending_rows(file_id, ("text_features", column), len(df)) * _TOKENIZE_BYTES_PER_ROW
+
+
+def search_estimate(df: pd.DataFrame, file_id: str, column: str, selected: int) -> int:
+    """
+    Working memory (bytes) of a /drilldown search of *selected* rows: the
+    column's TextFeatures brought up to date when this process built them
+    (see built_features), otherwise a copy of the responses it scans.
+    """
+    features = artifact_get(file_id, ("text_features", column))
+    if features is None or features.n_rows > len(df):
+        return int(selected * tracked_footprint(df) / max(1, len(df)))
+    return tokenize_estimate(df, file_id, column)
+
+
+def _memory_estimates(df: pd.DataFrame, file_id: str, column: str, selected: int,
+                      texts: List[int], group_by: Optional[str], results: int,
+                      approximate: bool, collapse: bool) -> Tuple[int, Optional[int]]:
+    """
+    Working-memory estimates (bytes) of an analysis of *selected* rows of
+    the text *column* producing *results* results (questions), each split
+    by *group_by*; *texts* holds the rows of each text result. As
+    requested, and in approximate mode — None when it already is
+    approximate or can't be (collapse_near_duplicates).
+    """
+    row_bytes = tracked_footprint(df) / max(1, len(df))
+    groups = group_bytes = 0
+    if group_by and group_by in df.columns:
+        # Distinct values per the filter index; unlisted columns have more than it lists
+        groups = len(filter_index(df, file_id).postings.get(group_by) or ()) or MAX_LISTED_VALUES
+        group_bytes = groups * results * _GROUP_RESULT_BYTES
+    # One text accumulator per result plus one per group, rows evenly spread among groups
+    sketches = 2 * settings.NGRAM_SKETCH_CAPACITY * _SKETCH_ENTRY_BYTES
+    kept = sum(
+        min(n * _STREAMED_KEPT_BYTES_PER_ROW, sketches)
+        + groups * min(n // max(1, groups) * _STREAMED_KEPT_BYTES_PER_ROW, sketches)
+        for n in texts
+    )
+    in_flight = min(selected, STREAM_CHUNK_ROWS)
+    streamed = int(group_bytes + kept + in_flight * (row_bytes + _STREAMED_BYTES_PER_ROW))
+    if approximate:
+        return streamed, None
+    estimate = int(group_bytes + selected * (row_bytes + _EXACT_BYTES_PER_ROW))
+    estimate += tokenize_estimate(df, file_id, column)
+    if collapse:
+        name = ("near_duplicates", column, settings.NEAR_DUPLICATE_THRESHOLD)
+        return estimate + _pending_rows(file_id, name, len(df)) * _DEDUP_BYTES_PER_ROW, None
+    return estimate, streamed
+
+
+# Analysis states kept per file: the most recently used request shapes
+MAX_ANALYSIS_STATES = 8
+
+
+class _AnalysisState:
+    """
+    Accumulated analyzer state for one analysis request shape on one file.
+
+    Kept in the artifact store under a fingerprint of the request (for the
+    MAX_ANALYSIS_STATES most recently used shapes of the file), it covers
+    the first ``rows`` rows of the file; after rows are appended only the new
+    ones are analyzed and merged in. ``known_names`` is part of the state: if
+    new rows bring new evaluees, name detection changes and the state is
+    rebuilt from scratch.
+    """
+
+    def __init__(self, known_names: Optional[KnownNames]):
+        self.known_names = known_names
+        self.rows = 0          # rows of the file already analyzed
+        self.matched = 0       # of those, rows that passed the filters
+        self.parts: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+
+_states_lock = threading.Lock()
+
+
+def _analysis_state(file_id: str, kind: str, request: Dict[str, Any], n_rows: int,
+                    known_names: Optional[KnownNames]) -> _AnalysisState:
+    """Reusable state for *request* on *file_id*, or a fresh one."""
+    name = ("analysis_state", kind, json.dumps(request, sort_keys=True, default=str))
+    with _states_lock:
+        # Every filter combination is a shape of its own: only the recent ones stay
+        names = artifact_get(file_id, "analysis_states")
+        if names is None:
+            names = OrderedDict()
+            artifact_set(file_id, "analysis_states", names)
+        names[name] = None
+        names.move_to_end(name)
+        while len(names) > MAX_ANALYSIS_STATES:
+            artifact_drop(file_id, names.popitem(last=False)[0])
+    state = artifact_get(file_id, name)
+    if (
+        state is None
+        or state.rows > n_rows
+        # same names in the same order (extract_names reports in that order)
+        or list(state.known_names or ()) != list(known_names or ())
+    ):
+        state = _AnalysisState(known_names)
+        artifact_set(file_id, name, state)
+    return state
+
+
+def _new_rows(state: _AnalysisState, n_rows: int, mask: Optional[np.ndarray]) -> np.ndarray:
+    """Positions of the rows not yet in *state* that pass *mask*."""
+    rows = np.arange(state.rows, n_rows)
+    return rows if mask is None else rows[mask[state.rows:n_rows]]
+
+
+def _chunks(rows: np.ndarray) -> Iterator[np.ndarray]:
+    """*rows* in slices of STREAM_CHUNK_ROWS, so the accumulators see one slice's responses at a time."""
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        yield rows[start:start + STREAM_CHUNK_ROWS]
+
+
+def _ngram_capacity(approximate: bool) -> Optional[int]:
+    return settings.NGRAM_SKETCH_CAPACITY if approximate else None
+
+
+def _run_qualitative(df, response_col, group_by, known_names, mask=None, state=None,
+                     approximate_ngrams=False):
+    """
+    Synchronous qualitative analysis (called inside run_blocking).
+    Only rows *state* hasn't seen yet are analyzed; *mask* selects the rows
+    that pass the filters and have a response.
+    """
+    capacity = _ngram_capacity(approximate_ngrams)
+    state = state or _AnalysisState(known_names)
+    with state.lock:
+        grouped = bool(group_by and group_by in df.columns)
+        if "general" not in state.parts:
+            state.parts["general"] = TextAccumulator(known_names, capacity)
+        if grouped and "by_group" not in state.parts:
+            state.parts["by_group"] = GroupedTextAccumulator(known_names, capacity)
+
+        for chunk in _chunks(_new_rows(state, len(df), mask)):
+            responses = df[response_col].iloc[chunk].astype(str).tolist()
+            state.parts["general"].add(responses)
+            if grouped:
+                state.parts["by_group"].add(responses, df[group_by].iloc[chunk].astype(str).tolist())
+            state.matched += len(responses)
+
+        state.rows = len(df)
+
+        general = state.parts["general"].result()
+        by_group = state.parts["by_group"].result() if "by_group" in state.parts else None
+        return general, by_group, state.matched
+
+
+def run_multi_analysis(df, req_dict, partition, mask=None, state=None, features=None,
+                        near_duplicates=None):
+    """
+    Run all question analyses synchronously.
+    Called via run_blocking so it doesn't block the event loop.
+
+    *df* is the unfiltered frame; *partition* maps each question number to
+    its rows and *mask* (the filter bitmap, None = all rows) restricts them,
+    so every question is a lookup instead of a scan of the whole frame.
+    With a reused *state* only rows appended since it was built are analyzed.
+    With the response column's *features*, qualitative questions are row
+    selections of them instead (collapsed by *near_duplicates*, if given).
+    """
+    respuesta_col = req_dict["respuesta_column"]
+    group_by = req_dict.get("group_by")
+    questions = req_dict["questions"]
+    grouped = bool(group_by and group_by in df.columns)
+    capacity = _ngram_capacity(req_dict.get("approximate_ngrams", False))
+
+    state = state or _AnalysisState(extract_known_names(df, mask))
+    known_names = state.known_names
+    results: List[Dict[str, Any]] = []
+
+    with state.lock:
+        start = state.rows
+        for i, q in enumerate(questions):
+            q_num = str(q["question_number"]).strip()
+            q_type = q["analysis_type"]
+
+            rows = partition.rows(q_num, mask)
+            if q_type == "qualitative" and features is not None:
+                rows = rows[df[respuesta_col].iloc[rows].notna().to_numpy()]
+                q_result = {
+                    "question_number": q_num,
+                    "analysis_type": q_type,
+                    "total_responses": len(rows),
+                    "quantitative": None,
+                    "qualitative": None,
+                    "by_group": None,
+                }
+                if len(rows):
+                    q_result[q_type] = features.analyze(
+                        rows, df[respuesta_col], known_names, near_duplicates
+                    )
+                    if grouped:
+                        groups = df[group_by].iloc[rows].astype(str).tolist()
+                        q_result["by_group"] = features.analyze_by_group(
+                            rows, df[respuesta_col], groups, known_names, near_duplicates
+                        )
+                results.append(q_result)
+                continue
+
+            rows = rows[np.searchsorted(rows, start):]  # only rows not analyzed yet
+            rows = rows[df[respuesta_col].iloc[rows].notna().to_numpy()]
+
+            key = f"{i}:{q_num}:{q_type}"
+            if key not in state.parts:
+                if q_type == "qualitative":
+                    state.parts[key] = (
+                        TextAccumulator(known_names, capacity),
+                        GroupedTextAccumulator(known_names, capacity) if grouped else None,
+                    )
+                else:
+                    state.parts[key] = (
+                        QuantAccumulator(),
+                        GroupedQuantAccumulator() if grouped else None,
+                    )
+            acc, group_acc = state.parts[key]
+            for chunk in _chunks(rows):
+                responses = df[respuesta_col].iloc[chunk].astype(str).tolist()
+                acc.add(responses)
+                if group_acc is not None:
+                    group_acc.add(responses, df[group_by].iloc[chunk].astype(str).tolist())
+
+            q_result: Dict[str, Any] = {
+                "question_number": q_num,
+                "analysis_type": q_type,
+                "total_responses": acc.total,
+                "quantitative": None,
+                "qualitative": None,
+                "by_group": None,
+            }
+            if acc.total and q_type in ("quantitative", "qualitative"):
+                q_result[q_type] = acc.result()
+                if group_acc is not None:
+                    q_result["by_group"] = group_acc.result()
+
+            results.append(q_result)
+
+        state.rows = len(df)
+
+    return results
+
+
+async def _analysis_result(req: AnalyzeRequest, meta: dict) -> Dict[str, Any]:
+    """Full /analyze result, computed."""
+    _check_collapse(req.collapse_near_duplicates, req.approximate_ngrams)
+    df = await load_df(meta, req.file_id)
+
+    if req.response_column not in df.columns:
+        raise HTTPException(400, f"Columna '{req.response_column}' no existe")
+
+    with span("filter"):
+        mask = filter_mask(df, req.file_id, req.filters, not_null=req.response_column)
+
+    if not (len(df) if mask is None else mask.any()):
+        raise HTTPException(400, "No hay respuestas con los filtros seleccionados.")
+
+    known_names = extract_known_names(df, mask)
+    selected = len(df) if mask is None else int(mask.sum())
+    estimate, fallback = _memory_estimates(
+        df, req.file_id, req.response_column, selected, [selected],
+        req.group_by, 1, req.approximate_ngrams, req.collapse_near_duplicates,
+    )
+    with admit("analyze", estimate, fallback) as memory:
+        approximate = req.approximate_ngrams or memory.downgraded
+        if approximate:
+            # Bounded memory: responses stream through n-gram sketches, and the
+            # accumulated state is kept so only rows appended since the last
+            # identical request are analyzed next time
+            state = _analysis_state(
+                req.file_id, "analyze",
+                {"response_column": req.response_column, "filters": req.filters,
+                 "group_by": req.group_by, "approximate_ngrams": True},
+                len(df), known_names,
+            )
+            with span("analyze"):
+                general, by_group, total_rows = await run_blocking(
+                    _run_qualitative, df, req.response_column, req.group_by, known_names, mask, state,
+                    True,
+                )
+        else:
+            # Tokenized once per file and column; the analysis is row selections
+            with span("tokenize"):
+                features = await run_blocking(column_features, df, req.file_id, req.response_column)
+            dups = None
+            if req.collapse_near_duplicates:
+                with span("dedup"):
+                    dups = await run_blocking(column_near_duplicates, df, req.file_id, req.response_column)
+            with span("analyze"):
+                general, by_group, total_rows = await run_blocking(
+                    qualitative_from_features,
+                    df, features, req.response_column, req.group_by, known_names, mask, dups,
+                )
+
+    result = {
+        "general": general,
+        "by_group": by_group,
+        "config": {
+            "file": meta["filename"],
+            "response_column": req.response_column,
+            "filters": req.filters or {},
+            "group_by": req.group_by,
+            "collapse_near_duplicates": req.collapse_near_duplicates,
+            "total_rows_after_filter": total_rows,
+            "memory": memory.report(),
+        },
+    }
+
+    return result
+
+
+async def _multi_analysis_result(req: MultiAnalyzeRequest, meta: dict) -> Dict[str, Any]:
+    """Full /multi-analyze result, computed."""
+    _check_collapse(req.collapse_near_duplicates, req.approximate_ngrams)
+    df = await load_df(meta, req.file_id)
+
+    if req.pregunta_column not in df.columns:
+        raise HTTPException(400, f"Columna '{req.pregunta_column}' no existe")
+    if req.respuesta_column not in df.columns:
+        raise HTTPException(400, f"Columna '{req.respuesta_column}' no existe")
+
+    with span("filter"):
+        mask = filter_mask(df, req.file_id, req.filters)
+        partition = question_partition(df, req.file_id, req.pregunta_column)
+
+    # Run all question analyses in a single thread-pool call to avoid
+    # repeated executor overhead and keep pandas operations serialised.
+    qualitative = any(q.analysis_type == "qualitative" for q in req.questions)
+    selected = {
+        n: len(partition.rows(n, mask))
+        for n in dict.fromkeys(str(q.question_number).strip() for q in req.questions)
+    }
+    estimate, fallback = _memory_estimates(
+        df, req.file_id, req.respuesta_column, sum(selected.values()),
+        [selected[str(q.question_number).strip()] for q in req.questions if q.analysis_type == "qualitative"],
+        req.group_by, len(req.questions), req.approximate_ngrams or not qualitative,
+        req.collapse_near_duplicates,
+    )
+    with admit("multi-analyze", estimate, fallback) as memory:
+        req_dict = {
+            "pregunta_column": req.pregunta_column,
+            "respuesta_column": req.respuesta_column,
+            "group_by": req.group_by,
+            "questions": [q.model_dump() for q in req.questions],
+            "approximate_ngrams": req.approximate_ngrams or memory.downgraded,
+        }
+        state = _analysis_state(
+            req.file_id, "multi-analyze", {**req_dict, "filters": req.filters},
+            len(df), extract_known_names(df, mask),
+        )
+        features = dups = None
+        if not req_dict["approximate_ngrams"] and qualitative:
+            with span("tokenize"):
+                features = await run_blocking(column_features, df, req.file_id, req.respuesta_column)
+            if req.collapse_near_duplicates:
+                with span("dedup"):
+                    dups = await run_blocking(column_near_duplicates, df, req.file_id, req.respuesta_column)
+        with span("analyze"):
+            questions_results = await run_blocking(
+                run_multi_analysis, df, req_dict, partition, mask, state, features, dups
+            )
+
+    result = {
+        "questions": questions_results,
+        "config": {
+            "file": meta["filename"],
+            "pregunta_column": req.pregunta_column,
+            "respuesta_column": req.respuesta_column,
+            "questions_config": [q.model_dump() for q in req.questions],
+            "filters": req.filters or {},
+            "group_by": req.group_by,
+            "collapse_near_duplicates": req.collapse_near_duplicates,
+            "total_rows": len(df) if mask is None else int(mask.sum()),
+            "memory": memory.report(),
+        },
+    }
+
+    return result
+
+
+# ── Addressable results ────────────────────────────────────────────────────────
+#
+# Every computed /analyze and /multi-analyze result gets an id derived from
+# its inputs: the route, the request body and the file's content hash. The
+# result is kept in the cache under that id ("analyses-body:<id>", with the
+# request and an ETag of the result under "analyses:<id>") and served by
+# GET /analyses/{id}, so revisiting a dashboard or report is a conditional
+# GET — 304 — instead of a recompute. A POST whose result is still cached
+# returns it without recomputing too.
+
+_REQUEST_MODELS = {"analyze": AnalyzeRequest, "multi-analyze": MultiAnalyzeRequest}
+
+
+def _analysis_id(route: str, req: BaseModel, meta: dict) -> str:
+    """
+    Stable id of *req* on the file described by *meta*. `fields` is left
+    out — it only shapes each caller's response. Files uploaded before
+    content hashes were recorded fall back to their row count.
+    """
+    version = meta.get("content_hash") or meta.get("rows")
+    return fingerprint(route, version, req.model_dump(exclude={"fields"}))[:32]
+
+
+def _content_tag(result: Dict[str, Any]) -> str:
+    """
+    Strong validator of a result: hash of its JSON encoding, leaving out
+    the memory measurements (they differ between two runs of the same analysis).
+    """
+    config = {k: v for k, v in result["config"].items() if k != "memory"}
+    return hashlib.sha256(dumps({**result, "config": config})).hexdigest()[:32]
+
+
+def _remember_latest(file_id: str, result: Dict[str, Any]) -> None:
+    """Make *result* the file's latest analysis (for /ai-summary)."""
+    # Cache for AI summary reuse (always the full result)
+    cache_set(f"analysis:{file_id}", result, ttl=settings.CACHE_TTL_ANALYSIS)
+
+
+async def _save_aggregates(route: str, req: BaseModel, result: Dict[str, Any]) -> None:
+    """
+    Store the compact aggregates /compare reads (one per kind and file) —
+    only from unfiltered analyses: they describe the whole upload, and a
+    filtered view the user opens later doesn't replace them.
+    """
+    if req.filters:
+        return
+    with span("storage"):
+        await run_blocking(save_aggregates, req.file_id, route, result, pool="io")
+
+
+async def _compute(route: str, req: BaseModel, meta: dict, analysis_id: str) -> Dict[str, Any]:
+    """Compute *req* and store the result under *analysis_id* → {"entry", "result"}."""
+    compute = _analysis_result if route == "analyze" else _multi_analysis_result
+    result = await compute(req, meta)
+    with span("etag"):
+        etag = await run_blocking(_content_tag, result)
+    entry = {
+        "route": route,
+        "file_id": req.file_id,
+        "request": req.model_dump(exclude={"fields"}),
+        "etag": etag,
+    }
+    # The id outlives the result: an expired result is recomputed on GET
+    cache_set(f"analyses:{analysis_id}", entry, ttl=settings.CACHE_TTL_FILES)
+    # A result downgraded for lack of memory is only kept briefly, for the
+    # identical requests arriving meanwhile: after that the next one
+    # computes it as asked
+    downgraded = result["config"]["memory"]["downgraded"]
+    cache_set(
+        f"analyses-body:{analysis_id}", result,
+        ttl=settings.SINGLE_FLIGHT_RESULT_SECONDS if downgraded else settings.CACHE_TTL_ANALYSIS,
+    )
+    # Computed once per id (single_flight): stored results served later
+    # were already saved when they were computed
+    await _save_aggregates(route, req, result)
+    _remember_latest(req.file_id, result)
+    return {"entry": entry, "result": result}
+
+
+async def analysis(route: str, req: BaseModel, meta: dict) -> Tuple[str, dict, Dict[str, Any]]:
+    """(id, entry, full result) of *req* — the stored result, or a fresh computation."""
+    analysis_id = _analysis_id(route, req, meta)
+    stored = _stored(analysis_id)
+    if stored is not None:
+        _remember_latest(req.file_id, stored["result"])
+        return analysis_id, stored["entry"], stored["result"]
+    # Identical requests in flight (a shared report link) share one
+    # computation; other workers read its stored entry and result
+    computed = await single_flight(
+        analysis_id, lambda: _compute(route, req, meta, analysis_id), route=route,
+        stored=lambda: _stored(analysis_id),
+    )
+    return analysis_id, computed["entry"], computed["result"]
+
+
+def _stored(analysis_id: str) -> Optional[Dict[str, Any]]:
+    """{"entry", "result"} of *analysis_id* as _compute() stored them, or None."""
+    entry = cache_get(f"analyses:{analysis_id}")
+    result = cache_get(f"analyses-body:{analysis_id}") if entry else None
+    return {"entry": entry, "result": result} if result is not None else None
+
+
+def stored_entry(analysis_id: str) -> dict:
+    """The stored request and ETag of *analysis_id*, or 404."""
+    entry = cache_get(f"analyses:{analysis_id}")
+    if not entry:
+        raise HTTPException(
+            404,
+            "Análisis no encontrado. Es posible que haya expirado — vuelve a ejecutarlo.",
+        )
+    return entry
+
+
+async def stored_result(analysis_id: str, entry: dict) -> Tuple[dict, Dict[str, Any]]:
+    """
+    (entry, full result) of *analysis_id*. A result that expired before its
+    id is computed again from the stored request — 404 if the file changed.
+    """
+    result = cache_get(f"analyses-body:{analysis_id}")
+    if result is not None:
+        return entry, result
+    route = entry["route"]
+    meta = get_file_meta(entry["file_id"])
+    req = _REQUEST_MODELS[route](**entry["request"])
+    if _analysis_id(route, req, meta) != analysis_id:
+        raise HTTPException(
+            404,
+            "El archivo cambió desde este análisis — vuelve a ejecutarlo.",
+        )
+    _, entry, result = await analysis(route, req, meta)
+    return entry, result
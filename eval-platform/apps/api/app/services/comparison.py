@@ -0,0 +1,243 @@
+"""
+Cross-period comparison over compact per-file aggregates.
+
+Every unfiltered /analyze and /multi-analyze computation stores a small
+summary of its result next to the upload (and in S3 when configured): per
+question the mean and 1-5 distribution, sentiment counts and top terms,
+overall and per department (a stored result served again isn't re-saved).
+compare_aggregates() lines up N of those summaries — e.g. one upload per
+semester, oldest first — and computes deltas, department rank changes and
+new / disappeared terms without reloading any raw file.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.storage import ensure_local, save_file
+
+AGGREGATE_KINDS = ("analyze", "multi-analyze")
+MAX_TERMS = 20  # top terms kept per question / department
+
+
+# ── Summaries ─────────────────────────────────────────────────────────────────
+
+def _quant_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    summary = result["summary"]
+    return {
+        "valid": summary["valid"],
+        "mean": summary["mean"],
+        "distribution": {k: v["count"] for k, v in result["distribution"].items()},
+    }
+
+
+def _qual_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    if "summary" not in result:  # {"error": ...} — nothing to analyze
+        return {"valid": 0, "sentiment": {}, "terms": {}}
+    terms = {t["word"]: t["count"] for t in result["top_words"][:MAX_TERMS]}
+    for t in result["top_phrases"][:MAX_TERMS]:
+        terms[t["phrase"]] = t["count"]
+    return {
+        "valid": result["summary"]["valid_responses"],
+        "sentiment": dict(result["sentiment"]),
+        "terms": terms,
+    }
+
+
+def _summary(analysis_type: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    return _quant_summary(result) if analysis_type == "quantitative" else _qual_summary(result)
+
+
+def summarize_multi(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """/multi-analyze result → {question number: aggregate}."""
+    questions = {}
+    for q in result["questions"]:
+        q_type = q["analysis_type"]
+        if q_type not in ("quantitative", "qualitative") or not q[q_type]:
+            continue
+        questions[q["question_number"]] = {
+            "analysis_type": q_type,
+            "total": q["total_responses"],
+            **_summary(q_type, q[q_type]),
+            "by_group": {
+                name: _summary(q_type, group)
+                for name, group in (q["by_group"] or {}).items()
+            },
+        }
+    return questions
+
+
+def summarize_analyze(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """/analyze result → {response column: aggregate} (a single qualitative question)."""
+    config = result["config"]
+    return {
+        config["response_column"]: {
+            "analysis_type": "qualitative",
+            "total": config["total_rows_after_filter"],
+            **_qual_summary(result["general"]),
+            "by_group": {
+                name: _qual_summary(group)
+                for name, group in (result["by_group"] or {}).items()
+            },
+        }
+    }
+
+
+# ── Persistence ───────────────────────────────────────────────────────────────
+
+def _aggregate_path(file_id: str, kind: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "aggregates", f"{file_id}_{kind}.json")
+
+
+def save_aggregates(file_id: str, kind: str, result: Dict[str, Any]) -> None:
+    """
+    Persist the aggregates of the latest unfiltered *kind* analysis of
+    *file_id* (runs in a thread pool).
+    """
+    questions = summarize_multi(result) if kind == "multi-analyze" else summarize_analyze(result)
+    config = {k: v for k, v in result["config"].items() if k != "questions_config"}
+    payload = {
+        "file_id": file_id,
+        "kind": kind,
+        "created_at": time.time(),
+        "config": config,
+        "questions": questions,
+    }
+    content = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    save_file(_aggregate_path(file_id, kind), content, file_id)
+
+
+def load_aggregates(file_id: str, kind: str) -> Optional[Dict[str, Any]]:
+    """Stored aggregates of *file_id*, restored from S3 if needed; None if there are none."""
+    path = _aggregate_path(file_id, kind)
+    if not ensure_local(path, file_id):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+# ── Comparison ────────────────────────────────────────────────────────────────
+
+def _pct(counts: Dict[str, int]) -> Dict[str, float]:
+    total = sum(counts.values())
+    return {k: round(c / total * 100, 1) if total else 0 for k, c in counts.items()}
+
+
+def _delta(a: Dict[str, float], b: Dict[str, float]) -> Dict[str, float]:
+    return {k: round(b.get(k, 0) - a.get(k, 0), 1) for k in sorted(set(a) | set(b))}
+
+
+def _ranks(values: Dict[str, float]) -> Dict[str, int]:
+    """Competition ranking, highest value first (1, 2, 2, 4 …)."""
+    ordered = sorted(values.values(), reverse=True)
+    return {name: ordered.index(v) + 1 for name, v in values.items()}
+
+
+def _term_ranks(terms: Dict[str, int]) -> Dict[str, int]:
+    ordered = sorted(terms.items(), key=lambda t: -t[1])  # stable: keeps stored order on ties
+    return {term: i + 1 for i, (term, _) in enumerate(ordered)}
+
+
+def _point(q: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """One file's figures for one question (or one department)."""
+    if q is None:
+        return None
+    if "mean" in q:
+        return {"valid": q["valid"], "mean": q["mean"], "distribution_pct": _pct(q["distribution"])}
+    return {"valid": q["valid"], "sentiment_pct": _pct(q["sentiment"])}
+
+
+def _step(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Changes between two consecutive files for one question (or department)."""
+    pa, pb = _point(a), _point(b)
+    if "mean" in a:
+        return {
+            "mean": round(b["mean"] - a["mean"], 2),
+            "distribution_pct": _delta(pa["distribution_pct"], pb["distribution_pct"]),
+        }
+
+    ranks_a, ranks_b = _term_ranks(a["terms"]), _term_ranks(b["terms"])
+    return {
+        "sentiment_pct": _delta(pa["sentiment_pct"], pb["sentiment_pct"]),
+        "new_terms": [t for t in ranks_b if t not in ranks_a],
+        "disappeared_terms": [t for t in ranks_a if t not in ranks_b],
+        "term_rank_changes": [
+            {"term": t, "from": ranks_a[t], "to": ranks_b[t], "change": ranks_a[t] - ranks_b[t]}
+            for t in ranks_b
+            if t in ranks_a and ranks_a[t] != ranks_b[t]
+        ],
+    }
+
+
+def _group_score(q: Dict[str, Any]) -> float:
+    """What departments are ranked by: mean score, or % positive for open questions."""
+    if "mean" in q:
+        return q["mean"]
+    return _pct(q["sentiment"]).get("positivo", 0) if q["sentiment"] else 0
+
+
+def _compare_question(file_ids: List[str], entries: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    present = [(fid, e) for fid, e in zip(file_ids, entries) if e is not None]
+    steps = [
+        {"from": fa, "to": fb, **_step(a, b)}
+        for (fa, a), (fb, b) in zip(present, present[1:])
+    ]
+
+    group_names = sorted({name for _, e in present for name in e["by_group"]})
+    ranks = [_ranks({n: _group_score(g) for n, g in e["by_group"].items()}) for _, e in present]
+    by_group = {}
+    for name in group_names:
+        series = [_point(e["by_group"].get(name)) for e in entries]
+        group_steps = []
+        for (i, (fa, a)), (j, (fb, b)) in zip(enumerate(present), list(enumerate(present))[1:]):
+            ga, gb = a["by_group"].get(name), b["by_group"].get(name)
+            if ga is None or gb is None:
+                continue
+            group_steps.append({
+                "from": fa,
+                "to": fb,
+                **_step(ga, gb),
+                "rank": {"from": ranks[i][name], "to": ranks[j][name],
+                         "change": ranks[i][name] - ranks[j][name]},
+            })
+        by_group[name] = {"series": series, "changes": group_steps}
+
+    return {
+        "analysis_type": present[0][1]["analysis_type"],
+        "series": [_point(e) for e in entries],
+        "changes": steps,
+        "by_group": by_group,
+    }
+
+
+def compare_aggregates(aggregates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compare stored aggregates, in the given order (oldest first). Each
+    question's ``series`` has one entry per file (None where the file doesn't
+    have it); ``changes`` go from each file to the next one that has it. A
+    positive rank ``change`` means the department / term moved up.
+    """
+    file_ids = [agg["file_id"] for agg in aggregates]
+    keys: List[str] = []
+    for agg in aggregates:
+        keys += [k for k in agg["questions"] if k not in keys]
+
+    questions = []
+    for key in keys:
+        entries = [agg["questions"].get(key) for agg in aggregates]
+        types = {e["analysis_type"] for e in entries if e is not None}
+        if len(types) > 1:
+            # Same number, different analysis type: figures aren't comparable
+            entries = [e if e is None or e["analysis_type"] == "quantitative" else None for e in entries]
+        questions.append({"question": key, **_compare_question(file_ids, entries)})
+
+    return {
+        "files": [
+            {"file_id": agg["file_id"], "file": agg["config"].get("file"),
+             "analyzed_at": agg["created_at"], "config": agg["config"]}
+            for agg in aggregates
+        ],
+        "questions": questions,
+    }
@@ -0,0 +1,226 @@
+"""
+Streaming table exports — CSV, XLSX and Parquet.
+
+Why this exists:
+  The frontend's export-report.ts builds its files in the browser from the
+  JSON the API returned, which only holds aggregates; raw filtered
+  responses would have to come back as one huge JSON body first. The
+  export routes (app.routers.export) instead hand write_table() an
+  iterator of DataFrame chunks and stream what it produces:
+
+    csv      each chunk is encoded and sent as soon as it is ready
+    parquet  each chunk becomes a row group, sent as soon as it is written
+    xlsx     rows go to openpyxl's write-only workbook (spooled to disk by
+             openpyxl itself) and the finished file is streamed from disk;
+             until then, an empty piece per chunk added to the sheet
+
+  so memory stays flat — one chunk of rows — whatever the result size.
+
+  Parquet needs pyarrow (optional): without it the format isn't offered.
+
+Usage:
+  from app.services.exports import media_type, write_table
+
+  body = write_table(chunks, "csv")            # iterator of bytes
+  StreamingResponse(body, media_type=media_type("csv"))
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import io
+import os
+import tempfile
+from typing import Any, Dict, Iterator, List, Tuple
+
+from app.core.lazy import import_lock, lazy_import
+
+pa = lazy_import("pyarrow")
+pd = lazy_import("pandas")
+
+# Rows per chunk handed to the writers
+CHUNK_ROWS = 10_000
+# Largest sheet Excel opens (header row included)
+XLSX_MAX_ROWS = 1_048_576
+# Size of the pieces a finished file is streamed in
+_READ_BYTES = 1 << 20
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def formats() -> List[str]:
+    """Export formats available in this deployment."""
+    available = ["csv", "xlsx"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        available.append("parquet")
+    return available
+
+
+def media_type(fmt: str) -> str:
+    return _MEDIA_TYPES[fmt]
+
+
+def write_table(chunks: Iterator[pd.DataFrame], fmt: str) -> Iterator[bytes]:
+    """
+    Encode *chunks* (DataFrames with the same columns, in order) as one
+    *fmt* file, yielding its bytes piece by piece.
+    """
+    writer = {"csv": _write_csv, "xlsx": _write_xlsx, "parquet": _write_parquet}[fmt]
+    return writer(chunks)
+
+
+# ── CSV ───────────────────────────────────────────────────────────────────────
+
+def _write_csv(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    # BOM: Excel opens UTF-8 CSVs with accents garbled without it
+    yield "\ufeff".encode("utf-8")
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header, lineterminator="\r\n").encode("utf-8")
+        header = False
+
+
+# ── XLSX ──────────────────────────────────────────────────────────────────────
+
+def _cell_rows(chunk: pd.DataFrame) -> Iterator[Tuple[Any, ...]]:
+    """Rows of *chunk* as Python values, nulls as None (empty cells)."""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+
+def _write_xlsx(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    with import_lock:
+        from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Datos")
+    header = False
+    for chunk in chunks:
+        if not header:
+            sheet.append([str(c) for c in chunk.columns])
+            header = True
+        for row in _cell_rows(chunk):
+            sheet.append(row)
+        # Nothing to send before the file is saved: callers building the
+        # sheet a piece at a time get one chunk per next()
+        yield b""
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as f:
+            while True:
+                piece = f.read(_READ_BYTES)
+                if not piece:
+                    break
+                yield piece
+    finally:
+        os.remove(path)
+
+
+# ── Parquet ───────────────────────────────────────────────────────────────────
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are taken out as they come (tell() keeps counting)."""
+
+    def __init__(self) -> None:
+        self._pieces: List[bytes] = []
+        self._written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        piece = bytes(data)
+        self._pieces.append(piece)
+        self._written += len(piece)
+        return len(piece)
+
+    def tell(self) -> int:
+        return self._written
+
+    def take(self) -> bytes:
+        data = b"".join(self._pieces)
+        self._pieces.clear()
+        return data
+
+
+def _arrow_schema(chunk: pd.DataFrame) -> pa.Schema:
+    """Column types for every chunk: object columns (mixed values) as text."""
+    fields = []
+    for name in chunk.columns:
+        column = chunk[name]
+        kind = pa.string() if column.dtype == object else pa.Array.from_pandas(column).type
+        fields.append(pa.field(str(name), kind))
+    return pa.schema(fields)
+
+
+def _arrow_chunk(chunk: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    arrays = []
+    for name, field in zip(chunk.columns, schema):
+        column = chunk[name]
+        if column.dtype == object:
+            arrays.append(pa.array(
+                [None if missing else str(v) for v, missing in zip(column.tolist(), column.isna().tolist())],
+                type=field.type,
+            ))
+        else:
+            arrays.append(pa.Array.from_pandas(column, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_parquet(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    with import_lock:
+        import pyarrow.parquet as pq
+
+    sink = _Drain()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            schema = _arrow_schema(chunk)
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+        writer.write_table(_arrow_chunk(chunk, schema))  # one row group per chunk
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+    yield sink.take()
+
+
+# ── Tables ────────────────────────────────────────────────────────────────────
+
+_QUANT_COLUMNS = [
+    "pregunta", "grupo", "total", "validas", "invalidas", "media", "mediana",
+    "desv_estandar", "minimo", "maximo",
+    *(f"n_{i}" for i in range(1, 6)),
+    *(f"pct_{i}" for i in range(1, 6)),
+]
+
+
+def _quant_row(question: str, group: str, result: Dict[str, Any]) -> List[Any]:
+    summary, distribution = result["summary"], result["distribution"]
+    return [
+        question, group, summary["total"], summary["valid"], summary["invalid"],
+        summary["mean"], summary["median"], summary["std_dev"], summary["min"], summary["max"],
+        *(distribution[str(i)]["count"] for i in range(1, 6)),
+        *(distribution[str(i)]["pct"] for i in range(1, 6)),
+    ]
+
+
+def quantitative_table(result: Dict[str, Any]) -> pd.DataFrame:
+    """
+    The quantitative questions of a /multi-analyze result as one table: a
+    "General" row per question, then one row per group.
+    """
+    rows = []
+    for q in result.get("questions") or []:
+        if q["analysis_type"] != "quantitative" or not q["quantitative"]:
+            continue
+        rows.append(_quant_row(q["question_number"], "General", q["quantitative"]))
+        for group, group_result in (q["by_group"] or {}).items():
+            rows.append(_quant_row(q["question_number"], group, group_result))
+    return pd.DataFrame(rows, columns=_QUANT_COLUMNS)
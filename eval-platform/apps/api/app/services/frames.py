@@ -0,0 +1,165 @@
+"""
+Loading an uploaded file's rows as a DataFrame.
+
+A file is its original upload plus any segments appended later
+(POST /files/{file_id}/append); the parsed frame of all of them is kept in
+the per-file artifact store, so repeated analyses of the same file don't
+re-parse it and an append only parses the new rows. With several workers,
+a frame parsed by one of them is attached by the others from its shared
+segment (app.services.shared_frames) instead of being parsed again.
+
+The routes go through get_file_meta() and load_df(), which turn a missing
+file into the 404 the UI shows.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List
+
+from fastapi import HTTPException
+
+from app.core.artifacts import artifact_drop, artifact_get, artifact_set
+from app.core.cache import cache_get
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.memory import track_frame
+from app.core.metrics import add_rows, span
+from app.core.storage import ensure_local
+from app.services.ingest import read_table
+from app.services.shared_frames import attach, share_frame
+from app.services.warmup import wait_for_warmup
+
+pd = lazy_import("pandas")
+
+
+def read_file(filepath: str) -> pd.DataFrame:
+    """Load a CSV or Excel file from disk (runs in a thread pool)."""
+    df, _ = read_table(filepath)
+    return df
+
+
+def file_paths(meta: dict) -> List[str]:
+    """Original upload first, then appended segments in order."""
+    return [meta["filepath"]] + [seg["filepath"] for seg in meta.get("segments", [])]
+
+
+def read_frame(paths: List[str]) -> pd.DataFrame:
+    """Parse every part of a file and stack them (runs in a thread pool)."""
+    df = read_file(paths[0])
+    for path in paths[1:]:
+        df = stack_rows(df, read_file(path))
+    return df
+
+
+def stack_rows(df: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    *new* rows appended below *df* (same column set, any order). New columns
+    are cast to the existing dtypes when that is lossless — e.g. an appended
+    CSV whose question numbers parsed as int64 like the original's — so the
+    stacked frame keeps the original's dtypes and value spellings.
+    """
+    new = new[list(df.columns)].copy()
+    for col in df.columns:
+        if new[col].dtype == df[col].dtype:
+            continue
+        try:
+            cast = new[col].astype(df[col].dtype)
+            lossless = cast.astype(new[col].dtype).equals(new[col])
+        except (ValueError, TypeError):
+            continue
+        if lossless:
+            new[col] = cast
+    return pd.concat([df, new], ignore_index=True)
+
+
+def cached_frame(meta: dict, file_id: str):
+    """The parsed frame of *file_id* if this process has it, else None."""
+    df = artifact_get(file_id, "frame")
+    if df is not None and len(df) == meta.get("rows", len(df)):
+        return df
+    return None
+
+
+def check_schema(meta: dict, file_id: str) -> None:
+    """
+    Drop this process's artifacts of *file_id* if they were built for
+    another "schema" of the file than *meta*'s — an append, maybe in
+    another worker, changed a column's type since.
+    """
+    schema = meta.get("schema", 0)
+    if (artifact_get(file_id, "schema") or 0) != schema:
+        artifact_drop(file_id)
+        artifact_set(file_id, "schema", schema)
+
+
+def remember_frame(file_id: str, df: pd.DataFrame) -> None:
+    track_frame(df)  # before storing it: the store sizes it from the footprint
+    artifact_set(file_id, "frame", df)
+
+
+async def load_frame(meta: dict, file_id: str) -> pd.DataFrame:
+    """
+    Non-blocking load of every part of the file — from the artifact store
+    when possible, then from another worker's shared segment, otherwise
+    parsed in a thread pool. Parts missing locally (e.g. container
+    restarted) are restored from S3 first.
+
+    Raises FileNotFoundError if a part can't be recovered.
+    """
+    check_schema(meta, file_id)
+    df = cached_frame(meta, file_id)
+    if df is not None:
+        return df
+
+    if "rows" in meta:
+        with span("attach"):
+            df = await run_blocking(attach, file_id, meta["rows"], pool="io")
+        if df is not None:
+            remember_frame(file_id, df)
+            return df
+
+    paths = file_paths(meta)
+    for path in paths:
+        if not os.path.exists(path):
+            # Attempt to restore from S3
+            with span("storage"):
+                restored = await run_blocking(ensure_local, path, file_id, pool="io")
+            if not restored:
+                raise FileNotFoundError(path)
+
+    with span("load"):
+        df = await run_blocking(read_frame, paths)
+    remember_frame(file_id, df)
+    share_frame(file_id, df)
+    return df
+
+
+def get_file_meta(file_id: str) -> dict:
+    """Fetch file metadata from the shared cache or raise 404."""
+    meta = cache_get(f"file:{file_id}")
+    if not meta:
+        raise HTTPException(
+            404,
+            "Archivo no encontrado. Es posible que haya expirado — vuelve a subirlo.",
+        )
+    return meta
+
+
+async def load_df(meta: dict, file_id: str) -> pd.DataFrame:
+    """
+    Non-blocking DataFrame load (see load_frame) — 404 if the file can't be
+    found locally nor restored from S3.
+    """
+    # A post-upload warmup still running is building what we need anyway
+    await wait_for_warmup(file_id)
+    try:
+        df = await load_frame(meta, file_id)
+    except FileNotFoundError:
+        raise HTTPException(
+            404,
+            "Archivo no encontrado en el servidor. "
+            "Si fue subido hace más de 2 horas vuelve a cargarlo.",
+        )
+    add_rows(len(df))
+    return df
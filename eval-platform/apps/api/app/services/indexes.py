@@ -0,0 +1,199 @@
+"""
+Row indexes over an uploaded DataFrame.
+
+RowPartition splits the rows by the (stripped) value of one column in a
+single pass — e.g. the long-format survey table by question number — so each
+partition is a dictionary lookup instead of a full-column comparison.
+
+FilterIndex maps every (column, value) pair of the low-cardinality columns —
+the same columns and values the upload profile lists in ``unique_values`` —
+to the row positions that hold it. A filter request then becomes a few
+boolean bitmap OR / AND operations, and the DataFrame is sliced once at the
+end instead of converting whole columns to strings on every request.
+
+Both are shared artifacts extended in place when rows are appended: extend()
+and the lookups hold the index's lock, so a reader never sees half an extend.
+filter_index(), filter_mask() and question_partition() return a file's
+indexes from the artifact store, up to date with its rows.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.core.artifacts import artifact_get, artifact_set
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+
+# Columns with at most this many distinct values get their values listed in the
+# upload profile (and therefore offered as filters) and are indexed here.
+MAX_LISTED_VALUES = 200
+
+
+def _postings(series: pd.Series, key_fn: Callable[[object], str] = str) -> Dict[str, np.ndarray]:
+    """Map key_fn(value) → sorted row positions holding that value (NaN excluded)."""
+    codes, uniques = pd.factorize(series)
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    order = order[np.count_nonzero(codes < 0):]  # NaN rows sort first, code -1
+    bounds = np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))[:-1]
+
+    postings: Dict[str, np.ndarray] = {}
+    for value, rows in zip(uniques, np.split(order, bounds)):
+        key = key_fn(value)
+        if key in postings:
+            # Different raw values can share a key (1 and "1", "3" and " 3")
+            rows = np.sort(np.concatenate([postings[key], rows]))
+        postings[key] = rows
+    return postings
+
+
+def _extend_postings(postings: Dict[str, np.ndarray], new: Dict[str, np.ndarray], offset: int) -> None:
+    """Merge postings of appended rows (positions relative to *offset*) in place."""
+    for key, rows in new.items():
+        rows = (rows + offset).astype(np.int32)
+        postings[key] = np.concatenate([postings[key], rows]) if key in postings else rows
+
+
+def and_masks(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """AND two row bitmaps, where None means "every row"."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a & b
+
+
+class FilterIndex:
+    """(column, value) → row bitmap index, built once per file."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.lock = threading.RLock()
+        self.postings: Dict[object, Dict[str, np.ndarray]] = {}
+        for col in df.columns:
+            if df[col].nunique() <= MAX_LISTED_VALUES:
+                self.postings[col] = _postings(df[col])
+
+    def value_mask(self, df: pd.DataFrame, col, values: List[str]) -> np.ndarray:
+        """Bitmap of the rows whose *col* is any of *values* (OR)."""
+        with self.lock:
+            postings = self.postings.get(col)
+            if postings is not None:
+                mask = np.zeros(self.n_rows, dtype=bool)
+                for value in values:
+                    rows = postings.get(str(value))
+                    if rows is not None:
+                        mask[rows] = True
+                return mask
+        # High-cardinality column — not indexed, scan it
+        return df[col].astype(str).isin(values).to_numpy()
+
+    def mask(
+        self,
+        df: pd.DataFrame,
+        filters: Optional[Dict[str, List[str]]],
+    ) -> Optional[np.ndarray]:
+        """
+        Bitmap of the rows matching every filter (AND across columns, OR
+        within a column). Returns None when no filter applies.
+        Unknown columns and empty value lists are ignored.
+        """
+        mask = None
+        with self.lock:
+            for col_name, values in (filters or {}).items():
+                if col_name in df.columns and values:
+                    mask = and_masks(mask, self.value_mask(df, col_name, values))
+        return mask
+
+    def extend(self, tail: pd.DataFrame) -> None:
+        """Index rows appended after the first n_rows (*tail* = df.iloc[n_rows:])."""
+        with self.lock:
+            for col in list(self.postings):
+                postings = self.postings[col]
+                _extend_postings(postings, _postings(tail[col]), self.n_rows)
+                if len(postings) > MAX_LISTED_VALUES:
+                    del self.postings[col]  # too many values now — scanned instead
+            self.n_rows += len(tail)
+
+
+class RowPartition:
+    """str(value).strip() → row positions of one column, built once per file."""
+
+    def __init__(self, series: pd.Series):
+        self.n_rows = len(series)
+        self.lock = threading.RLock()
+        self.parts = _postings(series, lambda v: str(v).strip())
+
+    def rows(self, key: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row positions whose value is *key*, optionally restricted to *mask*."""
+        with self.lock:
+            rows = self.parts.get(key)
+        if rows is None:
+            return np.empty(0, dtype=np.int32)
+        return rows if mask is None else rows[mask[rows]]
+
+    def extend(self, tail: pd.Series) -> None:
+        """Add rows appended after the first n_rows (*tail* = series.iloc[n_rows:])."""
+        new = _postings(tail, lambda v: str(v).strip())
+        with self.lock:
+            _extend_postings(self.parts, new, self.n_rows)
+            self.n_rows += len(tail)
+
+
+# ── Per-file indexes ───────────────────────────────────────────────────────────
+
+def filter_index(df: pd.DataFrame, file_id: str) -> FilterIndex:
+    """
+    Return the file's (column, value) → rows index, building it on first use
+    and extending it with rows appended since.
+    """
+    index = artifact_get(file_id, "filter_index")
+    if index is None or index.n_rows > len(df):
+        index = FilterIndex(df)
+        artifact_set(file_id, "filter_index", index)
+    else:
+        with index.lock:
+            if index.n_rows < len(df):
+                index.extend(df.iloc[index.n_rows:])
+    return index
+
+
+def filter_mask(
+    df: pd.DataFrame,
+    file_id: str,
+    filters: Optional[Dict[str, List[str]]],
+    department: Optional[str] = None,
+    not_null: Optional[str] = None,
+) -> Optional[np.ndarray]:
+    """
+    Row bitmap for *filters*, the optional drilldown *department* and a
+    non-null *not_null* column, all ANDed. None means "keep every row".
+    """
+    index = filter_index(df, file_id)
+    mask = index.mask(df, filters)
+    if department and "DEPARTAMENTO" in df.columns:
+        mask = and_masks(mask, index.value_mask(df, "DEPARTAMENTO", [department]))
+    if not_null:
+        mask = and_masks(mask, df[not_null].notna().to_numpy())
+    return mask
+
+
+def question_partition(df: pd.DataFrame, file_id: str, pregunta_col: str) -> RowPartition:
+    """
+    Return the file's question number → rows partition, building it on first
+    use and extending it with rows appended since.
+    """
+    name = ("question_partition", pregunta_col)
+    partition = artifact_get(file_id, name)
+    if partition is None or partition.n_rows > len(df):
+        partition = RowPartition(df[pregunta_col])
+        artifact_set(file_id, name, partition)
+    else:
+        with partition.lock:
+            if partition.n_rows < len(df):
+                partition.extend(df[pregunta_col].iloc[partition.n_rows:])
+    return partition
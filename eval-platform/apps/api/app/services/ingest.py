@@ -0,0 +1,391 @@
+"""
+Reading uploaded spreadsheets into DataFrames: engines, progress, memory.
+
+Why this exists:
+  pd.read_excel with openpyxl builds a Python list of every row, then a 2-D
+  object array of every cell, then the typed columns — for a 70K × 30
+  evaluation sheet that's many seconds and several hundred MB at peak,
+  with no way to tell the user how far along it is. read_table() instead
+  streams the sheet's rows and builds the columns CHUNK_ROWS rows at a
+  time (the row lists are dropped as it goes), reporting progress after
+  every chunk ("reading") and while typing the columns ("typing").
+  Engines, in EXCEL_ENGINE="auto" order:
+
+    calamine   rows from python-calamine (Rust) — several times faster;
+               used when the package is installed
+    stream     rows from openpyxl in read-only mode
+    pandas     plain pd.read_excel — the fallback when an engine fails
+
+  Each column is typed by pandas' own parser (TextParser, as read_excel
+  does), one column at a time, so the frame is the one pd.read_excel
+  returns with the same engine: same dtypes, same NaNs, same names.
+
+  CSV files (registrar exports are often Latin-1 and ";"-separated) get
+  their encoding and delimiter sniffed from the first MB, then:
+
+    arrow      pyarrow's multithreaded reader, block by block straight into
+               columnar buffers (no Python object per cell); the few types
+               Arrow infers differently from pandas (dates, times, empty
+               columns) are corrected, ambiguous files fall back to c
+    c          pd.read_csv with the sniffed format
+
+  Every read returns a report — engine, rows, seconds, peak resident
+  memory (sampled), the frame's estimated footprint, any fallback taken,
+  and the CSV format — that the upload routes return and log. Progress goes to the shared cache under "ingest:<upload_id>"
+  when the client passed an upload_id, so GET /uploads/{upload_id}/progress
+  works from any worker while the upload request is still parsing.
+
+Usage:
+  from app.services.ingest import read_table
+
+  df, report = read_table(path)                     # thread pool
+  df, report = read_table(path, upload_id="u-123")  # + progress in cache
+"""
+
+from __future__ import annotations
+
+import codecs
+import csv
+import importlib.util
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.core.lazy import import_lock, lazy_import
+from app.core.memory import PeakRss, frame_footprint
+from app.core.metrics import describe, inc, observe
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk between column building / progress updates
+CHUNK_ROWS = 10000
+# How long a progress entry stays in the cache
+PROGRESS_TTL = 600
+
+EXCEL_ENGINES = ("calamine", "stream", "pandas")
+CSV_ENGINES = ("arrow", "c")
+
+# CSV sniffing: bytes / lines looked at, delimiters considered
+SNIFF_BYTES = 1 << 20
+SNIFF_LINES = 100
+CSV_DELIMITERS = ",;\t|"
+# Bytes per block of Arrow's CSV reader (blocks are parsed in parallel)
+CSV_BLOCK_BYTES = 4 << 20
+
+
+# ── Row sources ───────────────────────────────────────────────────────────────
+# Each yields the sheet's rows with cells converted as pandas' reader for
+# that engine converts them, plus the expected row count (None if unknown).
+
+def _openpyxl_rows(path: str) -> Tuple[Iterator[List[Any]], Optional[int]]:
+    with import_lock:
+        import openpyxl
+        from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    book = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    sheet = book.worksheets[0]
+    expected = sheet.max_row  # from the stored dimension: an estimate
+    sheet.reset_dimensions()
+
+    def rows() -> Iterator[List[Any]]:
+        try:
+            for row in sheet.rows:
+                converted = []
+                for cell in row:
+                    value = cell.value
+                    if value is None:
+                        value = ""
+                    elif cell.data_type == TYPE_ERROR:
+                        value = float("nan")
+                    elif cell.data_type == TYPE_NUMERIC and int(value) == value:
+                        value = int(value)
+                    converted.append(value)
+                while converted and converted[-1] == "":
+                    converted.pop()
+                yield converted
+        finally:
+            book.close()
+
+    return rows(), expected
+
+
+def _calamine_rows(path: str) -> Tuple[Iterator[List[Any]], Optional[int]]:
+    from datetime import date, datetime
+
+    from python_calamine import load_workbook
+
+    sheet = load_workbook(path).get_sheet_by_index(0)
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, float) and int(value) == value:
+            return int(value)
+        if isinstance(value, date) and not isinstance(value, datetime):
+            return datetime(value.year, value.month, value.day)
+        return value
+
+    def rows() -> Iterator[List[Any]]:
+        # iter_rows() streams, but drops empty leading columns, which
+        # pd.read_excel (to_python(skip_empty_area=False)) keeps
+        source = sheet.iter_rows() if not sheet.start or sheet.start[1] == 0 \
+            else sheet.to_python(skip_empty_area=False)
+        for row in source:
+            yield [convert(v) for v in row]
+
+    return rows(), sheet.end[0] + 1 if sheet.end else None
+
+
+# ── Column building ───────────────────────────────────────────────────────────
+
+class _Unsupported(ValueError):
+    """A sheet the streaming reader leaves to pd.read_excel."""
+
+
+def _build_frame(rows: Iterator[List[Any]], on_progress: Callable[[str, int], None]) -> pd.DataFrame:
+    """
+    The DataFrame pd.read_excel makes of *rows* (header first): rows are
+    padded to the widest one, trailing empty rows dropped and each column
+    typed by TextParser on its own.
+    """
+    with import_lock:
+        from pandas.io.parsers import TextParser
+
+    columns: List[List[Any]] = []
+    n_rows = 0
+    last_with_data = -1
+    chunk: List[List[Any]] = []
+
+    def flush() -> None:
+        width = max(map(len, chunk), default=0)
+        while len(columns) < width:
+            columns.append([""] * (n_rows - len(chunk)))
+        width = len(columns)
+        padded = [r if len(r) == width else r + [""] * (width - len(r)) for r in chunk]
+        for column, values in zip(columns, zip(*padded)):
+            column.extend(values)
+        chunk.clear()
+        on_progress("reading", n_rows)
+
+    for row in rows:
+        if row:
+            last_with_data = n_rows
+        chunk.append(row)
+        n_rows += 1
+        if len(chunk) >= CHUNK_ROWS:
+            flush()
+    flush()
+
+    n_rows = last_with_data + 1
+    if n_rows < 2:
+        # Empty sheet / header only: left to pandas
+        raise _Unsupported("sheet shape not handled by the streaming reader")
+
+    on_progress("typing", n_rows)
+    header = [column[0] for column in columns]
+    names = TextParser([header], header=0, skip_blank_lines=False).read().columns
+    typed = []
+    for column in columns:
+        values = [[v] for v in column[:n_rows]]
+        column.clear()  # free the raw cells as we go
+        typed.append(TextParser(values, header=0, skip_blank_lines=False).read().iloc[:, 0])
+    return pd.DataFrame(dict(enumerate(typed))).set_axis(names, axis=1)
+
+
+# ── CSV ───────────────────────────────────────────────────────────────────────
+
+def _sniff_encoding(sample: bytes) -> str:
+    """UTF-8 if the sample decodes as such, else Windows-1252 / Latin-1."""
+    try:
+        # final=False: the sample may end in the middle of a character
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"  # decodes any byte
+
+
+def sniff_csv(path: str) -> Dict[str, str]:
+    """Encoding and delimiter of a CSV file, guessed from its first SNIFF_BYTES."""
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    encoding = _sniff_encoding(sample)
+    # Whole lines only (the last one is probably cut)
+    lines = sample.decode(encoding, errors="replace").splitlines()[:SNIFF_LINES]
+    try:
+        delimiter = csv.Sniffer().sniff("\n".join(lines), delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    return {"encoding": encoding, "delimiter": delimiter}
+
+
+def _read_csv_arrow(path: str, fmt: Dict[str, str]) -> pd.DataFrame:
+    """
+    The file read by Arrow's multithreaded CSV reader, block by block into
+    columnar buffers, then typed as pd.read_csv (C engine) types it.
+    """
+    with import_lock:
+        import pyarrow as pa
+        import pyarrow.compute as pacompute
+        import pyarrow.csv as pacsv
+        from pandas._libs.parsers import STR_NA_VALUES
+
+    read = pacsv.ReadOptions(encoding=fmt["encoding"], block_size=CSV_BLOCK_BYTES)
+    parse = pacsv.ParseOptions(delimiter=fmt["delimiter"], newlines_in_values=True)
+
+    def convert(**options) -> "pacsv.ConvertOptions":
+        # pandas' NA spellings and booleans instead of Arrow's
+        return pacsv.ConvertOptions(
+            null_values=sorted(STR_NA_VALUES), strings_can_be_null=True,
+            true_values=["True", "TRUE", "true"], false_values=["False", "FALSE", "false"],
+            **options,
+        )
+
+    table = pacsv.read_csv(path, read, parse, convert())
+    names = table.column_names
+    if len(set(names)) != len(names) or "" in names:
+        # pandas renames these ("a.1", "Unnamed: 3")
+        raise _Unsupported("duplicate or empty column names")
+
+    # pandas never parses dates / times from a CSV, and only calls a column
+    # float if some value has a decimal point or exponent: re-read those
+    # columns as text to check
+    recheck = [f.name for f in table.schema if pa.types.is_temporal(f.type) or pa.types.is_floating(f.type)]
+    if recheck:
+        text = pacsv.read_csv(path, read, parse, convert(
+            include_columns=recheck, column_types={name: pa.string() for name in recheck},
+        ))
+        for name in recheck:
+            i = names.index(name)
+            if pa.types.is_temporal(table.schema.field(i).type):
+                table = table.set_column(i, name, text[name])
+            elif pacompute.all(pacompute.match_substring_regex(
+                    text[name], r"^\s*[+-]?\d+\s*$")).as_py():
+                raise _Unsupported(f"column {name!r}: integers Arrow reads as floats")
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):  # all empty: NaN floats for pandas
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+
+    # String columns stay in the Arrow buffers where pandas supports it
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    # Hand the parse buffers back to the OS instead of keeping them pooled
+    pa.default_memory_pool().release_unused()
+    return df
+
+
+def _read_csv_c(path: str, fmt: Dict[str, str]) -> pd.DataFrame:
+    try:
+        return pd.read_csv(path, sep=fmt["delimiter"], encoding=fmt["encoding"], low_memory=False)
+    except UnicodeDecodeError:
+        # The sample looked like UTF-8, a later line isn't: Latin-1 reads anything
+        fmt["encoding"] = "latin-1"
+        return pd.read_csv(path, sep=fmt["delimiter"], encoding="latin-1", low_memory=False)
+
+
+def _csv_engines() -> List[str]:
+    choice = settings.CSV_ENGINE
+    if choice in CSV_ENGINES:  # anything else is "auto"
+        return [choice] if choice == "c" else [choice, "c"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        return ["arrow", "c"]
+    return ["c"]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def _excel_engines() -> List[str]:
+    choice = settings.EXCEL_ENGINE
+    if choice in EXCEL_ENGINES:  # anything else is "auto"
+        return [choice] if choice == "pandas" else [choice, "pandas"]
+    engines = ["stream", "pandas"]
+    if importlib.util.find_spec("python_calamine") is not None:
+        engines.insert(0, "calamine")
+    return engines
+
+
+def _read_excel(path: str, engine: str, on_progress: Callable[[str, int], None],
+                expected: Dict[str, Optional[int]]) -> pd.DataFrame:
+    if engine == "pandas":
+        return pd.read_excel(path)
+    rows, expected["rows"] = (_calamine_rows if engine == "calamine" else _openpyxl_rows)(path)
+    return _build_frame(rows, on_progress)
+
+
+def read_table(path: str, upload_id: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Parse a CSV or Excel file (runs in a thread pool) → (df, report).
+    With *upload_id*, progress is published to the cache as it goes.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    fmt = sniff_csv(path) if ext == ".csv" else {}
+    engines = _csv_engines() if fmt else _excel_engines()
+    expected: Dict[str, Optional[int]] = {"rows": None}
+    fallbacks: List[Dict[str, str]] = []
+
+    def publish(stage: str, rows: int, engine: str) -> None:
+        if upload_id:
+            cache_set(f"ingest:{upload_id}", {
+                "stage": stage,
+                "engine": engine,
+                # The header is a row of the sheet, not of the frame
+                "rows": max(rows - 1, 0),
+                "expected_rows": expected["rows"] - 1 if expected["rows"] else None,
+            }, ttl=PROGRESS_TTL)
+
+    start = time.perf_counter()
+    with PeakRss() as memory:
+        for engine in engines:
+            publish("reading", 0, engine)
+            try:
+                if engine == "arrow":
+                    df = _read_csv_arrow(path, fmt)
+                elif engine == "c":
+                    df = _read_csv_c(path, fmt)
+                else:
+                    df = _read_excel(path, engine, lambda stage, n: publish(stage, n, engine), expected)
+                break
+            except Exception as exc:
+                if engine == engines[-1]:
+                    publish("failed", 0, engine)
+                    inc("evalplatform_ingest_total", engine=engine, outcome="error")
+                    raise
+                # The next engine reads the file from scratch
+                log = logger.info if isinstance(exc, _Unsupported) else logger.warning
+                log("⚠️  %s engine failed on %s (%s) — falling back", engine, path, exc)
+                inc("evalplatform_ingest_total", engine=engine, outcome="fallback")
+                fallbacks.append({"engine": engine, "error": str(exc)})
+    seconds = time.perf_counter() - start
+
+    report = {
+        "engine": engine,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(memory.peak / 2**20, 1),
+        "rss_growth_mb": round((memory.peak - memory.start) / 2**20, 1),
+        "frame_mb": round(frame_footprint(df) / 2**20, 1),
+        "fallbacks": fallbacks,
+        **fmt,
+    }
+    publish("done", len(df) + 1, engine)
+    inc("evalplatform_ingest_total", engine=engine, outcome="ok")
+    observe("evalplatform_ingest_seconds", seconds, engine=engine)
+    logger.info("📥 Parsed %s with %s: %d rows in %.2fs, peak RSS %.0f MB",
+                os.path.basename(path), engine, len(df), seconds, report["peak_rss_mb"])
+    return df, report
+
+
+def ingest_progress(upload_id: str) -> Optional[Dict[str, Any]]:
+    """Latest progress of the upload *upload_id*, or None if unknown / expired."""
+    return cache_get(f"ingest:{upload_id}")
+
+
+describe("evalplatform_ingest_total", "Spreadsheet reads by engine and outcome (ok / fallback / error).")
+describe("evalplatform_ingest_seconds", "Time to parse an uploaded file, by engine.")
@@ -0,0 +1,247 @@
+"""
+Near-duplicate clusters of one response column (MinHash + LSH banding).
+
+Why this exists:
+  Evaluation exports are full of copy-pasted comments — "excelente profesor,
+  muy bien" and its variations with one more word, a typo or different
+  punctuation. Each copy weighs on top_words / top_phrases as if it were a
+  different student's opinion, and the longest copies fill the highlights.
+  NearDuplicates groups such responses once per (file, column) — kept in
+  the artifact store, extended when rows are appended — so an analysis
+  with collapse_near_duplicates=true analyzes one representative per
+  cluster, weighted by the cluster's size:
+
+    * summary counts, average length and sentiment tallies are weighted,
+      so they still describe every response
+    * word / phrase / name counts, suggestions and highlights see each
+      cluster once: a comment pasted 300 times is one voice, not 300
+
+  How: responses are compared as clean_text(), so identical cleaned texts
+  share one entry and one signature. Each distinct text gets a MinHash
+  signature of its character SHINGLE-grams (PERMUTATIONS hashes) and is
+  bucketed per band of BANDS × ROWS_PER_BAND signature values; texts whose
+  band lands in an occupied bucket are compared with that bucket's first
+  text, and linked when their estimated Jaccard similarity reaches
+  NEAR_DUPLICATE_THRESHOLD. Clusters are the connected components of those
+  links. Everything is vectorized: roughly linear in the number of
+  characters, ~3 s for 100k distinct comments.
+
+Usage:
+  dups = column_near_duplicates(df, file_id, "RESPUESTA")   # from the artifact store
+  representatives, weights = dups.collapse(rows)
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import threading
+from typing import Any, Dict, List, Tuple
+
+from app.core.artifacts import artifact_get, artifact_set
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.services.text_analyzer import clean_text
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Characters per shingle (short comments need short shingles: "excelente
+# profesor muy bien" / "excelente profesora muy bien" share 82% of 3-grams)
+SHINGLE = 3
+# MinHash signature length, split into BANDS bands of ROWS_PER_BAND values:
+# pairs 0.75 similar share a band with >99% probability, 0.5 with ~64% (the
+# shared bucket is only a candidate: the whole signature is compared next)
+PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = PERMUTATIONS // BANDS
+# Characters hashed per batch (bounds the temporary arrays)
+_BATCH_CHARS = 1 << 22
+# Largest clusters listed in a report
+REPORT_CLUSTERS = 10
+
+
+@functools.lru_cache(maxsize=1)
+def _coefficients() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hash coefficients — fixed, so every worker computes the same signatures."""
+    rng = np.random.default_rng(0x6D696E68)
+    a = rng.integers(0, 2**32, PERMUTATIONS, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+    b = rng.integers(0, 2**32, PERMUTATIONS, dtype=np.uint64).astype(np.uint32)
+    band = rng.integers(0, 2**63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+    return a, b, band
+
+
+def _shingle_hashes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    32-bit hashes of every SHINGLE-character window of *texts*, text after
+    text (texts shorter than that are one window), and where each text starts.
+    """
+    # An empty text is one NUL: its window must not run into the next text
+    # (or past the last one), and every empty text hashes the same
+    texts = [t or "\0" for t in texts]
+    pad = "\0" * (SHINGLE - 1)
+    chars = np.frombuffer("".join(t + pad for t in texts).encode("utf-32-le"), dtype=np.uint32)
+    n = len(chars) - SHINGLE + 1
+    rolling = np.zeros(n, dtype=np.uint64)
+    for j in range(SHINGLE):
+        rolling = rolling * np.uint64(1_000_003) + chars[j:j + n]
+
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    offsets = np.concatenate([[0], np.cumsum(lengths + SHINGLE - 1)[:-1]])
+    windows = np.maximum(lengths - SHINGLE + 1, 1)
+    starts = np.concatenate([[0], np.cumsum(windows)[:-1]])
+    hashes = rolling[np.repeat(offsets - starts, windows) + np.arange(int(windows.sum()))]
+    # splitmix64 finalizer: spread the polynomial hash over the high bits
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= np.uint64(0xBF58476D1CE4E5B9)
+    hashes ^= hashes >> np.uint64(31)
+    return (hashes >> np.uint64(32)).astype(np.uint32), starts
+
+
+def signatures(texts: List[str]) -> np.ndarray:
+    """MinHash signatures (texts × PERMUTATIONS, uint32) of cleaned *texts*."""
+    a, b, _ = _coefficients()
+    out = np.empty((len(texts), PERMUTATIONS), dtype=np.uint32)
+    first = 0
+    while first < len(texts):
+        last, chars = first, 0
+        while last < len(texts) and (last == first or chars < _BATCH_CHARS):
+            chars += len(texts[last]) + SHINGLE
+            last += 1
+        hashes, starts = _shingle_hashes(texts[first:last])
+        permuted = np.empty_like(hashes)
+        for p in range(PERMUTATIONS):
+            # a·x + b mod 2^32 (a odd) permutes the 32-bit hashes
+            np.multiply(hashes, a[p], out=permuted)
+            permuted += b[p]
+            out[first:last, p] = np.minimum.reduceat(permuted, starts)
+        first = last
+    return out
+
+
+def _components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Connected components of the *n* nodes linked by (left, right): each node's smallest member."""
+    label = np.arange(n, dtype=np.int64)
+    while len(left):
+        low = np.minimum(label[left], label[right])
+        before = label.copy()
+        np.minimum.at(label, left, low)
+        np.minimum.at(label, right, low)
+        label = label[label]  # pointer jumping
+        if np.array_equal(label, before):
+            break
+    return label
+
+
+class NearDuplicates:
+    """Near-duplicate clusters of one response column; see the module docstring."""
+
+    def __init__(self, series: pd.Series, threshold: float):
+        self.threshold = threshold
+        self.n_rows = 0
+        # Per row: its distinct cleaned text (-1 for nulls)
+        self.text_of_row = np.zeros(0, dtype=np.int64)
+        # Per distinct cleaned text: signature, and cluster (its smallest text id)
+        self._ids: Dict[str, int] = {}
+        self.signatures = np.zeros((0, PERMUTATIONS), dtype=np.uint32)
+        self.cluster_of_text = np.zeros(0, dtype=np.int64)
+        self.lock = threading.RLock()
+        self.extend(series)
+
+    def extend(self, tail: pd.Series) -> None:
+        """Add the rows of *tail* (the rows appended to the column since the last call)."""
+        with self.lock:
+            notna = tail.notna().to_numpy()
+            # Distinct raw values first: clean_text() runs once per value, not per row
+            local, uniques = pd.factorize(tail[notna].astype(str))
+            mapping = np.empty(len(uniques), dtype=np.int64)
+            fresh: List[str] = []
+            for i, value in enumerate(uniques.tolist()):
+                cleaned = clean_text(value)
+                text_id = self._ids.get(cleaned)
+                if text_id is None:
+                    text_id = self._ids[cleaned] = len(self._ids)
+                    fresh.append(cleaned)
+                mapping[i] = text_id
+
+            text_of_row = np.full(len(tail), -1, dtype=np.int64)
+            text_of_row[notna] = mapping[local]
+            self.text_of_row = np.concatenate([self.text_of_row, text_of_row])
+            self.n_rows += len(tail)
+            if fresh:
+                self.signatures = np.concatenate([self.signatures, signatures(fresh)])
+                self.cluster_of_text = self._cluster()
+
+    def _cluster(self) -> np.ndarray:
+        """Cluster of every distinct text (LSH candidates, verified on their signatures)."""
+        n = len(self.signatures)
+        _, _, band_mix = _coefficients()
+        needed = math.ceil(self.threshold * PERMUTATIONS)
+        left, right = [], []
+        for band in range(BANDS):
+            values = self.signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            keys = (values.astype(np.uint64) * band_mix).sum(axis=1, dtype=np.uint64)
+            bucket, distinct = pd.factorize(keys)
+            if len(distinct) == n:
+                continue  # no shared bucket in this band
+            first = np.empty(len(distinct), dtype=np.int64)
+            first[bucket[::-1]] = np.arange(n - 1, -1, -1)  # first text of each bucket
+            others = np.flatnonzero(first[bucket] != np.arange(n))
+            leaders = first[bucket[others]]
+            agree = (self.signatures[others] == self.signatures[leaders]).sum(axis=1)
+            similar = agree >= needed
+            left.append(others[similar])
+            right.append(leaders[similar])
+        if not left:
+            return np.arange(n, dtype=np.int64)
+        return _components(n, np.concatenate(left), np.concatenate(right))
+
+    def collapse(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One representative per cluster among *rows* (ascending positions) —
+        its first row — with how many of *rows* the cluster holds, in row order.
+        """
+        with self.lock:
+            texts = self.text_of_row[rows]
+            clusters = np.where(
+                texts >= 0,
+                self.cluster_of_text[np.maximum(texts, 0)],
+                len(self.cluster_of_text) + rows,  # nulls stand alone
+            )
+        _, first, counts = np.unique(clusters, return_index=True, return_counts=True)
+        order = np.argsort(first, kind="stable")
+        return rows[first[order]], counts[order].astype(np.int64)
+
+    def report(self, representatives: np.ndarray, weights: np.ndarray,
+               series: pd.Series) -> Dict[str, Any]:
+        """What collapse() grouped: cluster counts and the largest clusters."""
+        largest = np.lexsort((representatives, -weights))[:REPORT_CLUSTERS]
+        largest = largest[weights[largest] > 1]
+        texts = series.iloc[representatives[largest]].astype(str).tolist()
+        return {
+            "threshold": self.threshold,
+            "clusters": int((weights > 1).sum()),
+            "collapsed_responses": int(weights.sum() - len(weights)),
+            "largest": [
+                {"text": text, "count": int(count)}
+                for text, count in zip(texts, weights[largest].tolist())
+            ],
+        }
+
+
+def column_near_duplicates(df: pd.DataFrame, file_id: str, column: str) -> NearDuplicates:
+    """
+    Return the near-duplicate clusters of *column* at NEAR_DUPLICATE_THRESHOLD,
+    building them on first use and extending them with rows appended since.
+    Runs in a thread pool.
+    """
+    name = ("near_duplicates", column, settings.NEAR_DUPLICATE_THRESHOLD)
+    dups = artifact_get(file_id, name)
+    if dups is None or dups.n_rows > len(df):
+        dups = NearDuplicates(df[column], settings.NEAR_DUPLICATE_THRESHOLD)
+        artifact_set(file_id, name, dups)
+    else:
+        with dups.lock:
+            if dups.n_rows < len(df):
+                dups.extend(df[column].iloc[dups.n_rows:])
+    return dups
@@ -2,80 +2,157 @@
 Servicio de análisis cuantitativo para respuestas numéricas (escala 1-5).
 """
 
-import statistics
-from typing import List, Dict, Any, Optional
+import math
 from collections import Counter
+from fractions import Fraction
+from typing import List, Dict, Any, Optional
 
 
-def analyze_quantitative(responses: List[str]) -> Dict[str, Any]:
+def _parse_score(r) -> Optional[float]:
+    """Answer → value on the 1-5 scale, or None when it isn't one."""
+    try:
+        val = float(str(r).strip())
+    except (ValueError, TypeError):
+        return None
+    return val if 1 <= val <= 5 else None
+
+
+def _empty_result(total: int, invalid: int) -> Dict[str, Any]:
+    return {
+        "summary": {
+            "total": total,
+            "valid": 0,
+            "invalid": invalid,
+            "mean": 0,
+            "median": 0,
+            "std_dev": 0,
+            "min": 0,
+            "max": 0,
+        },
+        "distribution": {
+            str(i): {"count": 0, "pct": 0} for i in range(1, 6)
+        },
+    }
+
+
+class QuantAccumulator:
     """
-    Analiza respuestas numéricas (escala 1-5).
-    Recibe strings y los convierte a float, ignorando valores inválidos.
+    Estado incremental de analyze_quantitative: un histograma exacto de los
+    valores válidos (valor → conteo) más los totales. add() acepta nuevas
+    respuestas en cualquier momento y result() devuelve lo mismo que
+    analyze_quantitative con todas las respuestas acumuladas.
     """
-    # Convertir a números, filtrar inválidos
-    valid_values: List[float] = []
-    invalid_count = 0
-
-    for r in responses:
-        try:
-            val = float(str(r).strip())
-            if 1 <= val <= 5:
-                valid_values.append(val)
+
+    def __init__(self):
+        self.total = 0
+        self.invalid = 0
+        self.values: Counter = Counter()
+
+    def add(self, responses: List[str]) -> "QuantAccumulator":
+        for r in responses:
+            val = _parse_score(r)
+            if val is None:
+                self.invalid += 1
             else:
-                invalid_count += 1
-        except (ValueError, TypeError):
-            invalid_count += 1
+                self.values[val] += 1
+        self.total += len(responses)
+        return self
+
+    def _nth(self, ordered: List[float], n: int) -> float:
+        """n-th (0-based) valid value in ascending order."""
+        seen = 0
+        for v in ordered:
+            seen += self.values[v]
+            if n < seen:
+                return v
+        raise IndexError(n)
+
+    def result(self) -> Dict[str, Any]:
+        valid = sum(self.values.values())
+        if valid == 0:
+            return _empty_result(self.total, self.invalid)
+
+        # Exact arithmetic, like the statistics module, so the rounded
+        # figures match analyze_quantitative on the raw list
+        ordered = sorted(self.values)
+        sx = sum(Fraction(v) * c for v, c in self.values.items())
+        mean_exact = sx / valid
+        mean_val = round(float(mean_exact), 2)
+
+        mid = valid // 2
+        if valid % 2:
+            median = self._nth(ordered, mid)
+        else:
+            median = (self._nth(ordered, mid - 1) + self._nth(ordered, mid)) / 2
+        median_val = round(median, 2)
 
-    total = len(responses)
-    valid = len(valid_values)
+        if valid > 1:
+            ss = sum((Fraction(v) - mean_exact) ** 2 * c for v, c in self.values.items())
+            std_dev = round(math.sqrt(ss / (valid - 1)), 2)
+        else:
+            std_dev = 0
+
+        # Distribución de frecuencias (1-5)
+        counts: Counter = Counter()
+        for v, c in self.values.items():
+            counts[int(v)] += c
+        distribution = {}
+        for i in range(1, 6):
+            c = counts.get(i, 0)
+            distribution[str(i)] = {
+                "count": c,
+                "pct": round((c / valid) * 100, 1) if valid > 0 else 0,
+            }
 
-    if valid == 0:
         return {
             "summary": {
-                "total": total,
-                "valid": 0,
-                "invalid": invalid_count,
-                "mean": 0,
-                "median": 0,
-                "std_dev": 0,
-                "min": 0,
-                "max": 0,
-            },
-            "distribution": {
-                str(i): {"count": 0, "pct": 0} for i in range(1, 6)
+                "total": self.total,
+                "valid": valid,
+                "invalid": self.invalid,
+                "mean": mean_val,
+                "median": median_val,
+                "std_dev": std_dev,
+                "min": ordered[0],
+                "max": ordered[-1],
             },
+            "distribution": distribution,
         }
 
-    # Estadísticas básicas
-    mean_val = round(statistics.mean(valid_values), 2)
-    median_val = round(statistics.median(valid_values), 2)
-    std_dev = round(statistics.stdev(valid_values), 2) if valid > 1 else 0
-    min_val = min(valid_values)
-    max_val = max(valid_values)
-
-    # Distribución de frecuencias (1-5)
-    counts = Counter(int(v) for v in valid_values)
-    distribution = {}
-    for i in range(1, 6):
-        c = counts.get(i, 0)
-        distribution[str(i)] = {
-            "count": c,
-            "pct": round((c / valid) * 100, 1) if valid > 0 else 0,
-        }
 
-    return {
-        "summary": {
-            "total": total,
-            "valid": valid,
-            "invalid": invalid_count,
-            "mean": mean_val,
-            "median": median_val,
-            "std_dev": std_dev,
-            "min": min_val,
-            "max": max_val,
-        },
-        "distribution": distribution,
-    }
+class GroupedQuantAccumulator:
+    """Un QuantAccumulator por grupo; forma incremental de analyze_quantitative_by_group."""
+
+    def __init__(self):
+        self.groups: Dict[str, QuantAccumulator] = {}
+
+    def add(self, responses: List[str], groups: List[str]) -> "GroupedQuantAccumulator":
+        if len(responses) != len(groups):
+            raise ValueError("responses y groups deben tener la misma longitud")
+
+        # Agrupar respuestas por grupo
+        grouped: Dict[str, List[str]] = {}
+        for resp, group in zip(responses, groups):
+            group_key = str(group).strip()
+            if group_key not in grouped:
+                grouped[group_key] = []
+            grouped[group_key].append(resp)
+
+        for group_name, group_responses in grouped.items():
+            if group_name not in self.groups:
+                self.groups[group_name] = QuantAccumulator()
+            self.groups[group_name].add(group_responses)
+        return self
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        return {name: acc.result() for name, acc in sorted(self.groups.items())}
+
+
+def analyze_quantitative(responses: List[str]) -> Dict[str, Any]:
+    """
+    Analiza respuestas numéricas (escala 1-5).
+    Recibe strings y los convierte a float, ignorando valores inválidos.
+    """
+    return QuantAccumulator().add(responses).result()
 
 
 def analyze_quantitative_by_group(
@@ -86,20 +163,4 @@ def analyze_quantitative_by_group(
     Analiza respuestas numéricas agrupadas (ej: por departamento).
     responses y groups deben tener la misma longitud.
     """
-    if len(responses) != len(groups):
-        raise ValueError("responses y groups deben tener la misma longitud")
-
-    # Agrupar respuestas por grupo
-    grouped: Dict[str, List[str]] = {}
-    for resp, group in zip(responses, groups):
-        group_key = str(group).strip()
-        if group_key not in grouped:
-            grouped[group_key] = []
-        grouped[group_key].append(resp)
-
-    # Analizar cada grupo
-    results = {}
-    for group_name, group_responses in sorted(grouped.items()):
-        results[group_name] = analyze_quantitative(group_responses)
-
-    return results
+    return GroupedQuantAccumulator().add(responses, groups).result()
@@ -0,0 +1,112 @@
+"""
+Per-evaluee reports: every question analyzed for each evaluee of a file.
+
+Why this exists:
+  Academic affairs needs one report per professor — several hundred of
+  them. Calling /multi-analyze with an EVALUADO filter once per person
+  reloads, refilters and reanalyzes the file every time. A report job
+  (app.routers.reports) instead partitions the selected rows once — by
+  evaluee, then by question — and hands batches of partitions to the
+  worker processes (app.core.executors.run_in_process), where
+  analyze_evaluees() runs the same accumulators as /multi-analyze.
+
+  Each evaluee's report holds exactly the "questions" /multi-analyze
+  returns for that evaluee alone (filters + EVALUADO = evaluee).
+
+  Partitions travel to the workers as plain lists of strings: only the
+  responses, never the DataFrame.
+
+Usage:
+  for batch in evaluee_batches(df, evaluees, questions, ...):   # parent
+      results = await run_in_process(analyze_evaluees, batch)    # workers
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.lazy import lazy_import
+from app.services.quantitative_analyzer import QuantAccumulator
+from app.services.text_analyzer import KnownNames, TextAccumulator
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Evaluees per task sent to a worker process
+BATCH_EVALUEES = 8
+
+# (question number, analysis type, responses) of one evaluee
+Partition = List[Tuple[str, str, List[str]]]
+
+
+def analyze_partition(questions: Partition, known_names: Optional[KnownNames]) -> List[Dict[str, Any]]:
+    """The /multi-analyze question results of one evaluee's responses."""
+    results = []
+    for q_num, q_type, responses in questions:
+        acc = QuantAccumulator() if q_type == "quantitative" else TextAccumulator(known_names)
+        acc.add(responses)
+        results.append({
+            "question_number": q_num,
+            "analysis_type": q_type,
+            "total_responses": acc.total,
+            "quantitative": None,
+            "qualitative": None,
+            "by_group": None,
+        })
+        if acc.total and q_type in ("quantitative", "qualitative"):
+            results[-1][q_type] = acc.result()
+    return results
+
+
+def analyze_evaluees(batch: List[Tuple[int, str, Optional[KnownNames], Partition]]
+                     ) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Reports of a batch of (index, evaluee, known names, partition) — the
+    entry point of the worker processes.
+    """
+    return [
+        (index, {"evaluee": evaluee, "questions": analyze_partition(questions, known_names)})
+        for index, evaluee, known_names, questions in batch
+    ]
+
+
+def evaluee_batches(
+    df: pd.DataFrame,
+    evaluees: List[Tuple[str, np.ndarray]],
+    questions: List[Tuple[str, str]],
+    question_rows: Dict[str, np.ndarray],
+    respuesta_col: str,
+    known_names: Callable[[np.ndarray], Optional[KnownNames]],
+) -> Iterator[List[Tuple[int, str, Optional[KnownNames], Partition]]]:
+    """
+    Batches of BATCH_EVALUEES partitions for analyze_evaluees(). *evaluees*
+    holds each evaluee's selected rows and *question_rows* each question
+    number's rows (ascending positions of *df*); *questions* are the
+    requested (number, type) pairs. *known_names(rows)* gives the names
+    /multi-analyze would use for those rows.
+    """
+    # Question of every row, once: a partition is then a split of the
+    # evaluee's rows instead of one intersection per question
+    numbers = list(question_rows)
+    question_of = np.full(len(df), -1, dtype=np.int64)
+    for code, q_num in enumerate(numbers):
+        question_of[question_rows[q_num]] = code
+    responses = df[respuesta_col]
+    has_response = responses.notna().to_numpy()
+
+    batch = []
+    for index, (evaluee, selected) in enumerate(evaluees):
+        rows = selected[has_response[selected] & (question_of[selected] >= 0)]
+        codes = question_of[rows]
+        order = np.argsort(codes, kind="stable")  # row order kept within a question
+        rows, codes = rows[order], codes[order]
+        bounds = np.searchsorted(codes, np.arange(len(numbers) + 1))
+        texts = responses.iloc[rows].astype(str).tolist()
+        split = {q_num: texts[bounds[code]:bounds[code + 1]] for code, q_num in enumerate(numbers)}
+        partition = [(q_num, q_type, split[q_num]) for q_num, q_type in questions]
+        batch.append((index, evaluee, known_names(selected), partition))
+        if len(batch) == BATCH_EVALUEES:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
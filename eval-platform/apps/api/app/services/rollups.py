@@ -0,0 +1,286 @@
+"""
+Materialized rollups of a file: per-cell tallies at (question × department ×
+evaluee) granularity, aggregated on query instead of scanning rows.
+
+Why this exists:
+  Dashboard views keep asking for small slices — one department, one
+  professor (EVALUADO), one question — and each went through the whole
+  /analyze pipeline over the raw rows. RollupCube scans the file once (kept
+  in the artifact store, extended when rows are appended) and keeps, for
+  every combination of dimension values that occurs (a "cell"):
+
+    * responses (non-null), 1-5 scores that didn't parse, and how many
+      times each valid score occurs — enough for the exact mean, median,
+      standard deviation and distribution QuantAccumulator reports
+    * the text tallies of /analyze's summary: valid / short responses,
+      summed length, sentiment counts and suggestions (from TextFeatures)
+
+  query() answers any roll-up or drill-down — filter some dimensions, group
+  by others — by summing the selected cells' tallies: the cost depends on
+  the number of cells, not on the number of rows. Its quantitative figures
+  are exactly /multi-analyze's for the same rows.
+
+  Dimension values are compared as str(value).strip(), as the question
+  partition does.
+
+Usage:
+  cube = rollup_cube(df, file_id, ["PREGUNTA", "DEPARTAMENTO", "EVALUADO"], "RESPUESTA")
+  groups = cube.query({"DEPARTAMENTO": ["Lenguas"]}, group_by=["EVALUADO"])
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.artifacts import artifact_get, artifact_set
+from app.core.lazy import lazy_import
+from app.services.quantitative_analyzer import QuantAccumulator, _parse_score
+from app.services.text_features import SENTIMENTS, TextFeatures, column_features
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Dimensions after the question column, when the file has them
+DEFAULT_DIMENSIONS = ("DEPARTAMENTO", "EVALUADO")
+
+
+def _distinct_rows(codes: List[np.ndarray], sizes: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distinct rows of the code columns *codes* (codes of column i < sizes[i])
+    → (distinct rows × columns, each input row's index into them).
+    """
+    n_rows = len(codes[0]) if codes else 0
+    if int(np.prod([max(size, 1) for size in sizes], dtype=object)) < 2**62:
+        # One int64 key per row (mixed radix): hashing it beats sorting rows
+        key = np.zeros(n_rows, dtype=np.int64)
+        for column, size in zip(codes, sizes):
+            key = key * max(size, 1) + column
+        local, distinct = pd.factorize(key)
+        rows = np.zeros((len(distinct), len(codes)), dtype=np.int64)
+        rest = np.asarray(distinct, dtype=np.int64)
+        for i in range(len(codes) - 1, -1, -1):
+            rest, rows[:, i] = np.divmod(rest, max(sizes[i], 1))
+        return rows, local
+    stacked = np.stack(codes, axis=1).reshape(n_rows, len(codes))
+    rows, local = np.unique(stacked, axis=0, return_inverse=True)
+    return rows, local.reshape(-1)
+
+
+class RollupCube:
+    """Per-cell tallies of one response column over *dims*; see the module docstring."""
+
+    def __init__(self, df: pd.DataFrame, dims: List[str], response_col: str, features: TextFeatures):
+        self.dims = list(dims)
+        self.response_col = response_col
+        self.n_rows = 0
+        # Per dimension: value labels, and label → code
+        self.labels: List[List[str]] = [[] for _ in self.dims]
+        self._codes: List[Dict[str, int]] = [{} for _ in self.dims]
+        # Distinct valid scores (columns of `scores`), and score → column
+        self.score_values: List[float] = []
+        self._score_ids: Dict[float, int] = {}
+        # Cells: codes of each dimension value (cells × dims), and code tuple → cell
+        self.cell_codes = np.zeros((0, len(self.dims)), dtype=np.int32)
+        self._cells: Dict[tuple, int] = {}
+        self.responses = np.zeros(0, dtype=np.int64)
+        self.invalid = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros((0, 0), dtype=np.int64)
+        self.text_valid = np.zeros(0, dtype=np.int64)
+        self.short = np.zeros(0, dtype=np.int64)
+        self.length = np.zeros(0, dtype=np.int64)
+        self.suggestions = np.zeros(0, dtype=np.int64)
+        self.sentiment = np.zeros((0, len(SENTIMENTS)), dtype=np.int64)
+        self.lock = threading.Lock()
+        self.extend(df, features)
+
+    # ── Building ──────────────────────────────────────────────────────────────
+
+    def _encode(self, d: int, series: pd.Series) -> np.ndarray:
+        """Codes of *series*' values along dimension *d*, adding new values."""
+        # Distinct raw values first: str() / strip() run once per value, not per row
+        local, uniques = pd.factorize(series, use_na_sentinel=False)
+        codes, labels = self._codes[d], self.labels[d]
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques.tolist()):
+            label = str(value).strip()
+            code = codes.get(label)
+            if code is None:
+                code = codes[label] = len(labels)
+                labels.append(label)
+            mapping[i] = code
+        return mapping[local]
+
+    def _score_columns(self, responses: pd.Series) -> np.ndarray:
+        """Column of each response's score in `scores`, -1 if it isn't a 1-5 score."""
+        local, uniques = pd.factorize(responses)
+        mapping = np.full(len(uniques), -1, dtype=np.int64)
+        for i, response in enumerate(uniques.tolist()):
+            value = _parse_score(str(response))
+            if value is not None:
+                column = self._score_ids.get(value)
+                if column is None:
+                    column = self._score_ids[value] = len(self.score_values)
+                    self.score_values.append(value)
+                mapping[i] = column
+        return mapping[local]
+
+    def _grow(self, new_cells: int) -> None:
+        grow = lambda a: np.concatenate([a, np.zeros((new_cells, *a.shape[1:]), dtype=a.dtype)])
+        self.responses, self.invalid = grow(self.responses), grow(self.invalid)
+        self.text_valid, self.short = grow(self.text_valid), grow(self.short)
+        self.length, self.suggestions = grow(self.length), grow(self.suggestions)
+        self.sentiment, self.scores = grow(self.sentiment), grow(self.scores)
+
+    def extend(self, df: pd.DataFrame, features: TextFeatures) -> None:
+        """Add the rows of *df* past the first n_rows (*features* covers them)."""
+        with self.lock:
+            tail = df.iloc[self.n_rows:]
+            rows = np.flatnonzero(tail[self.response_col].notna().to_numpy())
+            tail = tail.iloc[rows]
+            positions = rows + self.n_rows  # in the whole file (features' rows)
+
+            codes = [self._encode(d, tail[dim]) for d, dim in enumerate(self.dims)]
+            keys, local = _distinct_rows(codes, [len(labels) for labels in self.labels])
+            cell_of = np.empty(len(keys), dtype=np.int64)
+            fresh = []
+            for i, key in enumerate(map(tuple, keys.tolist())):
+                cell = self._cells.get(key)
+                if cell is None:
+                    cell = self._cells[key] = len(self._cells)
+                    fresh.append(key)
+                cell_of[i] = cell
+            if fresh:
+                self.cell_codes = np.concatenate(
+                    [self.cell_codes, np.asarray(fresh, dtype=np.int32).reshape(-1, len(self.dims))]
+                )
+                self._grow(len(fresh))
+            cells = cell_of[local]
+            n_cells = len(self._cells)
+            tally = lambda weights=None: np.bincount(cells, weights=weights, minlength=n_cells).astype(np.int64)
+
+            score_cols = self._score_columns(tail[self.response_col])
+            if self.scores.shape[1] < len(self.score_values):
+                extra = len(self.score_values) - self.scores.shape[1]
+                self.scores = np.concatenate(
+                    [self.scores, np.zeros((n_cells, extra), dtype=np.int64)], axis=1
+                )
+            scored = score_cols >= 0
+            n_scores = len(self.score_values)
+            if n_scores:
+                self.scores += np.bincount(
+                    cells[scored] * n_scores + score_cols[scored], minlength=n_cells * n_scores
+                ).reshape(n_cells, n_scores)
+
+            with features.lock:
+                valid = features.valid[positions]
+                short = features.short[positions]
+                length = features.length[positions]
+                sentiment = features.sentiment[positions]
+                suggestion = features.suggestion[positions]
+            self.responses += tally()
+            self.invalid += tally(~scored)
+            self.text_valid += tally(valid)
+            self.short += tally(short)
+            self.length += tally(np.where(valid, length, 0))
+            self.suggestions += tally(valid & suggestion)
+            for code in range(len(SENTIMENTS)):
+                self.sentiment[:, code] += tally(valid & (sentiment == code))
+            self.n_rows = len(df)
+
+    # ── Querying ──────────────────────────────────────────────────────────────
+
+    def _quantitative(self, responses: int, invalid: int, scores: np.ndarray) -> Optional[Dict[str, Any]]:
+        if responses == invalid:
+            return None  # no 1-5 scores: not a quantitative slice
+        acc = QuantAccumulator()
+        acc.total, acc.invalid = responses, invalid
+        acc.values = Counter({
+            value: int(count) for value, count in zip(self.score_values, scores.tolist()) if count
+        })
+        return acc.result()
+
+    def _text(self, valid: int, short: int, responses: int, length: int,
+              sentiment: np.ndarray, suggestions: int) -> Dict[str, Any]:
+        return {
+            "total_responses": responses,
+            "valid_responses": valid,
+            "short_responses": short,
+            "avg_length": round(length / valid if valid else 0, 1),
+            "sentiment": {s: int(c) for s, c in zip(SENTIMENTS, sentiment.tolist())},
+            "suggestions": suggestions,
+        }
+
+    def query(self, filters: Optional[Dict[str, List[str]]] = None,
+              group_by: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Tallies of the cells matching *filters* (dimension → accepted values;
+        unknown values match nothing), summed per distinct combination of
+        the *group_by* dimensions (sorted by their values) — one group of
+        everything without *group_by*.
+        """
+        group_dims = [self.dims.index(dim) for dim in group_by or []]
+        with self.lock:
+            selected = np.ones(len(self._cells), dtype=bool)
+            for dim, values in (filters or {}).items():
+                d = self.dims.index(dim)
+                codes = [self._codes[d][v] for v in (str(v).strip() for v in values) if v in self._codes[d]]
+                selected &= np.isin(self.cell_codes[:, d], codes)
+            cells = np.flatnonzero(selected)
+            if not len(cells):
+                return []
+
+            if group_dims:
+                keys, groups = np.unique(self.cell_codes[cells][:, group_dims], axis=0, return_inverse=True)
+                groups = groups.reshape(-1)
+            else:
+                keys, groups = np.zeros((1, 0), dtype=np.int32), np.zeros(len(cells), dtype=np.int64)
+            n = len(keys)
+            total = lambda values: np.bincount(groups, weights=values[cells], minlength=n).astype(np.int64)
+            responses, invalid = total(self.responses), total(self.invalid)
+            valid, short = total(self.text_valid), total(self.short)
+            length, suggestions = total(self.length), total(self.suggestions)
+            sentiment = np.stack([total(self.sentiment[:, c]) for c in range(len(SENTIMENTS))], axis=1)
+            scores = np.stack(
+                [total(self.scores[:, c]) for c in range(len(self.score_values))], axis=1
+            ).reshape(n, len(self.score_values))
+            cell_counts = np.bincount(groups, minlength=n)
+            labels = [
+                {self.dims[d]: self.labels[d][code] for d, code in zip(group_dims, key)}
+                for key in keys.tolist()
+            ]
+
+        out = [
+            {
+                "group": labels[g],
+                "cells": int(cell_counts[g]),
+                "quantitative": self._quantitative(int(responses[g]), int(invalid[g]), scores[g]),
+                "text": self._text(
+                    int(valid[g]), int(short[g]), int(responses[g]), int(length[g]),
+                    sentiment[g], int(suggestions[g]),
+                ),
+            }
+            for g in range(n)
+        ]
+        return sorted(out, key=lambda item: [item["group"][self.dims[d]] for d in group_dims])
+
+
+def rollup_cube(df: pd.DataFrame, file_id: str, dims: List[str], response_col: str) -> RollupCube:
+    """
+    Return the file's rollup over *dims*, building it on first use and
+    extending it with rows appended since (runs in a thread pool).
+    """
+    name = ("rollup", tuple(dims), response_col)
+    features = column_features(df, file_id, response_col)
+    cube = artifact_get(file_id, name)
+    if cube is None or cube.n_rows > len(df):
+        cube = RollupCube(df, dims, response_col, features)
+        artifact_set(file_id, name, cube)
+    elif cube.n_rows < len(df):
+        cube.extend(df, features)
+    return cube
+
+
+def default_dimensions(df: pd.DataFrame, pregunta_col: str) -> List[str]:
+    return [pregunta_col, *(dim for dim in DEFAULT_DIMENSIONS if dim in df.columns)]
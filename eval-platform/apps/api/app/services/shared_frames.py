@@ -0,0 +1,276 @@
+"""
+Parsed files shared between uvicorn workers as memory-mapped Arrow files.
+
+Why this exists:
+  With --workers N every worker is its own process: a file parsed by the
+  worker that took the upload was parsed again by every other worker that
+  served an analysis of it, and each kept its own copy in memory. Now the
+  first worker to hold a parsed frame publishes it once as an Arrow IPC file
+  (SHARED_FRAMES_DIR); the others memory-map it instead of re-parsing. The
+  pages live in the OS page cache, shared by every worker, and columns that
+  Arrow can hand to pandas as-is (strings, numbers without nulls) aren't
+  copied at all.
+
+  A segment is named after the file and its row count
+  ("<file_id>.<rows>.arrow"), so appending rows publishes a new segment and
+  the old one is retired. Every worker that holds a segment's frame keeps a
+  reference marker next to it ("….ref.<pid>"); the periodic sweep releases
+  this worker's references to frames it no longer holds and deletes
+  segments whose `file:` metadata expired (or that an append superseded)
+  once no live worker references them.
+
+  pyarrow is optional: without it (or with SHARED_FRAMES off) nothing is
+  published and each worker parses its own copy, as before. Frames Arrow
+  can't round-trip exactly — e.g. a column mixing numbers and text — are
+  not published either.
+
+  Multi-worker mode needs REDIS_URL: file metadata must be shared too.
+
+Usage:
+  from app.services.shared_frames import attach, share_frame
+
+  df = attach(file_id, meta["rows"])   # → DataFrame or None (thread pool)
+  share_frame(file_id, df)             # publish in the background
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import glob
+import importlib.util
+import logging
+import os
+import re
+import weakref
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.cache import cache_get
+from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.metrics import describe, gauge_labels, inc, register_gauge
+
+pa = lazy_import("pyarrow")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT = re.compile(r"^(?P<file_id>.+)\.(?P<rows>\d+)\.arrow$")
+
+# segment path → the frame this worker attached / published (while alive)
+_held: Dict[str, weakref.ref] = {}
+_tasks: Set[asyncio.Task] = set()
+_sweeper: Optional[asyncio.Task] = None
+
+
+def enabled() -> bool:
+    return settings.SHARED_FRAMES and importlib.util.find_spec("pyarrow") is not None
+
+
+def _dir() -> str:
+    return settings.SHARED_FRAMES_DIR or os.path.join(settings.UPLOAD_DIR, "shared")
+
+
+def _segment_path(file_id: str, rows: int) -> str:
+    return os.path.join(_dir(), f"{file_id}.{rows}.arrow")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# ── References ────────────────────────────────────────────────────────────────
+
+def _hold(path: str, df: pd.DataFrame) -> None:
+    _held[path] = weakref.ref(df)
+    open(f"{path}.ref.{os.getpid()}", "a").close()
+
+
+def _release(path: str) -> None:
+    _held.pop(path, None)
+    try:
+        os.remove(f"{path}.ref.{os.getpid()}")
+    except FileNotFoundError:
+        pass
+
+
+def _live_refs(path: str) -> int:
+    """Workers still referencing *path*; markers of dead workers are removed."""
+    live = 0
+    for marker in glob.glob(glob.escape(path) + ".ref.*"):
+        pid = marker.rsplit(".", 1)[1]
+        if pid.isdigit() and _pid_alive(int(pid)):
+            live += 1
+        else:
+            try:
+                os.remove(marker)
+            except FileNotFoundError:
+                pass
+    return live
+
+
+# ── Publish / attach ──────────────────────────────────────────────────────────
+
+def publish(file_id: str, df: pd.DataFrame) -> bool:
+    """
+    Write *df* as the shared segment of *file_id* (runs in a thread pool).
+    Returns False when the frame can't be shared exactly; a segment already
+    published by another worker is reused.
+    """
+    path = _segment_path(file_id, len(df))
+    if os.path.exists(path):
+        _hold(path, df)
+        return True
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as exc:
+        logger.info("Frame of file %s not shared: %s", file_id, exc)
+        inc("evalplatform_shared_frames_total", outcome="unsupported")
+        return False
+    # Arrow must give back the same columns and dtypes (it stringifies
+    # non-string column names, for one) — checked on the empty schema
+    back = table.slice(0, 0).to_pandas()
+    if list(back.columns) != list(df.columns) or list(back.dtypes) != list(df.dtypes):
+        logger.info("Frame of file %s not shared: dtypes don't round-trip", file_id)
+        inc("evalplatform_shared_frames_total", outcome="unsupported")
+        return False
+
+    os.makedirs(_dir(), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)  # atomic: readers never see a partial segment
+    _hold(path, df)
+    inc("evalplatform_shared_frames_total", outcome="published")
+    return True
+
+
+def attach(file_id: str, rows: int) -> Optional[pd.DataFrame]:
+    """
+    The frame of *file_id* memory-mapped from its shared segment, or None
+    if no worker published one for *rows* rows (runs in a thread pool).
+    """
+    if not enabled():
+        return None
+    path = _segment_path(file_id, rows)
+    try:
+        source = pa.memory_map(path, "r")
+    except FileNotFoundError:
+        return None
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks: one block per column, so pandas doesn't consolidate
+    # (copy) same-dtype columns into one 2-D array
+    df = table.to_pandas(split_blocks=True)
+    _hold(path, df)
+    inc("evalplatform_shared_frames_total", outcome="attached")
+    return df
+
+
+def share_frame(file_id: str, df: pd.DataFrame) -> None:
+    """Publish *df* in the background (no-op when shared frames are off)."""
+    if not enabled():
+        return
+
+    async def _publish() -> None:
+        try:
+            await run_blocking(publish, file_id, df, pool="io")
+        except Exception as exc:
+            # Sharing is an optimisation: other workers just parse the file
+            inc("evalplatform_shared_frames_total", outcome="error")
+            logger.warning("⚠️  Sharing file %s failed: %s", file_id, exc)
+
+    # Fresh context: the publish mustn't land in the request's Server-Timing
+    task = asyncio.get_running_loop().create_task(_publish(), context=contextvars.Context())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+# ── Cleanup ───────────────────────────────────────────────────────────────────
+
+def _segments() -> List[Tuple[str, str, int]]:
+    """(path, file_id, rows) of every segment in the shared directory."""
+    found = []
+    for path in glob.glob(os.path.join(glob.escape(_dir()), "*.arrow")):
+        match = _SEGMENT.match(os.path.basename(path))
+        if match:
+            found.append((path, match["file_id"], int(match["rows"])))
+    return found
+
+
+def sweep() -> int:
+    """
+    Release this worker's references to frames it no longer holds, and
+    delete segments whose file expired or was appended to once no live
+    worker references them. Returns the number of segments deleted.
+    """
+    for path, ref in list(_held.items()):
+        if ref() is None:  # evicted from the artifact store and collected
+            _release(path)
+
+    deleted = 0
+    for path, file_id, rows in _segments():
+        meta = cache_get(f"file:{file_id}")
+        if meta and meta.get("rows") == rows:
+            continue
+        # Retired: nothing will attach to it again
+        _release(path)
+        if _live_refs(path):
+            continue
+        try:
+            os.remove(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+    for tmp in glob.glob(os.path.join(glob.escape(_dir()), "*.tmp")):
+        pid = tmp.rsplit(".", 2)[1]
+        if pid.isdigit() and not _pid_alive(int(pid)):
+            os.remove(tmp)  # left by a worker that died mid-publish
+    if deleted:
+        inc("evalplatform_shared_frames_total", deleted, outcome="deleted")
+    return deleted
+
+
+async def _sweep_forever() -> None:
+    while True:
+        await asyncio.sleep(settings.SHARED_FRAMES_SWEEP_SECONDS)
+        try:
+            await run_blocking(sweep, pool="io")
+        except Exception as exc:
+            logger.warning("⚠️  Shared frames sweep failed: %s", exc)
+
+
+def start_sweeper() -> None:
+    """Start the periodic sweep (in the app's startup hook)."""
+    global _sweeper
+    if not enabled():
+        if settings.SHARED_FRAMES:
+            logger.warning("⚠️  SHARED_FRAMES is on but pyarrow isn't installed — not sharing")
+        return
+    if not settings.REDIS_URL and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning("⚠️  Several workers without REDIS_URL: file metadata isn't shared")
+    _sweeper = asyncio.get_running_loop().create_task(_sweep_forever())
+
+
+def _segments_gauge() -> Dict:
+    if not enabled():
+        return {}
+    sizes = []
+    for path, _, _ in _segments():
+        try:
+            sizes.append(os.path.getsize(path))
+        except FileNotFoundError:
+            pass
+    return {gauge_labels(): sum(sizes)}
+
+
+register_gauge("evalplatform_shared_frames_bytes", _segments_gauge)
+describe("evalplatform_shared_frames_total", "Shared frame segments by outcome (published / attached / unsupported / deleted / error).")
+describe("evalplatform_shared_frames_bytes", "Size of the shared frame segments on disk.")
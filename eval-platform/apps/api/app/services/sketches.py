@@ -0,0 +1,78 @@
+"""
+Bounded-memory heavy-hitter counting.
+
+SpaceSaving (Metwally et al., 2005) tracks at most ``capacity`` distinct items.
+While fewer distinct items than that have been seen its counts are exact and
+it behaves exactly like a Counter; after that, a new item takes over the slot
+of the least-counted one and inherits its count as an error term. Every
+reported count is then an over-estimate by at most that item's error, which
+is itself at most total / capacity, and any item occurring more than
+total / capacity times is guaranteed to be tracked.
+
+It exposes the two Counter methods the text analyzer uses (update and
+most_common), so it can stand in for the n-gram Counters on very large
+corpora.
+"""
+
+import heapq
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Tuple
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.total = 0          # items counted
+        self.evictions = 0      # 0 → every count is exact
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # (count, item) min-heap over the tracked items, refreshed lazily:
+        # counts only grow, so an entry whose count is behind is re-pushed
+        self._heap: List[Tuple[int, str]] = []
+
+    @property
+    def exact(self) -> bool:
+        return self.evictions == 0
+
+    def _pop_min(self) -> Tuple[int, str]:
+        if not self._heap:
+            self._heap = [(c, item) for item, c in self.counts.items()]
+            heapq.heapify(self._heap)
+        while True:
+            count, item = heapq.heappop(self._heap)
+            current = self.counts.get(item)
+            if current == count:
+                return count, item
+            if current is not None:
+                heapq.heappush(self._heap, (current, item))
+
+    def update(self, items: Iterable[str]) -> None:
+        """Count *items*; a batch is pre-aggregated, then merged item by item."""
+        counts = self.counts
+        for item, n in Counter(items).items():
+            self.total += n
+            if item in counts:
+                counts[item] += n
+            elif len(counts) < self.capacity:
+                counts[item] = n
+            else:
+                # Weighted replacement: still over-counts by at most the
+                # evicted minimum, which is <= total / capacity
+                floor, evicted = self._pop_min()
+                del counts[evicted]
+                self.errors.pop(evicted, None)
+                counts[item] = floor + n
+                self.errors[item] = floor
+                heapq.heappush(self._heap, (floor + n, item))
+                self.evictions += 1
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """Top *n* (item, estimated count) — same order as Counter.most_common."""
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+    def max_error(self, items: Iterable[str]) -> int:
+        """Largest over-count among *items* (0 while the sketch is exact)."""
+        return max((self.errors.get(item, 0) for item in items), default=0)
@@ -1,7 +1,13 @@
+import heapq
+import itertools
 import re
-from collections import Counter
-from typing import List, Dict, Any, Optional
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
+from app.core.metrics import describe, inc
+from app.services.sketches import SpaceSaving
 
 STOPWORDS = {
     "de", "la", "que", "el", "en", "y", "a", "los", "del", "se", "las", "por",
@@ -137,7 +143,13 @@ def is_suggestion(text: str) -> bool:
     return False
 
 
-def extract_names(text: str, known_names: Optional[set] = None) -> List[str]:
+# Name parts of a file's evaluees, in the order extract_names() looks for them
+# (and reports them): sorted, so every process — API workers and report
+# workers alike — breaks ties between equally frequent names the same way
+KnownNames = Tuple[str, ...]
+
+
+def extract_names(text: str, known_names: Optional[KnownNames] = None) -> List[str]:
     found = []
     if known_names:
         text_lower = text.lower()
@@ -154,6 +166,115 @@ def extract_names(text: str, known_names: Optional[set] = None) -> List[str]:
     return found
 
 
+def extract_known_names(df, mask=None) -> Optional[KnownNames]:
+    """
+    Name parts (longer than two letters, capitalized) of the evaluees in the
+    EVALUADO column of *df* — of the rows in *mask* only, if given — for
+    extract_names(), sorted. None when the file has no EVALUADO column.
+    """
+    if "EVALUADO" not in df.columns:
+        return None
+    evaluados = df["EVALUADO"] if mask is None else df["EVALUADO"][mask]
+    known = set()
+    for full_name in evaluados.dropna().unique().tolist():
+        for part in str(full_name).strip().split():
+            if len(part) > 2:
+                known.add(part.capitalize())
+    return tuple(sorted(known))
+
+
+# ── Per-string memo ───────────────────────────────────────────────────────────
+#
+# The same responses come back over and over ("Excelente", "Ninguna", "Muy
+# buen profesor") — within a column, across files and across requests. The
+# analyzers look their tokens, sentiment, suggestion flag and name matches up
+# here, so each distinct string is analyzed once per process until it falls
+# out of the LRU (TEXT_MEMO_SIZE entries per kind).
+
+class _Memo:
+    """Per-string results, least recently used evicted first."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[Hashable], compute: Callable[[Hashable], Any]) -> List[Any]:
+        """The result of each of *keys*, computing (outside the lock) the ones not kept."""
+        with self._lock:
+            found = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                found.append(value)
+        missing = [i for i, value in enumerate(found) if value is None]
+        for i in missing:
+            found[i] = compute(keys[i])
+        if missing:
+            from app.core.config import settings
+            with self._lock:
+                for i in missing:
+                    self._entries[keys[i]] = found[i]
+                while len(self._entries) > max(0, settings.TEXT_MEMO_SIZE):
+                    self._entries.popitem(last=False)
+        inc("evalplatform_text_memo_total", len(keys) - len(missing), kind=self.kind, result="hit")
+        inc("evalplatform_text_memo_total", len(missing), kind=self.kind, result="miss")
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_analyses = _Memo("analysis")
+_name_matches = _Memo("names")
+
+# Known names (in their order) → short id used in the names memo keys;
+# ids are never reused, so dropping the table only orphans old memo entries
+_name_set_ids: Dict[tuple, int] = {}
+_name_set_counter = itertools.count()
+_name_sets_lock = threading.Lock()
+MAX_NAME_SET_IDS = 256
+
+# (tokens, sentiment, is suggestion) of one response
+TextAnalysis = Tuple[Tuple[str, ...], str, bool]
+
+
+def _analyze_text(text: str) -> TextAnalysis:
+    # Interned: the same few thousand words make up most tokens of the memo
+    tokens = tuple(sys.intern(token) for token in tokenize(text))
+    return tokens, classify_sentiment(text), is_suggestion(text)
+
+
+def clear_text_memo() -> None:
+    """Forget every memoized string (benchmarks time cold analyses with it)."""
+    _analyses.clear()
+    _name_matches.clear()
+
+
+def analyze_texts(texts: List[str]) -> List[TextAnalysis]:
+    """tokenize(), classify_sentiment() and is_suggestion() of each of *texts*, memoized."""
+    return _analyses.get_many(texts, _analyze_text)
+
+
+def names_in_texts(texts: List[str], known_names: Optional[KnownNames] = None) -> List[Tuple[str, ...]]:
+    """extract_names() of each of *texts* with *known_names*, memoized."""
+    # extract_names() reports matches in the names' order, which two equal
+    # sets built differently needn't share — so that order is the key
+    order = tuple(known_names) if known_names else ()
+    with _name_sets_lock:
+        set_id = _name_set_ids.get(order)
+        if set_id is None:
+            if len(_name_set_ids) >= MAX_NAME_SET_IDS:
+                _name_set_ids.clear()
+            set_id = _name_set_ids[order] = next(_name_set_counter)
+    return _name_matches.get_many(
+        [(set_id, text) for text in texts],
+        lambda key: tuple(extract_names(key[1], known_names)),
+    )
+
+
 def search_responses(
     responses: List[str],
     query: str,
@@ -177,97 +298,249 @@ def search_responses(
     }
 
 
+# How many of the longest suggestions / highlights a result keeps
+MAX_SUGGESTIONS = 20
+MAX_HIGHLIGHTS = 15
+# N-grams buffered before being merged into a SpaceSaving sketch
+SKETCH_BATCH = 50000
+
+
+def _keep_longest(kept: List[tuple], new: List[tuple], n: int) -> List[tuple]:
+    """
+    The *n* longest of kept + new (seq, text) items, earlier seq first on equal
+    length — the same order as a stable sort by length, so older items can be
+    trimmed to *n* without changing the final result.
+    """
+    return heapq.nsmallest(n, kept + new, key=lambda item: (-len(item[1]), item[0]))
+
+
+class TextAccumulator:
+    """
+    Incremental state behind analyze_responses: word / n-gram / name Counters,
+    sentiment tallies, length totals and the longest suggestions / highlights.
+
+    add() can be called again with more responses at any time (e.g. after new
+    survey rows were appended); result() returns exactly what
+    analyze_responses would return for every response added so far.
+
+    With *ngram_capacity* the bigram / trigram counts go to SpaceSaving
+    sketches tracking at most that many distinct n-grams each instead of
+    full Counters: identical results until a sketch fills up, bounded memory
+    and slightly over-estimated counts after that (see result()'s
+    ``ngram_counting``).
+    """
+
+    def __init__(self, known_names: Optional[KnownNames] = None, ngram_capacity: Optional[int] = None):
+        self.known_names = known_names
+        self.ngram_capacity = ngram_capacity
+        self.total = 0
+        self.valid = 0
+        self.short = 0
+        self.length_sum = 0
+        self.words: Counter = Counter()
+        if ngram_capacity:
+            self.bigrams = SpaceSaving(ngram_capacity)
+            self.trigrams = SpaceSaving(ngram_capacity)
+        else:
+            self.bigrams = Counter()
+            self.trigrams = Counter()
+        self.names: Counter = Counter()
+        self.sentiments = {"positivo": 0, "negativo": 0, "neutro": 0}
+        self.suggestions: List[tuple] = []
+        self.highlights_positive: List[tuple] = []
+        self.highlights_negative: List[tuple] = []
+
+    def add(self, responses: List[str]) -> "TextAccumulator":
+        valid = [r for r in responses if isinstance(r, str) and len(r.strip()) >= 10]
+        self.short += sum(1 for r in responses if isinstance(r, str) and 0 < len(r.strip()) < 10)
+
+        # Each distinct response is analyzed once and counted as many times
+        # as it occurs. Distinct responses are visited in order of first
+        # appearance, so every Counter receives its keys in the same order
+        # as one response at a time would — ties rank the same.
+        multiplicity = Counter(valid)
+        distinct = list(multiplicity)
+        analyses = analyze_texts(distinct)
+        names = names_in_texts(distinct, self.known_names)
+
+        all_tokens = []
+        all_names = []
+        repeated = []
+        # Suggestions / highlights keep their earliest occurrences
+        candidates: Dict[str, List[tuple]] = {}
+        for text, (tokens, sentiment, suggestion), found in zip(distinct, analyses, names):
+            count = multiplicity[text]
+            all_tokens.extend(tokens)
+            all_names.extend(found)
+            if count > 1:
+                repeated.append((tokens, found, count - 1))
+            self.sentiments[sentiment] += count
+            self.length_sum += len(text) * count
+            if suggestion or (len(text) > 80 and sentiment != "neutro"):
+                candidates[text] = []
+
+        self.words.update(all_tokens)
+        self.names.update(all_names)
+        for tokens, found, extra in repeated:
+            for token in tokens:
+                self.words[token] += extra
+            for name in found:
+                self.names[name] += extra
+
+        if self.ngram_capacity:
+            # Sketches are fed occurrence by occurrence, in batches (their
+            # counts depend on the batches), so the full n-gram lists of a
+            # huge corpus are never materialised
+            tokens_of = {text: analysis[0] for text, analysis in zip(distinct, analyses)}
+            all_bigrams = []
+            all_trigrams = []
+            for resp in valid:
+                tokens = tokens_of[resp]
+                all_bigrams.extend(get_ngrams(tokens, 2))
+                all_trigrams.extend(get_ngrams(tokens, 3))
+                if len(all_bigrams) >= SKETCH_BATCH:
+                    self.bigrams.update(all_bigrams)
+                    self.trigrams.update(all_trigrams)
+                    all_bigrams.clear()
+                    all_trigrams.clear()
+            self.bigrams.update(all_bigrams)
+            self.trigrams.update(all_trigrams)
+        else:
+            all_bigrams = []
+            all_trigrams = []
+            repeated_grams = []
+            for text, (tokens, _, _) in zip(distinct, analyses):
+                bigrams = get_ngrams(tokens, 2)
+                trigrams = get_ngrams(tokens, 3)
+                all_bigrams.extend(bigrams)
+                all_trigrams.extend(trigrams)
+                if multiplicity[text] > 1:
+                    repeated_grams.append((bigrams, trigrams, multiplicity[text] - 1))
+            self.bigrams.update(all_bigrams)
+            self.trigrams.update(all_trigrams)
+            for bigrams, trigrams, extra in repeated_grams:
+                for gram in bigrams:
+                    self.bigrams[gram] += extra
+                for gram in trigrams:
+                    self.trigrams[gram] += extra
+
+        if candidates:
+            keep = max(MAX_SUGGESTIONS, MAX_HIGHLIGHTS)
+            for seq, resp in enumerate(valid, self.valid):
+                seqs = candidates.get(resp)
+                if seqs is not None and len(seqs) < keep:
+                    seqs.append((seq, resp))
+        suggestions = []
+        highlights_positive = []
+        highlights_negative = []
+        for text, (_, sentiment, suggestion) in zip(distinct, analyses):
+            occurrences = candidates.get(text)
+            if occurrences is None:
+                continue
+            if suggestion:
+                suggestions.extend(occurrences)
+            if len(text) > 80 and sentiment == "positivo":
+                highlights_positive.extend(occurrences)
+            elif len(text) > 80 and sentiment == "negativo":
+                highlights_negative.extend(occurrences)
+
+        self.suggestions = _keep_longest(self.suggestions, suggestions, MAX_SUGGESTIONS)
+        self.highlights_positive = _keep_longest(self.highlights_positive, highlights_positive, MAX_HIGHLIGHTS)
+        self.highlights_negative = _keep_longest(self.highlights_negative, highlights_negative, MAX_HIGHLIGHTS)
+        self.valid += len(valid)
+        self.total += len(responses)
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        if not self.total:
+            return {"error": "No hay respuestas para analizar"}
+
+        word_freq = self.words.most_common(30)
+        bigram_freq = self.bigrams.most_common(20)
+        trigram_freq = self.trigrams.most_common(20)
+        avg_length = self.length_sum / self.valid if self.valid else 0
+
+        top_names = [
+            {"name": name, "count": count}
+            for name, count in self.names.most_common(25)
+            if count >= 2
+        ]
+
+        ngram_counting: Dict[str, Any] = {"mode": "exact"}
+        if self.ngram_capacity and not (self.bigrams.exact and self.trigrams.exact):
+            ngram_counting = {
+                "mode": "approximate",
+                "capacity": self.ngram_capacity,
+                # Reported counts exceed the true ones by at most this much
+                "max_error": max(
+                    self.bigrams.max_error(p for p, _ in bigram_freq),
+                    self.trigrams.max_error(p for p, _ in trigram_freq),
+                ),
+            }
+
+        return {
+            "summary": {
+                "total_responses": self.total,
+                "valid_responses": self.valid,
+                "short_responses": self.short,
+                "avg_length": round(avg_length, 1),
+            },
+            "sentiment": dict(self.sentiments),
+            "top_words": [{"word": w, "count": c} for w, c in word_freq],
+            "top_phrases": [{"phrase": p, "count": c} for p, c in bigram_freq],
+            "top_trigrams": [{"phrase": p, "count": c} for p, c in trigram_freq],
+            "top_names": top_names,
+            "suggestions": [text for _, text in self.suggestions],
+            "highlights": {
+                "positive": [text for _, text in self.highlights_positive],
+                "negative": [text for _, text in self.highlights_negative],
+            },
+            "ngram_counting": ngram_counting,
+        }
+
+
+class GroupedTextAccumulator:
+    """One TextAccumulator per group; the incremental form of analyze_by_group."""
+
+    def __init__(self, known_names: Optional[KnownNames] = None, ngram_capacity: Optional[int] = None):
+        self.known_names = known_names
+        self.ngram_capacity = ngram_capacity
+        self.groups: Dict[str, TextAccumulator] = {}
+
+    def add(self, responses: List[str], groups: List[str]) -> "GroupedTextAccumulator":
+        grouped: Dict[str, List[str]] = {}
+        for resp, group in zip(responses, groups):
+            if group not in grouped:
+                grouped[group] = []
+            grouped[group].append(resp)
+
+        for group_name, group_responses in grouped.items():
+            if group_name not in self.groups:
+                self.groups[group_name] = TextAccumulator(self.known_names, self.ngram_capacity)
+            self.groups[group_name].add(group_responses)
+        return self
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        return {name: acc.result() for name, acc in sorted(self.groups.items())}
+
+
 def analyze_responses(
     responses: List[str],
-    known_names: Optional[set] = None,
+    known_names: Optional[KnownNames] = None,
+    ngram_capacity: Optional[int] = None,
 ) -> Dict[str, Any]:
     if not responses:
         return {"error": "No hay respuestas para analizar"}
-
-    valid = [r for r in responses if isinstance(r, str) and len(r.strip()) >= 10]
-    short = [r for r in responses if isinstance(r, str) and 0 < len(r.strip()) < 10]
-
-    all_tokens = []
-    all_bigrams = []
-    all_trigrams = []
-    sentiments = {"positivo": 0, "negativo": 0, "neutro": 0}
-    suggestions = []
-    lengths = []
-    highlights_positive = []
-    highlights_negative = []
-    name_counter: Counter = Counter()
-
-    for resp in valid:
-        tokens = tokenize(resp)
-        all_tokens.extend(tokens)
-        all_bigrams.extend(get_ngrams(tokens, 2))
-        all_trigrams.extend(get_ngrams(tokens, 3))
-
-        sentiment = classify_sentiment(resp)
-        sentiments[sentiment] += 1
-
-        if is_suggestion(resp):
-            suggestions.append(resp)
-
-        lengths.append(len(resp))
-
-        if sentiment == "positivo" and len(resp) > 80:
-            highlights_positive.append(resp)
-        elif sentiment == "negativo" and len(resp) > 80:
-            highlights_negative.append(resp)
-
-        names = extract_names(resp, known_names)
-        for name in names:
-            name_counter[name] += 1
-
-    word_freq = Counter(all_tokens).most_common(30)
-    bigram_freq = Counter(all_bigrams).most_common(20)
-    trigram_freq = Counter(all_trigrams).most_common(20)
-    avg_length = sum(lengths) / len(lengths) if lengths else 0
-
-    highlights_positive.sort(key=len, reverse=True)
-    highlights_negative.sort(key=len, reverse=True)
-    suggestions.sort(key=len, reverse=True)
-
-    top_names = [
-        {"name": name, "count": count}
-        for name, count in name_counter.most_common(25)
-        if count >= 2
-    ]
-
-    return {
-        "summary": {
-            "total_responses": len(responses),
-            "valid_responses": len(valid),
-            "short_responses": len(short),
-            "avg_length": round(avg_length, 1),
-        },
-        "sentiment": sentiments,
-        "top_words": [{"word": w, "count": c} for w, c in word_freq],
-        "top_phrases": [{"phrase": p, "count": c} for p, c in bigram_freq],
-        "top_trigrams": [{"phrase": p, "count": c} for p, c in trigram_freq],
-        "top_names": top_names,
-        "suggestions": suggestions[:20],
-        "highlights": {
-            "positive": highlights_positive[:15],
-            "negative": highlights_negative[:15],
-        },
-    }
+    return TextAccumulator(known_names, ngram_capacity).add(responses).result()
 
 
 def analyze_by_group(
     responses: List[str],
     groups: List[str],
-    known_names: Optional[set] = None,
+    known_names: Optional[KnownNames] = None,
+    ngram_capacity: Optional[int] = None,
 ) -> Dict[str, Dict[str, Any]]:
-    grouped: Dict[str, List[str]] = {}
-    for resp, group in zip(responses, groups):
-        if group not in grouped:
-            grouped[group] = []
-        grouped[group].append(resp)
+    return GroupedTextAccumulator(known_names, ngram_capacity).add(responses, groups).result()
 
-    results = {}
-    for group_name, group_responses in sorted(grouped.items()):
-        results[group_name] = analyze_responses(group_responses, known_names)
 
-    return results
\ No newline at end of file
+describe("evalplatform_text_memo_total", "Per-string text analysis lookups by kind and memo hit / miss.")
@@ -0,0 +1,418 @@
+"""
+Per-row text features of one response column, computed once per file.
+
+Why this exists:
+  Every /analyze, /multi-analyze and /drilldown request used to re-tokenize
+  the same raw strings, re-run the sentiment lexicon and the suggestion
+  regexes and rebuild the word / n-gram Counters from scratch. TextFeatures
+  does that work once per (file, column) — kept in the per-file artifact
+  store, extended when rows are appended — and stores:
+
+    * one sparse document-term matrix (CSR: rows × terms, with counts) per
+      n-gram order — words, bigrams, trigrams — plus the vocabulary
+    * per-row arrays: length, valid / short flags, sentiment, suggestion
+
+  An analysis of any row subset (filters, one question, one department) is
+  then a row selection: term counts are column sums, summary figures are
+  masked sums, and the longest suggestions / highlights are a sort of the
+  selected rows. The results are exactly what TextAccumulator returns for
+  the same responses, ties included: every matrix row keeps its terms in
+  order of first appearance, so "first seen" is recoverable.
+
+  Repeated responses ("Excelente", "Ninguna") are analyzed once: rows are
+  factorized first and each distinct string goes through the per-string
+  memo of app.services.text_analyzer, shared with every other column and
+  request of the process.
+
+Usage:
+  features = column_features(df, file_id, "RESPUESTA")   # from the artifact store
+  result = features.analyze(rows, df["RESPUESTA"], known_names)
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.artifacts import artifact_get, artifact_set
+from app.core.lazy import lazy_import
+from app.services.near_duplicates import NearDuplicates
+from app.services.text_analyzer import (
+    MAX_HIGHLIGHTS,
+    MAX_SUGGESTIONS,
+    KnownNames,
+    analyze_texts,
+    classify_sentiment,
+    get_ngrams,
+    is_suggestion,
+    names_in_texts,
+)
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+SENTIMENTS = ("positivo", "negativo", "neutro")
+_SENTIMENT_CODE = {s: i for i, s in enumerate(SENTIMENTS)}
+_POSITIVE, _NEGATIVE = 0, 1
+
+# Distinct known-name sets whose per-row name matches are kept
+MAX_NAME_SETS = 4
+
+
+class TermMatrix:
+    """Sparse rows × terms count matrix that only grows (rows are appended)."""
+
+    def __init__(self):
+        self.vocab: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.int32)
+
+    def append_rows(self, rows: List[List[str]], codes: Optional[np.ndarray] = None) -> None:
+        """
+        Add one row per list of terms (in text order). With *codes*, *rows*
+        are the distinct lists and one row is added per code: rows[code].
+        """
+        ids = self.ids
+        indices: List[int] = []
+        data: List[int] = []
+        ends: List[int] = []
+        for terms in rows:
+            for term, count in Counter(terms).items():  # first-appearance order
+                term_id = ids.get(term)
+                if term_id is None:
+                    term_id = ids[term] = len(self.vocab)
+                    self.vocab.append(term)
+                indices.append(term_id)
+                data.append(count)
+            ends.append(len(indices))
+
+        ends = np.asarray(ends, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype=np.int32)
+        if codes is not None:
+            starts = np.concatenate([[0], ends[:-1]])
+            lengths = (ends - starts)[codes]
+            entries = np.repeat(starts[codes] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+            entries = entries + np.arange(int(lengths.sum()))
+            ends, indices, data = np.cumsum(lengths), indices[entries], data[entries]
+
+        offset = self.indptr[-1]
+        self.indptr = np.concatenate([self.indptr, offset + ends])
+        self.indices = np.concatenate([self.indices, indices])
+        self.data = np.concatenate([self.data, data])
+
+    def _entries(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Entry positions of *rows*, row after row, and each row's entry count."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return shift + np.arange(int(lengths.sum())), lengths
+
+    def select(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The sub-matrix of *rows* as CSR arrays (indptr, term ids, counts)."""
+        entries, lengths = self._entries(rows)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        return indptr, self.indices[entries], self.data[entries]
+
+    def top(self, rows: np.ndarray, n: int) -> List[Tuple[str, int]]:
+        """
+        The *n* most frequent terms over *rows* (ascending positions) — the
+        same list, in the same order, as Counter.most_common(n) over the
+        rows' terms: equal counts keep first-appearance order.
+        """
+        entries, _ = self._entries(rows)
+        if not len(entries):
+            return []
+        cols = self.indices[entries]
+
+        terms, first = np.unique(cols, return_index=True)
+        counts = np.bincount(cols, weights=self.data[entries], minlength=len(self.vocab))[terms]
+        order = np.lexsort((first, -counts))[:n]
+        return [(self.vocab[t], int(c)) for t, c in zip(terms[order], counts[order])]
+
+
+class TextFeatures:
+    """Tokenized form of one response column; see the module docstring."""
+
+    def __init__(self, series: pd.Series):
+        self.n_rows = 0
+        self.words = TermMatrix()
+        self.bigrams = TermMatrix()
+        self.trigrams = TermMatrix()
+        self.length = np.zeros(0, dtype=np.int64)
+        self.valid = np.zeros(0, dtype=bool)
+        self.short = np.zeros(0, dtype=bool)
+        self.sentiment = np.zeros(0, dtype=np.int8)
+        self.suggestion = np.zeros(0, dtype=bool)
+        # known names (in their order) → per-row extract_names()
+        # result, None until needed
+        self._names: Dict[Optional[tuple], List[Optional[Tuple[str, ...]]]] = {}
+        self._lowered: Optional[List[str]] = None
+        self.lock = threading.RLock()
+        self.extend(series)
+
+    def extend(self, tail: pd.Series) -> None:
+        """Add the rows of *tail* (the rows appended to the column since the last call)."""
+        with self.lock:
+            texts = _texts(tail)
+            # Distinct responses first: each one is tokenized and classified
+            # once (and looked up in the cross-request memo), then every row
+            # takes its response's features. Distinct values come in order of
+            # first appearance, so terms get the same ids as row by row.
+            local, uniques = pd.factorize(pd.Series(texts, dtype=object), use_na_sentinel=False)
+            uniques = uniques.tolist()
+            length = np.zeros(len(uniques), dtype=np.int64)
+            valid = np.zeros(len(uniques), dtype=bool)
+            short = np.zeros(len(uniques), dtype=bool)
+            sentiment = np.full(len(uniques), _SENTIMENT_CODE["neutro"], dtype=np.int8)
+            suggestion = np.zeros(len(uniques), dtype=bool)
+            words: List[Tuple[str, ...]] = [()] * len(uniques)
+
+            for i, text in enumerate(uniques):
+                stripped = len(text.strip()) if isinstance(text, str) else 0
+                if stripped >= 10:
+                    valid[i] = True
+                    length[i] = len(text)
+                elif stripped:
+                    short[i] = True
+            analyzed = np.flatnonzero(valid).tolist()
+            for i, (tokens, label, flag) in zip(analyzed, analyze_texts([uniques[i] for i in analyzed])):
+                words[i] = tokens
+                sentiment[i] = _SENTIMENT_CODE[label]
+                suggestion[i] = flag
+
+            self.words.append_rows(words, local)
+            self.bigrams.append_rows([get_ngrams(tokens, 2) for tokens in words], local)
+            self.trigrams.append_rows([get_ngrams(tokens, 3) for tokens in words], local)
+            self.length = np.concatenate([self.length, length[local]])
+            self.valid = np.concatenate([self.valid, valid[local]])
+            self.short = np.concatenate([self.short, short[local]])
+            self.sentiment = np.concatenate([self.sentiment, sentiment[local]])
+            self.suggestion = np.concatenate([self.suggestion, suggestion[local]])
+            for names in self._names.values():
+                names.extend([None] * len(texts))
+            if self._lowered is not None:
+                self._lowered.extend(t.lower() if t is not None else "" for t in texts)
+            self.n_rows += len(texts)
+
+    def _count_names(self, rows: np.ndarray, series: pd.Series, known_names: Optional[KnownNames]) -> Counter:
+        """extract_names() matches over the valid *rows*, computed once per row and name set."""
+        # extract_names() reports matches in the names' order, which two equal
+        # sets built differently needn't share — so that order is the key
+        key = tuple(known_names) if known_names else None
+        names = self._names.get(key)
+        if names is None:
+            if len(self._names) >= MAX_NAME_SETS:
+                self._names.pop(next(iter(self._names)))
+            names = self._names[key] = [None] * self.n_rows
+
+        rows = rows.tolist()
+        missing = [r for r in rows if names[r] is None]
+        if missing:
+            texts = series.iloc[missing].astype(str).tolist()
+            distinct = list(dict.fromkeys(texts))
+            found = dict(zip(distinct, names_in_texts(distinct, known_names)))
+            for r, text in zip(missing, texts):
+                names[r] = found[text]
+
+        counts: Counter = Counter()
+        for r in rows:
+            if names[r]:
+                counts.update(names[r])
+        return counts
+
+    def _longest(self, rows: np.ndarray, n: int) -> np.ndarray:
+        """The *n* longest of *rows*, earlier rows first on equal length."""
+        return rows[np.lexsort((rows, -self.length[rows]))[:n]]
+
+    def analyze(self, rows: np.ndarray, series: pd.Series,
+                known_names: Optional[KnownNames] = None,
+                near_duplicates: Optional[NearDuplicates] = None) -> Dict[str, Any]:
+        """
+        analyze_responses() over the responses at *rows* (ascending
+        positions of non-null rows of *series*, the column this was built from).
+
+        With *near_duplicates* (the column's clusters) only one response per
+        cluster is analyzed: counts and sentiment are weighted by the
+        cluster's size, term / name lists and the longest suggestions /
+        highlights see each cluster once, and "near_duplicates" reports
+        what was collapsed.
+        """
+        if not len(rows):
+            return {"error": "No hay respuestas para analizar"}
+
+        report = None
+        weights = np.ones(len(rows), dtype=np.int64)
+        if near_duplicates is not None:
+            rows, weights = near_duplicates.collapse(rows)
+            report = near_duplicates.report(rows, weights, series)
+
+        with self.lock:
+            valid = self.valid[rows]
+            valid_rows, valid_weights = rows[valid], weights[valid]
+            n_valid = int(valid_weights.sum())
+            length_sum = int((self.length[valid_rows] * valid_weights).sum())
+            sentiment = np.bincount(
+                self.sentiment[valid_rows], weights=valid_weights, minlength=len(SENTIMENTS)
+            ).astype(np.int64)
+
+            long_rows = valid_rows[self.length[valid_rows] > 80]
+            suggestions = self._longest(valid_rows[self.suggestion[valid_rows]], MAX_SUGGESTIONS)
+            positive = self._longest(long_rows[self.sentiment[long_rows] == _POSITIVE], MAX_HIGHLIGHTS)
+            negative = self._longest(long_rows[self.sentiment[long_rows] == _NEGATIVE], MAX_HIGHLIGHTS)
+
+            name_counts = self._count_names(valid_rows, series, known_names)
+
+            result = {
+                "summary": {
+                    "total_responses": int(weights.sum()),
+                    "valid_responses": n_valid,
+                    "short_responses": int(weights[self.short[rows]].sum()),
+                    "avg_length": round(length_sum / n_valid if n_valid else 0, 1),
+                },
+                "sentiment": {s: int(c) for s, c in zip(SENTIMENTS, sentiment)},
+                "top_words": [{"word": w, "count": c} for w, c in self.words.top(valid_rows, 30)],
+                "top_phrases": [{"phrase": p, "count": c} for p, c in self.bigrams.top(valid_rows, 20)],
+                "top_trigrams": [{"phrase": p, "count": c} for p, c in self.trigrams.top(valid_rows, 20)],
+                "top_names": [
+                    {"name": name, "count": count}
+                    for name, count in name_counts.most_common(25)
+                    if count >= 2
+                ],
+            }
+
+        text_of = lambda picked: series.iloc[picked].astype(str).tolist()
+        result["suggestions"] = text_of(suggestions)
+        result["highlights"] = {"positive": text_of(positive), "negative": text_of(negative)}
+        result["ngram_counting"] = {"mode": "exact"}
+        if report is not None:
+            result["near_duplicates"] = report
+        return result
+
+    def analyze_by_group(self, rows: np.ndarray, series: pd.Series, groups: List[Any],
+                         known_names: Optional[KnownNames] = None,
+                         near_duplicates: Optional[NearDuplicates] = None) -> Dict[str, Dict[str, Any]]:
+        """analyze_by_group(): one analyze() per distinct value of *groups* (aligned with *rows*)."""
+        members: Dict[Any, List[int]] = {}
+        for row, group in zip(rows.tolist(), groups):
+            if group not in members:
+                members[group] = []
+            members[group].append(row)
+        return {
+            name: self.analyze(np.asarray(group_rows, dtype=np.int64), series, known_names, near_duplicates)
+            for name, group_rows in sorted(members.items())
+        }
+
+    def labels(self, rows: np.ndarray, series: pd.Series) -> Tuple[List[str], List[bool]]:
+        """
+        Sentiment and suggestion flag of each response at *rows* (non-null
+        rows of *series*); short responses, which the features skip, are
+        classified on the spot as /drilldown does.
+        """
+        with self.lock:
+            classified = self.valid[rows].tolist()
+            codes = self.sentiment[rows].tolist()
+            flags = self.suggestion[rows].tolist()
+
+        sentiments: List[str] = []
+        suggestions: List[bool] = []
+        unclassified = [i for i, known in enumerate(classified) if not known]
+        texts = dict(zip(unclassified, series.iloc[rows[unclassified]].astype(str).tolist()))
+        for i, (known, code, flag) in enumerate(zip(classified, codes, flags)):
+            if known:
+                sentiments.append(SENTIMENTS[code])
+                suggestions.append(flag)
+            else:
+                sentiments.append(classify_sentiment(texts[i]))
+                suggestions.append(is_suggestion(texts[i]))
+        return sentiments, suggestions
+
+    def search(self, rows: np.ndarray, series: pd.Series, query: str, limit: int = 50) -> Dict[str, Any]:
+        """search_responses() over the responses at *rows*, using the cached lower-cased texts."""
+        query_lower = query.lower()
+        with self.lock:
+            if self._lowered is None:
+                self._lowered = [t.lower() if t is not None else "" for t in _texts(series)]
+            lowered = self._lowered
+            matched: List[int] = []
+            for r in rows.tolist():
+                if query_lower in lowered[r]:
+                    matched.append(r)
+                    if len(matched) >= limit:
+                        break
+            classified = self.valid[matched].tolist()
+            codes = self.sentiment[matched].tolist()
+
+        texts = series.iloc[matched].astype(str).tolist()
+        sentiments = {s: 0 for s in SENTIMENTS}
+        found = []
+        for text, known, code in zip(texts, classified, codes):
+            # Short responses aren't classified when the features are built
+            sentiment = SENTIMENTS[code] if known else classify_sentiment(text)
+            sentiments[sentiment] += 1
+            found.append({"text": text, "sentiment": sentiment})
+        return {
+            "query": query,
+            "total_matches": len(found),
+            "sentiment": sentiments,
+            "responses": found,
+        }
+
+
+def column_features(df: pd.DataFrame, file_id: str, column: str) -> TextFeatures:
+    """
+    Return the tokenized form of *column*, building it on first use and
+    extending it with rows appended since. Runs in a thread pool: the first
+    build tokenizes the whole column.
+    """
+    name = ("text_features", column)
+    features = artifact_get(file_id, name)
+    if features is None or features.n_rows > len(df):
+        features = TextFeatures(df[column])
+        artifact_set(file_id, name, features)
+    else:
+        with features.lock:
+            if features.n_rows < len(df):
+                features.extend(df[column].iloc[features.n_rows:])
+    return features
+
+
+def built_features(df: pd.DataFrame, file_id: str, column: str) -> Optional[TextFeatures]:
+    """
+    The tokenized form of *column* if this process already built it
+    (extended with rows appended since), else None — for lookups that are
+    cheaper as a scan of their rows than as a tokenization of the column.
+    """
+    features = artifact_get(file_id, ("text_features", column))
+    if features is None or features.n_rows > len(df):
+        return None
+    return column_features(df, file_id, column)
+
+
+def qualitative_from_features(df, features, response_col, group_by, known_names, mask=None,
+                              near_duplicates=None):
+    """
+    Qualitative analysis as row selections of the column's TextFeatures
+    (called inside run_blocking). *mask* selects the rows that pass the
+    filters and have a response. Same results as streaming the rows through
+    TextAccumulator unless *near_duplicates* collapses them.
+    """
+    rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+    general = features.analyze(rows, df[response_col], known_names, near_duplicates)
+    by_group = None
+    if group_by and group_by in df.columns:
+        groups = df[group_by].iloc[rows].astype(str).tolist()
+        by_group = features.analyze_by_group(
+            rows, df[response_col], groups, known_names, near_duplicates
+        )
+    return general, by_group, len(rows)
+
+
+def _texts(series: pd.Series) -> List[Optional[str]]:
+    """Responses as the analyzers see them: str(value), None for nulls."""
+    notna = series.notna().to_numpy()
+    values = series.astype(str).tolist()
+    return [v if ok else None for v, ok in zip(values, notna)]
@@ -0,0 +1,226 @@
+"""
+Comment topics: sparse TF-IDF vectors clustered with mini-batch k-means.
+
+Why this exists:
+  analyze_responses only offers frequency lists; coordinators want themes
+  ("carga de tareas", "puntualidad", "explica bien"). find_topics() groups
+  a selection of comments into topics and describes each with its top
+  terms, its most representative comments and its sentiment.
+
+  It reuses the column's TextFeatures — the words tokenize() kept, so
+  STOPWORDS and short words are already out — and never builds a dense
+  matrix:
+
+    1. vocabulary: words in at least MIN_DF comments and at most MAX_DF of
+       them, the MAX_TERMS most frequent
+    2. TF-IDF: (1 + log tf) · idf per word, each comment L2-normalized —
+       sparse CSR, built CHUNK_ROWS comments at a time
+    3. spherical mini-batch k-means (Sculley, 2010) on at most FIT_ROWS
+       sampled comments: BATCH comments per step, each centroid moving
+       towards its batch members at rate 1 / (comments it has seen)
+    4. every comment is assigned to its most similar centroid, chunk by
+       chunk
+
+  Memory is bounded by one chunk of CSR rows plus the topics × MAX_TERMS
+  centroids, whatever the number of comments; 130k comments take under a
+  second. The random generator is seeded: the same selection always yields
+  the same topics.
+
+Usage:
+  result = find_topics(features, rows, df["RESPUESTA"], n_topics=8)
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Tuple
+
+from app.core.lazy import lazy_import
+from app.services.text_features import SENTIMENTS, TextFeatures
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+MIN_TOPICS = 2
+MAX_TOPICS = 20
+# Vocabulary bounds
+MAX_TERMS = 5000
+MIN_DF = 2
+MAX_DF = 0.5
+# Comments per k-means step, most comments the centroids are fitted on, and
+# passes over them
+BATCH = 1024
+FIT_ROWS = 50_000
+EPOCHS = 3
+MAX_STEPS = 300
+# Comments vectorized / assigned at a time
+CHUNK_ROWS = 20_000
+# Per topic: terms and comments reported
+TOP_TERMS = 10
+REPRESENTATIVES = 3
+_SEED = 20_251
+
+
+class _Vectorizer:
+    """TF-IDF over a fixed vocabulary (word ids of the TermMatrix → columns)."""
+
+    def __init__(self, features: TextFeatures, rows: np.ndarray):
+        words = features.words
+        doc_freq = np.zeros(len(words.vocab), dtype=np.int64)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            _, term_ids, _ = words.select(rows[start:start + CHUNK_ROWS])
+            doc_freq += np.bincount(term_ids, minlength=len(words.vocab))  # one entry per word and row
+
+        n = len(rows)
+        eligible = np.flatnonzero((doc_freq >= MIN_DF) & (doc_freq <= max(MAX_DF * n, MIN_DF)))
+        keep = eligible[np.lexsort((eligible, -doc_freq[eligible]))[:MAX_TERMS]]
+        keep.sort()
+        self.terms = [words.vocab[t] for t in keep.tolist()]
+        self.column = np.full(len(words.vocab), -1, dtype=np.int64)
+        self.column[keep] = np.arange(len(keep))
+        self.idf = (np.log((1 + n) / (1 + doc_freq[keep])) + 1).astype(np.float32)
+        self.words = words
+
+    def transform(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """L2-normalized TF-IDF rows of *rows* as CSR (indptr, columns, weights)."""
+        indptr, term_ids, counts = self.words.select(rows)
+        row_of = np.repeat(np.arange(len(rows)), np.diff(indptr))
+        columns = self.column[term_ids]
+        kept = columns >= 0
+        row_of, columns = row_of[kept], columns[kept]
+        weights = (1 + np.log(counts[kept].astype(np.float32))) * self.idf[columns]
+        norms = np.sqrt(np.bincount(row_of, weights=weights * weights, minlength=len(rows)))
+        weights = (weights / norms[row_of]).astype(np.float32)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(row_of, minlength=len(rows)))])
+        return indptr, columns, weights
+
+
+def _similarity(csr: Tuple[np.ndarray, np.ndarray, np.ndarray], centroids: np.ndarray) -> np.ndarray:
+    """Rows × centroids dot products (rows without terms: 0)."""
+    indptr, columns, weights = csr
+    n_rows = len(indptr) - 1
+    out = np.zeros((n_rows, len(centroids)), dtype=np.float32)
+    filled = np.flatnonzero(np.diff(indptr) > 0)
+    if len(filled):
+        products = centroids[:, columns] * weights  # centroids × entries
+        out[filled] = np.add.reduceat(products, indptr[filled], axis=1).T
+    return out
+
+
+def _normalize(centroids: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    return centroids / np.where(norms > 0, norms, 1)
+
+
+def _seed_centroids(csr, k: int, n_features: int, rng) -> np.ndarray:
+    """k-means++ seeding (cosine distance) over the fitting sample."""
+    indptr, columns, weights = csr
+    n = len(indptr) - 1
+
+    def dense(row: int) -> np.ndarray:
+        vector = np.zeros(n_features, dtype=np.float32)
+        vector[columns[indptr[row]:indptr[row + 1]]] = weights[indptr[row]:indptr[row + 1]]
+        return vector
+
+    centroids = [dense(int(rng.integers(n)))]
+    closest = np.clip(1 - _similarity(csr, centroids[0][None, :])[:, 0], 0, None)
+    for _ in range(1, k):
+        total = closest.sum()
+        row = int(rng.choice(n, p=closest / total)) if total > 0 else int(rng.integers(n))
+        centroids.append(dense(row))
+        closest = np.minimum(closest, np.clip(1 - _similarity(csr, centroids[-1][None, :])[:, 0], 0, None))
+    return np.stack(centroids)
+
+
+def _fit(csr, k: int, n_features: int, rng) -> np.ndarray:
+    """Spherical mini-batch k-means centroids (k × n_features) of *csr*'s rows."""
+    indptr, columns, weights = csr
+    n = len(indptr) - 1
+    centroids = _seed_centroids(csr, k, n_features, rng)
+    seen = np.zeros(k, dtype=np.float64)
+    order = rng.permutation(n)
+    steps = min(MAX_STEPS, max(1, math.ceil(EPOCHS * n / BATCH)))
+    for step in range(steps):
+        start = (step * BATCH) % n
+        batch = np.sort(order[start:start + BATCH])
+        lengths = indptr[batch + 1] - indptr[batch]
+        entries = np.repeat(indptr[batch] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        entries = entries + np.arange(int(lengths.sum()))
+        sub = (np.concatenate([[0], np.cumsum(lengths)]), columns[entries], weights[entries])
+
+        labels = _similarity(sub, centroids).argmax(axis=1)
+        members = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, (np.repeat(labels, lengths), sub[1]), sub[2])
+        seen += members
+        moved = members > 0
+        # Each member pulls its centroid by 1 / (comments the centroid has seen)
+        centroids[moved] += (sums[moved] - members[moved, None] * centroids[moved]) / seen[moved, None]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def find_topics(features: TextFeatures, rows: np.ndarray, series: pd.Series,
+                n_topics: int) -> Dict[str, Any]:
+    """
+    Topics of the comments at *rows* (ascending positions of non-null rows
+    of *series*, the column *features* was built from). Only valid comments
+    (10+ characters) are clustered; those with no vocabulary word are
+    reported as unassigned.
+    """
+    with features.lock:
+        rows = rows[features.valid[rows]]
+        vectorizer = _Vectorizer(features, rows)
+        sentiment_codes = features.sentiment[rows]
+
+        n_features = len(vectorizer.terms)
+        has_terms = np.zeros(len(rows), dtype=bool)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            indptr, _, _ = vectorizer.transform(rows[start:start + CHUNK_ROWS])
+            has_terms[start:start + CHUNK_ROWS] = np.diff(indptr) > 0
+        docs = np.flatnonzero(has_terms)
+        k = min(n_topics, len(docs))
+        if k < MIN_TOPICS or not n_features:
+            return {"topics": [], "documents": len(rows), "unassigned": len(rows), "vocabulary": n_features}
+
+        rng = np.random.default_rng(_SEED)
+        fit_docs = np.sort(rng.choice(docs, FIT_ROWS, replace=False)) if len(docs) > FIT_ROWS else docs
+        centroids = _fit(vectorizer.transform(rows[fit_docs]), k, n_features, rng)
+
+        labels = np.full(len(rows), -1, dtype=np.int64)
+        scores = np.zeros(len(rows), dtype=np.float32)
+        for start in range(0, len(docs), CHUNK_ROWS):
+            chunk = docs[start:start + CHUNK_ROWS]
+            similarity = _similarity(vectorizer.transform(rows[chunk]), centroids)
+            labels[chunk] = similarity.argmax(axis=1)
+            scores[chunk] = similarity.max(axis=1)
+
+    topics: List[Dict[str, Any]] = []
+    assigned = int((labels >= 0).sum())
+    for topic in range(k):
+        members = np.flatnonzero(labels == topic)
+        if not len(members):
+            continue
+        weights = centroids[topic]
+        terms = np.lexsort((np.arange(n_features), -weights))[:TOP_TERMS]
+        closest = members[np.lexsort((members, -scores[members]))[:REPRESENTATIVES]]
+        sentiment = np.bincount(sentiment_codes[members], minlength=len(SENTIMENTS))
+        topics.append({
+            "size": len(members),
+            "pct": round(len(members) / assigned * 100, 1),
+            "top_terms": [
+                {"term": vectorizer.terms[t], "weight": round(float(weights[t]), 4)}
+                for t in terms.tolist() if weights[t] > 0
+            ],
+            "representatives": series.iloc[rows[closest]].astype(str).tolist(),
+            "sentiment": {s: int(c) for s, c in zip(SENTIMENTS, sentiment.tolist())},
+        })
+    topics.sort(key=lambda t: -t["size"])
+    for i, topic in enumerate(topics):
+        topic["topic"] = i + 1
+    return {
+        "topics": topics,
+        "documents": len(rows),
+        "unassigned": len(rows) - assigned,
+        "vocabulary": n_features,
+    }
@@ -0,0 +1,142 @@
+"""
+Background warming of a file's analysis artifacts right after upload.
+
+Why this exists:
+  The first /analyze or /multi-analyze on a new file used to pay for the
+  filter index, the question partition and the tokenization of the response
+  column while the user waited. The upload profile already tells which
+  columns the UI will pre-select (the same name rules as the column-mapping
+  screen: "pregunta", "respuesta", "departamento") and which ones are long
+  free text, so upload_file calls schedule_warmup(): it builds those
+  artifacts (and the dashboard rollup) in a thread pool and runs the
+  default unfiltered analysis once, while the user is still on the
+  column-mapping screen.
+
+  Analysis routes call wait_for_warmup() before loading the file, so a
+  click that lands mid-warmup waits for it instead of building the same
+  artifacts a second time.
+
+Usage:
+  from app.services.warmup import schedule_warmup, wait_for_warmup
+
+  schedule_warmup(file_id, df, columns_info)   # in upload_file
+  await wait_for_warmup(file_id)               # before analysing
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+from app.core.metrics import describe, inc, observe, span
+from app.services.indexes import MAX_LISTED_VALUES, filter_mask, question_partition
+from app.services.rollups import default_dimensions, rollup_cube
+from app.services.text_analyzer import extract_known_names
+from app.services.text_features import column_features, qualitative_from_features
+
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Share of distinct values (over non-null rows) for a column to count as free text
+FREE_TEXT_MIN_UNIQUE_RATIO = 0.5
+
+# file_id → running warmup task (kept referenced until it finishes)
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _by_name(columns: List[dict], word: str) -> Optional[str]:
+    return next((c["name"] for c in columns if word in str(c["name"]).lower()), None)
+
+
+def detect_columns(columns: List[dict]) -> Dict[str, Any]:
+    """
+    Columns the UI will most likely analyse, from the upload profile:
+    question / answer / group columns by name (as the column-mapping screen
+    pre-selects them) and up to WARMUP_MAX_TEXT_COLUMNS free-text columns —
+    the answer column first, then text columns with the most distinct values.
+    """
+    detected = {
+        "pregunta": _by_name(columns, "pregunta"),
+        "respuesta": _by_name(columns, "respuesta"),
+        "group_by": _by_name(columns, "departamento"),
+    }
+    free_text = sorted(
+        (
+            c for c in columns
+            if c["dtype"] in ("object", "str", "string")
+            and c["unique_count"] > MAX_LISTED_VALUES
+            # mostly distinct values: comments, not a long list of names
+            and c["unique_count"] >= FREE_TEXT_MIN_UNIQUE_RATIO * c["total_count"]
+            and c["name"] != detected["respuesta"]
+        ),
+        key=lambda c: -c["unique_count"],
+    )
+    text = [detected["respuesta"]] if detected["respuesta"] else []
+    text += [c["name"] for c in free_text]
+    detected["text"] = text[: settings.WARMUP_MAX_TEXT_COLUMNS]
+    return detected
+
+
+def warm_file(file_id: str, df: pd.DataFrame, detected: Dict[str, Any]) -> None:
+    """Build the artifacts the first analyses of *file_id* need (runs in a thread pool)."""
+    filter_mask(df, file_id, None)
+    if detected["pregunta"]:
+        question_partition(df, file_id, detected["pregunta"])
+    known_names = extract_known_names(df)
+    for column in detected["text"]:
+        features = column_features(df, file_id, column)
+        # Default view: every row, grouped by department when there is one.
+        # Fills the per-row name matches for the unfiltered name set.
+        mask = df[column].notna().to_numpy()
+        qualitative_from_features(df, features, column, detected["group_by"], known_names, mask)
+    if detected["pregunta"] and detected["respuesta"]:
+        # Dashboard slices (question × department × evaluee) come from the rollup
+        pregunta = detected["pregunta"]
+        rollup_cube(df, file_id, default_dimensions(df, pregunta), detected["respuesta"])
+
+
+async def _warm(file_id: str, df: pd.DataFrame, detected: Dict[str, Any]) -> None:
+    start = time.perf_counter()
+    try:
+        await run_blocking(warm_file, file_id, df, detected)
+    except Exception as exc:
+        # Warming is an optimisation: the first request just builds on demand
+        inc("evalplatform_warmup_total", outcome="error")
+        logger.warning("⚠️  Warmup failed for file %s: %s", file_id, exc)
+    else:
+        inc("evalplatform_warmup_total", outcome="ok")
+        observe("evalplatform_warmup_seconds", time.perf_counter() - start)
+        logger.info("🔥 Warmed file %s in %.2fs", file_id, time.perf_counter() - start)
+    finally:
+        _tasks.pop(file_id, None)
+
+
+def schedule_warmup(file_id: str, df: pd.DataFrame, columns: List[dict]) -> None:
+    """Start warming *file_id* in the background (no-op when WARMUP_AFTER_UPLOAD is off)."""
+    if not settings.WARMUP_AFTER_UPLOAD:
+        return
+    detected = detect_columns(columns)
+    # Fresh context: the warmup's spans must not land in the upload's Server-Timing
+    _tasks[file_id] = asyncio.create_task(
+        _warm(file_id, df, detected), context=contextvars.Context()
+    )
+
+
+async def wait_for_warmup(file_id: str) -> None:
+    """Wait for a running warmup of *file_id*, if any."""
+    task = _tasks.get(file_id)
+    if task is not None:
+        with span("warmup"):
+            # shield: a request cancelled while waiting must not cancel the warmup
+            await asyncio.shield(task)
+
+
+describe("evalplatform_warmup_total", "Post-upload warmups by outcome.")
+describe("evalplatform_warmup_seconds", "Time to warm a file's artifacts after upload.")
@@ -0,0 +1 @@
+"""Benchmark suite and synthetic data generator (see benchmarks/run.py)."""
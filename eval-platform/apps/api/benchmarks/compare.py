@@ -0,0 +1,89 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+A stage regresses when its median time grows by more than the threshold
+relative to the baseline; it improves when it shrinks by more than the
+threshold. Stages or sizes missing from either side are reported as such.
+
+Usage (from apps/api):
+  python -m benchmarks.compare benchmarks/results/latest.json benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.15,
+) -> List[Dict[str, Any]]:
+    """One row per (size, stage) with both medians, the ratio and a status."""
+    rows: List[Dict[str, Any]] = []
+    cur_sizes = current.get("sizes", {})
+    base_sizes = baseline.get("sizes", {})
+
+    for size in sorted(set(cur_sizes) | set(base_sizes), key=int):
+        cur_stages = cur_sizes.get(size, {})
+        base_stages = base_sizes.get(size, {})
+        for stage in sorted(set(cur_stages) | set(base_stages)):
+            cur: Optional[float] = cur_stages.get(stage, {}).get("median_s")
+            base: Optional[float] = base_stages.get(stage, {}).get("median_s")
+            ratio = round(cur / base, 3) if cur is not None and base else None
+
+            if cur is None:
+                status = "missing"
+            elif base is None:
+                status = "new"
+            elif ratio is None:
+                # Baseline too fast to time (0 s): there's no ratio to judge
+                status = "ok"
+            elif ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 - threshold:
+                status = "improvement"
+            else:
+                status = "ok"
+
+            rows.append({
+                "size": int(size),
+                "stage": stage,
+                "baseline_s": base,
+                "current_s": cur,
+                "ratio": ratio,
+                "status": status,
+            })
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'size':>9}  {'stage':<22} {'baseline':>10} {'current':>10} {'ratio':>7}  status")
+    for r in rows:
+        base = f"{r['baseline_s']:.3f}s" if r["baseline_s"] is not None else "—"
+        cur = f"{r['current_s']:.3f}s" if r["current_s"] is not None else "—"
+        ratio = f"{r['ratio']:.2f}x" if r["ratio"] is not None else "—"
+        flag = "  ⚠️" if r["status"] == "regression" else ""
+        print(f"{r['size']:>9,}  {r['stage']:<22} {base:>10} {cur:>10} {ratio:>7}  {r['status']}{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline.")
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    with open(args.current, encoding="utf-8") as fh:
+        current = json.load(fh)
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+
+    rows = compare_results(current, baseline, args.threshold)
+    print_comparison(rows)
+    return 1 if any(r["status"] == "regression" for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
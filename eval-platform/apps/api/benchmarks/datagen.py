@@ -0,0 +1,216 @@
+"""
+Synthetic evaluation data generator — seeded and reproducible.
+
+Produces long-format teacher-evaluation tables shaped like the registrar
+exports the platform receives: one row per (student answer, question), with
+PERIODO / DEPARTAMENTO / EVALUADO / MATERIA / PREGUNTA / RESPUESTA columns.
+Quantitative questions are answered on the 1–5 scale; qualitative ones get
+Spanish free-text comments built from positive, negative and suggestion
+fragments plus a configurable filler vocabulary, with a share of exact
+repeats ("Excelente", "Ninguna", …) like real exports have.
+
+Usage:
+  python -m benchmarks.datagen --rows 70000 --format xlsx -o /tmp/eval_70k.xlsx
+
+  from benchmarks.datagen import DatasetSpec, generate_evaluations
+  df = generate_evaluations(DatasetSpec(rows=100_000, seed=7))
+"""
+
+import argparse
+import os
+from dataclasses import dataclass, fields
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = [
+    "JUAN", "MARÍA", "JOSÉ", "ANA", "LUIS", "CARMEN", "JORGE", "LAURA",
+    "CARLOS", "SOFÍA", "MIGUEL", "LUCÍA", "FERNANDO", "ELENA", "RICARDO",
+    "PATRICIA", "ALEJANDRO", "GABRIELA", "ROBERTO", "ISABEL",
+]
+LAST_NAMES = [
+    "GARCÍA", "HERNÁNDEZ", "LÓPEZ", "MARTÍNEZ", "GONZÁLEZ", "PÉREZ",
+    "RODRÍGUEZ", "SÁNCHEZ", "RAMÍREZ", "TORRES", "FLORES", "RIVERA",
+    "GÓMEZ", "DÍAZ", "REYES", "MORALES", "CRUZ", "ORTIZ", "GUTIÉRREZ",
+    "CHÁVEZ",
+]
+DEPARTMENT_NAMES = [
+    "Matemáticas y Física", "Electrónica, Sistemas e Informática",
+    "Economía, Administración y Mercadología", "Estudios Sociopolíticos",
+    "Psicología, Educación y Salud", "Hábitat y Desarrollo Urbano",
+    "Lenguas", "Formación Humana", "Procesos Tecnológicos", "Filosofía",
+]
+
+POSITIVE_FRAGMENTS = [
+    "excelente profesor, muy claro al explicar",
+    "es muy paciente y dedicado con los alumnos",
+    "las clases son dinámicas e interesantes",
+    "aprendí muchísimo en este curso",
+    "domina el tema y lo explica con pasión",
+    "siempre está disponible para resolver dudas",
+    "recomiendo ampliamente a este profesor",
+    "los proyectos prácticos fueron muy enriquecedores",
+]
+NEGATIVE_FRAGMENTS = [
+    "las clases son aburridas y repetitivas",
+    "la evaluación me pareció injusta",
+    "llega tarde con frecuencia y es impuntual",
+    "las explicaciones son confusas",
+    "la organización del curso es deficiente",
+    "las tareas son pesadas y tediosas",
+]
+SUGGESTION_FRAGMENTS = [
+    "me gustaría que hubiera más ejemplos prácticos",
+    "sugiero revisar la carga de tareas",
+    "debería dar retroalimentación más rápida",
+    "sería bueno incluir más ejercicios en clase",
+    "hace falta más tiempo para los proyectos",
+]
+REPEATED_ANSWERS = [
+    "Excelente", "Ninguna", "Muy buen profesor", "Todo bien", "N/A",
+    "Excelente profesor, muy bien",
+]
+FILLER_WORDS = [
+    "tema", "ejercicios", "proyecto", "examen", "tareas", "lecturas",
+    "laboratorio", "práctica", "dudas", "conceptos", "material",
+    "plataforma", "horario", "participación", "equipo", "calificación",
+    "retroalimentación", "ejemplos", "contenido", "semestre",
+]
+
+
+@dataclass
+class DatasetSpec:
+    """Shape of a synthetic evaluation table."""
+
+    rows: int = 10_000
+    departments: int = 10
+    evaluees: int = 200
+    questions: int = 20
+    qualitative_share: float = 0.25   # share of the questions that are open-ended
+    vocabulary: int = 2_000           # distinct filler words available to comments
+    comment_min_words: int = 4
+    comment_max_words: int = 40
+    repeated_share: float = 0.3       # share of comments that are exact repeats
+    null_share: float = 0.05          # share of empty answers
+    seed: int = 42
+
+
+def _vocabulary(size: int, rng: np.random.Generator) -> List[str]:
+    """FILLER_WORDS extended with pronounceable pseudo-words up to *size*."""
+    syllables = ["ca", "lo", "ma", "ri", "te", "pa", "ne", "so", "di", "ga", "ción", "men", "tar"]
+    words = list(FILLER_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(syllables, size=rng.integers(3, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words[:max(size, 1)]
+
+
+def _comments(n: int, spec: DatasetSpec, names: List[str], rng: np.random.Generator) -> List[str]:
+    vocab = np.array(_vocabulary(spec.vocabulary, rng), dtype=object)
+    kinds = rng.random(n)
+    comments: List[str] = []
+    for i in range(n):
+        if kinds[i] < spec.repeated_share:
+            comments.append(REPEATED_ANSWERS[rng.integers(len(REPEATED_ANSWERS))])
+            continue
+        parts: List[str] = []
+        roll = rng.random()
+        if roll < 0.6:
+            parts.append(POSITIVE_FRAGMENTS[rng.integers(len(POSITIVE_FRAGMENTS))])
+        elif roll < 0.85:
+            parts.append(NEGATIVE_FRAGMENTS[rng.integers(len(NEGATIVE_FRAGMENTS))])
+        if rng.random() < 0.35:
+            parts.append(SUGGESTION_FRAGMENTS[rng.integers(len(SUGGESTION_FRAGMENTS))])
+        if rng.random() < 0.1:
+            parts.append("el profesor " + names[rng.integers(len(names))].title())
+        n_words = int(rng.integers(spec.comment_min_words, spec.comment_max_words + 1))
+        filler = " ".join(rng.choice(vocab, size=n_words // 2))
+        parts.append(f"en cuanto al {filler}")
+        comment = ", ".join(parts)
+        comments.append(comment[0].upper() + comment[1:] + ".")
+    return comments
+
+
+def qualitative_questions(spec: DatasetSpec) -> List[int]:
+    """Question numbers that get free-text answers (the last ones)."""
+    if not spec.questions:
+        return []
+    n_qual = max(1, round(spec.questions * spec.qualitative_share))
+    return list(range(spec.questions - n_qual + 1, spec.questions + 1))
+
+
+def generate_evaluations(spec: DatasetSpec) -> pd.DataFrame:
+    """Build a long-format evaluation table described by *spec*."""
+    rng = np.random.default_rng(spec.seed)
+    n = spec.rows
+
+    # Past the named list, departments repeat with a suffix ("Lenguas 2")
+    k = len(DEPARTMENT_NAMES)
+    departments = [
+        DEPARTMENT_NAMES[i % k] + (f" {i // k + 1}" if i >= k else "")
+        for i in range(spec.departments)
+    ]
+    evaluees = [
+        f"{LAST_NAMES[rng.integers(len(LAST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]} "
+        f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]}"
+        for _ in range(spec.evaluees)
+    ]
+    evaluee_dept = rng.integers(spec.departments, size=spec.evaluees)
+
+    evaluee_idx = rng.integers(spec.evaluees, size=n)
+    question = rng.integers(1, spec.questions + 1, size=n)
+    is_qual = np.isin(question, qualitative_questions(spec))
+
+    # Per-evaluee quality shifts the 1–5 scores so groups differ realistically
+    quality = rng.normal(0, 0.6, size=spec.evaluees)
+    scores = np.clip(np.rint(4.2 + quality[evaluee_idx] + rng.normal(0, 0.9, size=n)), 1, 5).astype(int)
+
+    answers = np.empty(n, dtype=object)
+    answers[~is_qual] = scores[~is_qual].astype(str)
+    answers[is_qual] = _comments(int(is_qual.sum()), spec, evaluees, rng)
+    answers[rng.random(n) < spec.null_share] = None
+
+    return pd.DataFrame({
+        "PERIODO": rng.choice(["PRIMAVERA 2025", "OTOÑO 2025"], size=n),
+        "DEPARTAMENTO": np.array(departments, dtype=object)[evaluee_dept[evaluee_idx]],
+        "EVALUADO": np.array(evaluees, dtype=object)[evaluee_idx],
+        "MATERIA": np.array([f"MAT{i:04d}" for i in range(spec.evaluees * 2)], dtype=object)[
+            evaluee_idx * 2 + rng.integers(2, size=n)
+        ],
+        "PREGUNTA": question,
+        "RESPUESTA": answers,
+    })
+
+
+def write_dataset(df: pd.DataFrame, path: str) -> str:
+    """Write *df* as CSV or XLSX depending on the extension of *path*."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.lower().endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic evaluation table.")
+    for f in fields(DatasetSpec):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(**{f.name: getattr(args, f.name) for f in fields(DatasetSpec)})
+    path = args.output
+    if not path.lower().endswith(f".{args.format}"):
+        path += f".{args.format}"
+    write_dataset(generate_evaluations(spec), path)
+    print(f"{spec.rows:,} rows → {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Local stand-in for an Ollama server — for load tests and offline development.
+
+Answers POST /api/generate like Ollama does (one JSON object, or NDJSON
+chunks with "stream": true) after a configurable delay: --latency seconds
+before the first token, then --tokens tokens at --tokens-per-s. The text is
+a canned Spanish summary; what matters is the timing, so /ai-summary holds
+an llm pool thread as long as a real model would. GET /api/tags lists the
+one fake model, so health checks that look for it pass.
+
+Usage (from apps/api):
+  python -m benchmarks.fake_ollama --port 11434 --latency 2 --tokens-per-s 30
+  OLLAMA_URL=http://127.0.0.1:11434 uvicorn app.main:app
+
+  from benchmarks.fake_ollama import FakeOllama
+  with FakeOllama(latency=1.0, tokens_per_s=50) as llm:
+      os.environ["OLLAMA_URL"] = llm.url
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+MODEL = "fake-ollama:latest"
+
+_WORDS = (
+    "En general los estudiantes valoran la claridad y la disponibilidad del "
+    "profesor. Las críticas se concentran en la organización del curso y en "
+    "la carga de tareas. Se recomienda publicar los criterios de evaluación "
+    "desde el inicio y dar retroalimentación más frecuente."
+).split()
+
+
+def _text(tokens: int) -> str:
+    return " ".join(_WORDS[i % len(_WORDS)] for i in range(tokens))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:  # quiet: thousands of requests per run
+        pass
+
+    def _json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._json(200, {"models": [{"name": MODEL, "model": MODEL}]})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path != "/api/generate":
+            self._json(404, {"error": "not found"})
+            return
+        options = self.server.options
+        tokens = min(options["tokens"], int((body.get("options") or {}).get("num_predict") or 10**9))
+        step = 1 / options["tokens_per_s"] if options["tokens_per_s"] > 0 else 0.0
+        model = body.get("model") or MODEL
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(options["latency"])
+
+        if not body.get("stream", True):
+            time.sleep(tokens * step)
+            self._json(200, {"model": model, "response": _text(tokens), "done": True, "eval_count": tokens})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i in range(tokens):
+            time.sleep(step)
+            self._chunk({"model": model, "response": _WORDS[i % len(_WORDS)] + " ", "done": False})
+        self._chunk({"model": model, "response": "", "done": True, "eval_count": tokens})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, obj: dict) -> None:
+        line = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options: dict):
+        super().__init__(address, _Handler)
+        self.options = options
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class FakeOllama:
+    """The fake server in a background thread; port 0 picks a free port."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 1.0,
+                 tokens_per_s: float = 40.0, tokens: int = 300):
+        self._server = _Server(
+            (host, port), {"latency": latency, "tokens_per_s": tokens_per_s, "tokens": tokens}
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        """Generate calls received so far."""
+        return self._server.requests
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama /api/generate.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=40.0, help="generation speed (0 = instant)")
+    parser.add_argument("--tokens", type=int, default=300, help="tokens per answer (capped by num_predict)")
+    args = parser.parse_args(argv)
+
+    llm = FakeOllama(args.host, args.port, args.latency, args.tokens_per_s, args.tokens)
+    print(f"Fake Ollama on {llm.url} (latency {args.latency}s, {args.tokens} tokens at {args.tokens_per_s}/s)")
+    try:
+        llm._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        llm._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
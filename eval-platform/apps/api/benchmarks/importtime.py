@@ -0,0 +1,64 @@
+"""
+Import-time profile of the API against a startup budget.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+reports the total and the top-level packages that take longest to import
+(summed self time of their modules).
+Exits with status 1 when the total exceeds --budget, so it can guard cold
+starts in CI the same way ``compare.py`` guards throughput.
+
+Usage (from apps/api):
+  python -m benchmarks.importtime                 # report
+  python -m benchmarks.importtime --budget 0.6    # fail above 600 ms
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)")
+
+
+def profile(module: str = "app.main") -> Tuple[float, List[Tuple[str, float]]]:
+    """(total seconds, [(top-level package, seconds of its own modules)] slowest first)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = match.groups()
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + int(self_us) / 1e6
+        if name == module:
+            total = int(cumulative_us) / 1e6
+    return total, sorted(packages.items(), key=lambda item: -item[1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="fail (exit 1) if importing takes longer than this many seconds")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    total, packages = profile(args.module)
+    print(f"import {args.module}: {total * 1000:.0f} ms")
+    for name, seconds in packages[: args.top]:
+        print(f"  {name:<28} {seconds * 1000:>8.1f} ms")
+
+    if args.budget is not None and total > args.budget:
+        print(f"✗ over budget ({args.budget * 1000:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,434 @@
+"""
+End-to-end load test — virtual coordinators replaying sessions against the real API.
+
+Answers "how many coordinators can one API container serve before latency
+degrades?". The harness starts the API the way the container does (uvicorn,
+--workers) with a fake Ollama (benchmarks.fake_ollama) as its LLM, then
+runs --users virtual users at once. Each one replays --sessions sessions:
+
+  upload          POST /upload           their evaluation file (datagen, one seed per user)
+  multi-analyze   POST /multi-analyze    every question, grouped by DEPARTAMENTO
+  drilldown × N   POST /drilldown        frequent words of the result, half per department
+  ai-summary      POST /ai-summary       answered by the fake Ollama after its delay
+
+with an exponential think time (mean --think seconds) between steps. It
+reports throughput (sessions and requests per second), p50 / p95 / p99
+latency and status codes per route, and the API processes' resource usage
+(RSS and CPU of uvicorn and its workers, sampled from /proc). Everything
+runs locally: no Ollama, Anthropic, S3 or network access is needed.
+
+Usage (from apps/api):
+  python -m benchmarks.loadtest --users 10 --rows 20000
+  python -m benchmarks.loadtest --users 20 --llm-latency 3 --llm-tokens-per-s 20 -o benchmarks/results/load.json
+  REDIS_URL=redis://localhost:6379/0 python -m benchmarks.loadtest --users 20 --workers 2
+  python -m benchmarks.loadtest --url http://localhost:8000 --users 5    # API already running
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.datagen import DatasetSpec, generate_evaluations, qualitative_questions
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.run import _environment
+
+ROUTES = ["upload", "multi-analyze", "drilldown", "ai-summary"]
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds to wait for a started API to answer /health
+STARTUP_TIMEOUT = 60
+
+
+# ── API process and its resource usage ────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ApiServer:
+    """The API under uvicorn in a child process, configured for an offline run."""
+
+    def __init__(self, workers: int, llm_url: str, workdir: str):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = {
+            **os.environ,
+            "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+            "OLLAMA_URL": llm_url,
+            # Offline: no Anthropic fallback, no S3
+            "ANTHROPIC_API_KEY": "",
+            "AWS_S3_BUCKET": "",
+            "WEB_CONCURRENCY": str(workers),
+        }
+        self.log_path = os.path.join(workdir, "api.log")
+        self._log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(workers)],
+            cwd=API_DIR, env=env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self) -> None:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"the API exited at startup (see {self.log_path})")
+            try:
+                if httpx.get(f"{self.url}/api/v1/health", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.3)
+        raise RuntimeError(f"the API didn't answer /health within {STARTUP_TIMEOUT}s (see {self.log_path})")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+def _children() -> Dict[int, List[int]]:
+    """parent pid → child pids, for every process in /proc."""
+    tree: Dict[int, List[int]] = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # the command name may hold spaces: fields resume after its ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        tree[ppid].append(int(entry))
+    return tree
+
+
+def _usage(pid: int) -> Optional[tuple]:
+    """(RSS bytes, CPU seconds) of *pid*, None if it's gone."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+    return pages * os.sysconf("SC_PAGE_SIZE"), cpu
+
+
+class ResourceSampler:
+    """RSS and CPU of a process and its descendants, sampled every *interval* s (Linux)."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[tuple] = []   # (monotonic time, RSS bytes, CPU seconds)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        tree = _children()
+        pending, rss, cpu = [self.pid], 0, 0.0
+        while pending:
+            pid = pending.pop()
+            usage = _usage(pid)
+            if usage is not None:
+                rss, cpu = rss + usage[0], cpu + usage[1]
+            pending.extend(tree.get(pid, ()))
+        self.samples.append((time.monotonic(), rss, cpu))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "ResourceSampler":
+        if os.path.isdir("/proc"):
+            self._sample()
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self._sample()
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        if len(self.samples) < 2:
+            return None
+        cpu = [
+            (c1 - c0) / (t1 - t0) * 100
+            for (t0, _, c0), (t1, _, c1) in zip(self.samples, self.samples[1:]) if t1 > t0
+        ]
+        (t_start, _, cpu_start), (t_end, _, cpu_end) = self.samples[0], self.samples[-1]
+        return {
+            "start_rss_mb": round(self.samples[0][1] / 2 ** 20, 1),
+            "peak_rss_mb": round(max(s[1] for s in self.samples) / 2 ** 20, 1),
+            "end_rss_mb": round(self.samples[-1][1] / 2 ** 20, 1),
+            "cpu_seconds": round(cpu_end - cpu_start, 2),
+            "mean_cpu_percent": round((cpu_end - cpu_start) / (t_end - t_start) * 100, 1),
+            "peak_cpu_percent": round(max(cpu), 1) if cpu else None,
+            "samples": len(self.samples),
+        }
+
+
+# ── Virtual users ─────────────────────────────────────────────────────────────
+
+class Recorder:
+    """Latency and status of every request, per route."""
+
+    def __init__(self):
+        self.seconds: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.sessions: Counter = Counter()
+
+    async def call(self, client: httpx.AsyncClient, route: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        """POST *path* timed under *route*; None when it failed (HTTP error or no response)."""
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, **kwargs)
+        except httpx.HTTPError as exc:
+            self.seconds[route].append(time.perf_counter() - start)
+            self.statuses[route][type(exc).__name__] += 1
+            return None
+        self.seconds[route].append(time.perf_counter() - start)
+        self.statuses[route][str(response.status_code)] += 1
+        return response if response.status_code < 400 else None
+
+    def routes(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for route in [r for r in ROUTES if r in self.seconds] + sorted(set(self.seconds) - set(ROUTES)):
+            values = np.asarray(self.seconds[route])
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            statuses = self.statuses[route]
+            report[route] = {
+                "count": len(values),
+                "errors": sum(n for status, n in statuses.items() if not status.startswith(("2", "3"))),
+                "statuses": dict(sorted(statuses.items())),
+                "mean_s": round(float(values.mean()), 4),
+                "p50_s": round(float(p50), 4),
+                "p95_s": round(float(p95), 4),
+                "p99_s": round(float(p99), 4),
+                "max_s": round(float(values.max()), 4),
+            }
+        return report
+
+
+def _drilldown_terms(result: dict, count: int, rng: random.Random) -> List[tuple]:
+    """(word, department or None) pairs a coordinator would click in *result*."""
+    words, departments = [], []
+    for question in result.get("questions", []):
+        words += [w["word"] for w in (question.get("qualitative") or {}).get("top_words", [])[:15]]
+        departments += list(question.get("by_group") or {})
+    if not words:
+        return []
+    departments = sorted(set(departments))
+    return [
+        (rng.choice(words), rng.choice(departments) if departments and i % 2 else None)
+        for i in range(count)
+    ]
+
+
+async def _session(client: httpx.AsyncClient, recorder: Recorder, name: str, data: bytes,
+                   spec: DatasetSpec, args: argparse.Namespace, rng: random.Random) -> bool:
+    """One coordinator session; False when a step it depends on failed."""
+
+    async def think() -> None:
+        if args.think > 0:
+            await asyncio.sleep(rng.expovariate(1 / args.think))
+
+    response = await recorder.call(client, "upload", "/api/v1/upload",
+                                   files={"file": (name, data, "text/csv")})
+    if response is None:
+        return False
+    file_id = response.json()["file_id"]
+    await think()
+
+    qualitative = set(qualitative_questions(spec))
+    response = await recorder.call(client, "multi-analyze", "/api/v1/multi-analyze", json={
+        "file_id": file_id,
+        "pregunta_column": "PREGUNTA",
+        "respuesta_column": "RESPUESTA",
+        "group_by": "DEPARTAMENTO",
+        "questions": [
+            {"question_number": str(q),
+             "analysis_type": "qualitative" if q in qualitative else "quantitative"}
+            for q in range(1, spec.questions + 1)
+        ],
+    })
+    if response is None:
+        return False
+
+    for word, department in _drilldown_terms(response.json(), args.drilldowns, rng):
+        await think()
+        await recorder.call(client, "drilldown", "/api/v1/drilldown", json={
+            "file_id": file_id, "response_column": "RESPUESTA", "query": word,
+            "department": department, "limit": 50,
+        })
+
+    if args.ai_summary:
+        await think()
+        if await recorder.call(client, "ai-summary", "/api/v1/ai-summary", json={"file_id": file_id}) is None:
+            return False
+    return True
+
+
+async def _user(index: int, base_url: str, recorder: Recorder, data: bytes, spec: DatasetSpec,
+                args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed + index)
+    # Users arrive spread over --ramp seconds
+    await asyncio.sleep(args.ramp * index / max(1, args.users))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        for _ in range(args.sessions):
+            ok = await _session(client, recorder, f"evaluaciones_{index}.csv", data, spec, args, rng)
+            recorder.sessions["completed" if ok else "failed"] += 1
+
+
+async def _load(base_url: str, files: List[bytes], spec: DatasetSpec, args: argparse.Namespace,
+                recorder: Recorder) -> None:
+    await asyncio.gather(*(
+        _user(i, base_url, recorder, files[i % len(files)], spec, args) for i in range(args.users)
+    ))
+
+
+# ── Run and report ────────────────────────────────────────────────────────────
+
+def _datasets(spec: DatasetSpec, count: int) -> List[bytes]:
+    """*count* CSV files shaped by *spec*, each with its own seed."""
+    return [
+        generate_evaluations(DatasetSpec(**{**vars(spec), "seed": spec.seed + i}))
+        .to_csv(index=False).encode("utf-8")
+        for i in range(count)
+    ]
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    spec = DatasetSpec(rows=args.rows, departments=args.departments, evaluees=args.evaluees,
+                       questions=args.questions, seed=args.seed)
+    print(f"Generating {min(args.users, args.files)} file(s) of {args.rows:,} rows…", flush=True)
+    files = _datasets(spec, min(args.users, args.files))
+    recorder = Recorder()
+
+    with tempfile.TemporaryDirectory(prefix="evalload_") as workdir, \
+            FakeOllama(latency=args.llm_latency, tokens_per_s=args.llm_tokens_per_s,
+                       tokens=args.llm_tokens) as llm:
+        server = None
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            server = ApiServer(args.workers, llm.url, workdir)
+            base_url = server.url
+        try:
+            if server:
+                server.wait_ready()
+            print(f"{args.users} users × {args.sessions} session(s) against {base_url}", flush=True)
+            sampler = ResourceSampler(server.process.pid) if server else None
+            start = time.perf_counter()
+            if sampler:
+                with sampler:
+                    asyncio.run(_load(base_url, files, spec, args, recorder))
+            else:
+                asyncio.run(_load(base_url, files, spec, args, recorder))
+            wall = time.perf_counter() - start
+        finally:
+            if server:
+                server.stop()
+
+    requests = sum(len(v) for v in recorder.seconds.values())
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "config": {
+            "users": args.users, "sessions": args.sessions, "workers": None if args.url else args.workers,
+            "url": args.url, "rows": args.rows, "questions": args.questions, "drilldowns": args.drilldowns,
+            "ai_summary": args.ai_summary, "think_s": args.think, "ramp_s": args.ramp,
+            "llm": {"latency_s": args.llm_latency, "tokens_per_s": args.llm_tokens_per_s,
+                    "tokens": args.llm_tokens},
+        },
+        "wall_s": round(wall, 2),
+        "sessions": {
+            "completed": recorder.sessions["completed"],
+            "failed": recorder.sessions["failed"],
+            "per_s": round(recorder.sessions["completed"] / wall, 3),
+        },
+        "requests": {"total": requests, "per_s": round(requests / wall, 2)},
+        "routes": recorder.routes(),
+        "resources": sampler.report() if sampler else None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    sessions, requests = report["sessions"], report["requests"]
+    print(f"\n{sessions['completed']} sessions completed, {sessions['failed']} failed in {report['wall_s']}s "
+          f"— {sessions['per_s']} sessions/s, {requests['per_s']} requests/s")
+    print(f"{'route':<15} {'count':>6} {'errors':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  statuses")
+    for route, r in report["routes"].items():
+        statuses = " ".join(f"{s}×{n}" for s, n in r["statuses"].items())
+        print(f"{route:<15} {r['count']:>6} {r['errors']:>6} {r['p50_s']:>8.3f}s {r['p95_s']:>8.3f}s "
+              f"{r['p99_s']:>8.3f}s {r['max_s']:>8.3f}s  {statuses}")
+    resources = report["resources"]
+    if resources:
+        print(f"API processes: RSS {resources['start_rss_mb']} → peak {resources['peak_rss_mb']} MB, "
+              f"CPU mean {resources['mean_cpu_percent']}% / peak {resources['peak_cpu_percent']}%")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API with virtual coordinators.")
+    parser.add_argument("--users", type=int, default=10, help="virtual users running at once")
+    parser.add_argument("--sessions", type=int, default=1, help="sessions per user")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which users arrive")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between steps (s)")
+    parser.add_argument("--drilldowns", type=int, default=5, help="drilldowns per session")
+    parser.add_argument("--no-ai-summary", dest="ai_summary", action="store_false")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows of each user's file")
+    parser.add_argument("--files", type=int, default=10,
+                        help="distinct files generated; users share them round-robin")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--departments", type=int, default=10)
+    parser.add_argument("--evaluees", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started API")
+    parser.add_argument("--url", help="load an API already running here instead of starting one")
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-request timeout (s)")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="fake Ollama: seconds to first token")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=30.0, help="fake Ollama: generation speed")
+    parser.add_argument("--llm-tokens", type=int, default=300, help="fake Ollama: tokens per summary")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.url and args.ai_summary:
+        print("Note: with --url the API's own OLLAMA_URL answers /ai-summary, not the fake server.")
+    if not args.url and args.workers > 1 and not os.environ.get("REDIS_URL"):
+        parser.error("--workers > 1 needs REDIS_URL (workers must share file metadata)")
+
+    report = run(args)
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"Results → {args.output}")
+    return 1 if report["sessions"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Benchmark suite — times each analysis stage on synthetic data of several sizes.
+
+Stages:
+  parse_csv / parse_xlsx   upload parse path (ingest.read_table, EXCEL_ENGINE)
+  analyze_quantitative     1–5 scale answers of every quantitative question
+  analyze_responses        free-text comments of every qualitative question
+  search_responses         drilldown search over the comments (full scan)
+  multi_analysis           /multi-analyze body (filter mask, partition, analyzers)
+                           grouped by DEPARTAMENTO, with cold per-file artifacts
+
+Every stage runs --repeat times per size; the JSON output keeps min / median /
+mean seconds and rows per second. analyze_responses and multi_analysis start
+every repeat with an empty per-string memo (app.services.text_analyzer), as
+on a fresh worker; their *_warm variants repeat them with the memo kept, as
+for a file whose comments the worker has already seen. With --baseline the run is compared against
+a stored result file and any stage slower than --threshold is flagged (exit
+code 1), so it can gate a change locally or in CI.
+
+Usage (from apps/api):
+  python -m benchmarks.run --sizes 10000,100000 -o benchmarks/results/latest.json
+  python -m benchmarks.run --sizes 10000 --baseline benchmarks/results/baseline.json
+  python -m benchmarks.run --sizes 10000,100000,1000000 --stages analyze_responses,multi_analysis
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from benchmarks.compare import compare_results, print_comparison
+from benchmarks.datagen import (
+    DatasetSpec,
+    generate_evaluations,
+    qualitative_questions,
+    write_dataset,
+)
+
+STAGES = [
+    "parse_csv",
+    "parse_xlsx",
+    "analyze_quantitative",
+    "analyze_responses",
+    "search_responses",
+    "multi_analysis",
+]
+
+
+def _time(fn: Callable[[], Any], repeat: int,
+          setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Time *repeat* calls of *fn*, each after an untimed *setup*."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "mean_s": round(statistics.mean(timings), 6),
+        "repeat": repeat,
+    }
+
+
+def _bench_size(
+    spec: DatasetSpec,
+    stages: List[str],
+    repeat: int,
+    max_xlsx_rows: int,
+    workdir: str,
+) -> Dict[str, Any]:
+    from app.core.artifacts import artifact_drop
+    from app.services.analyses import run_multi_analysis
+    from app.services.indexes import filter_mask, question_partition
+    from app.services.ingest import read_table
+    from app.services.quantitative_analyzer import analyze_quantitative
+    from app.services.text_analyzer import (
+        analyze_responses,
+        clear_text_memo,
+        extract_known_names,
+        search_responses,
+    )
+    from app.services.text_features import column_features
+
+    df = generate_evaluations(spec)
+    qualitative = qualitative_questions(spec)
+    answered = df[df["RESPUESTA"].notna()]
+    is_qual = answered["PREGUNTA"].isin(qualitative)
+    comments = answered.loc[is_qual, "RESPUESTA"].astype(str).tolist()
+    scores = answered.loc[~is_qual, "RESPUESTA"].astype(str).tolist()
+    known_names = extract_known_names(df)
+
+    results: Dict[str, Any] = {}
+
+    def record(stage: str, fn: Callable[[], Any], n_rows: int, memoized: bool = False) -> None:
+        # Memoized stages: cold (memo emptied before each repeat), then warm
+        runs = [(stage, clear_text_memo), (f"{stage}_warm", None)] if memoized else [(stage, None)]
+        for name, setup in runs:
+            stats = _time(fn, repeat, setup)
+            stats["rows"] = n_rows
+            stats["rows_per_s"] = round(n_rows / stats["median_s"], 1) if stats["median_s"] else None
+            results[name] = stats
+            print(f"  {name:<22} {stats['median_s']:>9.3f}s  ({n_rows:,} rows)", flush=True)
+
+    for ext in ("csv", "xlsx"):
+        stage = f"parse_{ext}"
+        if stage not in stages:
+            continue
+        if ext == "xlsx" and spec.rows > max_xlsx_rows:
+            print(f"  {stage:<22} skipped (> --max-xlsx-rows)")
+            continue
+        path = write_dataset(df, os.path.join(workdir, f"bench_{spec.rows}.{ext}"))
+        record(stage, lambda: read_table(path), spec.rows)
+
+    if "analyze_quantitative" in stages:
+        record("analyze_quantitative", lambda: analyze_quantitative(scores), len(scores))
+    if "analyze_responses" in stages:
+        record("analyze_responses", lambda: analyze_responses(comments, known_names), len(comments), True)
+    if "search_responses" in stages:
+        # A rare term keeps search from stopping at the limit, i.e. a full scan
+        record("search_responses", lambda: search_responses(comments, "impuntual", 10**9), len(comments))
+
+    if "multi_analysis" in stages:
+        req_dict = {
+            "pregunta_column": "PREGUNTA",
+            "respuesta_column": "RESPUESTA",
+            "group_by": "DEPARTAMENTO",
+            "questions": [
+                {
+                    "question_number": str(q),
+                    "analysis_type": "qualitative" if q in qualitative else "quantitative",
+                }
+                for q in range(1, spec.questions + 1)
+            ],
+        }
+
+        def multi() -> None:
+            artifact_drop("bench")
+            mask = filter_mask(df, "bench", None)
+            partition = question_partition(df, "bench", "PREGUNTA")
+            features = column_features(df, "bench", "RESPUESTA")
+            run_multi_analysis(df, req_dict, partition, mask, features=features)
+
+        record("multi_analysis", multi, spec.rows, True)
+
+    return results
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(
+    sizes: List[int],
+    stages: List[str],
+    repeat: int,
+    base_spec: DatasetSpec,
+    max_xlsx_rows: int,
+) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "spec": {k: v for k, v in vars(base_spec).items() if k != "rows"},
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="evalbench_") as workdir:
+        for rows in sizes:
+            spec = DatasetSpec(**{**vars(base_spec), "rows": rows})
+            print(f"── {rows:,} rows ──", flush=True)
+            report["sizes"][str(rows)] = _bench_size(spec, stages, repeat, max_xlsx_rows, workdir)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stages.")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated row counts (e.g. 10000,100000,1000000)")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--departments", type=int, default=40)
+    parser.add_argument("--evaluees", type=int, default=400)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--vocabulary", type=int, default=2000)
+    parser.add_argument("--max-xlsx-rows", type=int, default=100_000,
+                        help="skip parse_xlsx above this size (writing the file is slow)")
+    parser.add_argument("-o", "--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="compare against this stored JSON result")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown that counts as a regression (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    base_spec = DatasetSpec(
+        departments=args.departments,
+        evaluees=args.evaluees,
+        questions=args.questions,
+        vocabulary=args.vocabulary,
+        seed=args.seed,
+    )
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, stages, args.repeat, base_spec, args.max_xlsx_rows)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"Results → {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        rows = compare_results(report, baseline, args.threshold)
+        print_comparison(rows)
+        if any(r["status"] == "regression" for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Shared fixtures: the app on a temporary upload dir, and uploading a frame.
+
+Run from apps/api:  python -m pytest -q
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp(prefix="evalplatform-tests-"))
+# No background warmup: tests decide which artifacts exist
+os.environ.setdefault("WARMUP_AFTER_UPLOAD", "false")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def upload(client):
+    """upload(df, name="data.csv") → the /upload response body."""
+
+    def _upload(df, name: str = "data.csv") -> dict:
+        body = df.to_csv(index=False).encode("utf-8")
+        response = client.post("/api/v1/upload", files={"file": (name, io.BytesIO(body), "text/csv")})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return _upload
@@ -0,0 +1,98 @@
+import asyncio
+import io
+
+import httpx
+import pandas as pd
+
+from app.main import app
+from app.routers import upload as upload_router
+
+
+def _wave(start: int, n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "DEPARTAMENTO": ["A" if i % 2 else "B" for i in range(start, start + n)],
+        "RESPUESTA": [f"comentario número {i} sobre la clase" for i in range(start, start + n)],
+    })
+
+
+class _PerRequestLocks(dict):
+    """Every append gets its own asyncio lock, as if each ran in another worker."""
+
+    def setdefault(self, key, default=None):
+        return default
+
+
+def test_concurrent_appends_from_two_workers_keep_every_wave(upload, monkeypatch):
+    file_id = upload(_wave(0, 10))["file_id"]
+    monkeypatch.setattr(upload_router, "_append_locks", _PerRequestLocks())
+
+    async def append(df: pd.DataFrame, name: str) -> httpx.Response:
+        body = df.to_csv(index=False).encode("utf-8")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return await c.post(f"/api/v1/files/{file_id}/append",
+                                files={"file": (name, io.BytesIO(body), "text/csv")})
+
+    async def both():
+        return await asyncio.gather(append(_wave(10, 5), "a.csv"), append(_wave(15, 7), "b.csv"))
+
+    responses = asyncio.run(both())
+    assert [r.status_code for r in responses] == [200, 200]
+    # Serialised: the second append extends the first one's result
+    last = max((r.json() for r in responses), key=lambda meta: meta["rows"])
+    assert last["rows"] == 10 + 5 + 7
+    assert len(last["segments"]) == 2
+
+
+def _survey(start: int, n: int) -> pd.DataFrame:
+    comments = ["excelente profesor", "muy buena clase", "deja demasiadas tareas", "Ninguna",
+                "sería bueno que explique con más ejemplos", "la maestra Ana es puntual"]
+    return pd.DataFrame({
+        "PREGUNTA": ["1" if i % 3 else "2" for i in range(start, start + n)],
+        "DEPARTAMENTO": ["A" if i % 2 else "B" for i in range(start, start + n)],
+        "EVALUADO": ["ANA LOPEZ" if i % 4 else "LUIS PEREZ" for i in range(start, start + n)],
+        "RESPUESTA": [
+            str(i % 5 + 1) if i % 3 else f"{comments[i % len(comments)]} {i % 7}"
+            for i in range(start, start + n)
+        ],
+    })
+
+
+def _append(client, file_id: str, df: pd.DataFrame) -> None:
+    body = df.to_csv(index=False).encode("utf-8")
+    response = client.post(f"/api/v1/files/{file_id}/append",
+                           files={"file": ("more.csv", io.BytesIO(body), "text/csv")})
+    assert response.status_code == 200, response.text
+
+
+def test_analyses_after_append_match_a_fresh_upload(client, upload):
+    first, second = _survey(0, 60), _survey(60, 40)
+    file_id = upload(first)["file_id"]
+    whole_id = upload(pd.concat([first, second], ignore_index=True))["file_id"]
+
+    questions = [{"question_number": "1", "analysis_type": "quantitative"},
+                 {"question_number": "2", "analysis_type": "qualitative"}]
+    requests = [
+        ("/api/v1/multi-analyze", {"pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA",
+                                   "questions": questions, "group_by": "DEPARTAMENTO",
+                                   "approximate_ngrams": approximate})
+        for approximate in (False, True)
+    ] + [
+        ("/api/v1/analyze", {"response_column": "RESPUESTA", "group_by": "DEPARTAMENTO",
+                             "filters": {"PREGUNTA": ["2"]}, "approximate_ngrams": approximate})
+        for approximate in (False, True)
+    ]
+
+    def results(fid):
+        out = []
+        for path, body in requests:
+            response = client.post(path, json={"file_id": fid, **body})
+            assert response.status_code == 200, response.text
+            result = response.json()
+            result.pop("config")
+            out.append(result)
+        return out
+
+    results(file_id)  # state and artifacts of the first rows
+    _append(client, file_id, second)
+    # Only the appended rows are analyzed and merged into what was kept
+    assert results(file_id) == results(whole_id)
@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.core.artifacts import _files, artifact_bytes, artifact_get, artifact_set
+from app.core.cache import cache_get, cache_set
+from app.core.config import settings
+from app.services.analyses import MAX_ANALYSIS_STATES
+
+
+def _frame(questions) -> pd.DataFrame:
+    return pd.DataFrame({
+        "DEPARTAMENTO": ["A", "B"] * (len(questions) // 2),
+        "PREGUNTA": questions,
+        "RESPUESTA": ["4", "buen curso"] * (len(questions) // 2),
+    })
+
+
+def _multi(client, file_id: str) -> dict:
+    response = client.post("/api/v1/multi-analyze", json={
+        "file_id": file_id, "pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA",
+        "group_by": "DEPARTAMENTO",
+        "questions": [{"question_number": "1", "analysis_type": "quantitative"},
+                      {"question_number": "2", "analysis_type": "qualitative"}],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_new_schema_in_shared_meta_drops_this_workers_artifacts(client, upload):
+    file_id = upload(_frame([1, 2, 1, 2]))["file_id"]
+    _multi(client, file_id)
+    index = artifact_get(file_id, "filter_index")
+    assert index is not None
+
+    # Another worker's append changed a column's type
+    meta = cache_get(f"file:{file_id}")
+    changed = {**meta, "schema": 1, "content_hash": "0" * 64}
+    cache_set(f"file:{file_id}", changed, ttl=settings.CACHE_TTL_FILES)
+    _multi(client, file_id)
+    assert artifact_get(file_id, "filter_index") is not index
+    assert artifact_get(file_id, "schema") == 1
+
+
+def test_append_changing_a_dtype_matches_a_fresh_upload(client, upload):
+    file_id = upload(_frame([1, 2, 1, 2]))["file_id"]
+    _multi(client, file_id)
+
+    tail = _frame(["1", "2 ", "1", "x"])  # question numbers no longer all ints
+    body = tail.to_csv(index=False).encode("utf-8")
+    response = client.post(f"/api/v1/files/{file_id}/append",
+                           files={"file": ("tail.csv", io.BytesIO(body), "text/csv")})
+    assert response.status_code == 200, response.text
+    assert response.json()["schema"] == 1
+
+    fresh_id = upload(pd.concat([_frame(["1", "2", "1", "2"]), tail], ignore_index=True))["file_id"]
+    appended, fresh = _multi(client, file_id), _multi(client, fresh_id)
+    assert appended["questions"] == fresh["questions"]
+
+
+def test_artifacts_are_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "ARTIFACT_CACHE_MAX_MB", 3)
+    for n in range(4):  # 0.8 MB each
+        artifact_set(f"bytes-{n}", "array", np.ones(100_000))
+    assert artifact_get("bytes-0", "array") is None
+    assert all(artifact_get(f"bytes-{n}", "array") is not None for n in (1, 2, 3))
+    assert artifact_bytes() <= 3 * 2**20
+
+    # The file just stored stays, even alone over the limit
+    artifact_set("bytes-big", "array", np.ones(500_000))
+    assert artifact_get("bytes-big", "array") is not None
+    assert artifact_get("bytes-3", "array") is None
+
+
+def test_analysis_states_are_capped_per_file(client, upload):
+    n = MAX_ANALYSIS_STATES + 4
+    df = _frame(["1", "2"] * n).assign(GRUPO=[str(i // 2) for i in range(2 * n)])
+    file_id = upload(df)["file_id"]
+    for group in range(n):  # every filter combination is a request shape of its own
+        response = client.post("/api/v1/multi-analyze", json={
+            "file_id": file_id, "pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA",
+            "filters": {"GRUPO": [str(group)]},
+            "questions": [{"question_number": "1", "analysis_type": "quantitative"}],
+        })
+        assert response.status_code == 200, response.text
+    states = [name for name in _files[file_id] if name[0] == "analysis_state"]
+    assert len(states) == MAX_ANALYSIS_STATES
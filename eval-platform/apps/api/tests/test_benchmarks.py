@@ -0,0 +1,21 @@
+from benchmarks.compare import compare_results
+
+
+def _result(**medians):
+    return {"sizes": {"1000": {stage: {"median_s": s} for stage, s in medians.items()}}}
+
+
+def test_compare_statuses():
+    rows = compare_results(
+        _result(a=1.5, b=0.5, c=1.05, d=0.2),
+        _result(a=1.0, b=1.0, c=1.0, e=0.3),
+    )
+    assert {r["stage"]: r["status"] for r in rows} == {
+        "a": "regression", "b": "improvement", "c": "ok", "d": "new", "e": "missing",
+    }
+
+
+def test_compare_zero_baseline_has_no_ratio():
+    (row,) = compare_results(_result(fast=0.002), _result(fast=0.0))
+    assert row["ratio"] is None
+    assert row["status"] == "ok"
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from app.services import analyses
+from app.services.comparison import load_aggregates
+
+_DF = pd.DataFrame({
+    "PREGUNTA": ["1", "1", "1", "1"],
+    "DEPARTAMENTO": ["A", "A", "B", "B"],
+    "RESPUESTA": ["5", "4", "2", "1"],
+})
+
+
+def _multi(file_id, filters=None):
+    return {
+        "file_id": file_id, "pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA",
+        "questions": [{"question_number": "1", "analysis_type": "quantitative"}],
+        "filters": filters,
+    }
+
+
+def test_aggregates_come_from_unfiltered_computations_only(client, upload, monkeypatch):
+    file_id = upload(_DF)["file_id"]
+    saves = []
+    save = analyses.save_aggregates
+    monkeypatch.setattr(analyses, "save_aggregates", lambda *args: (saves.append(args[1]), save(*args)))
+
+    assert client.post("/api/v1/multi-analyze", json=_multi(file_id)).status_code == 200
+    # Served from the stored result: nothing to save again
+    assert client.post("/api/v1/multi-analyze", json=_multi(file_id)).status_code == 200
+    # A filtered view doesn't replace the whole file's aggregates
+    assert client.post("/api/v1/multi-analyze", json=_multi(file_id, {"DEPARTAMENTO": ["B"]})).status_code == 200
+
+    assert saves == ["multi-analyze"]
+    question = load_aggregates(file_id, "multi-analyze")["questions"]["1"]
+    assert (question["total"], question["mean"]) == (4, 3.0)
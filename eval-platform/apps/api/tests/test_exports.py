@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from app.core import memory
+from app.core.config import settings
+from app.services import exports
+
+_DF = pd.DataFrame({
+    "DEPARTAMENTO": ["A", "B"] * 15,
+    "RESPUESTA": ["muy buena clase", "deja demasiadas tareas", None] * 10,
+})
+
+
+def _export(client, file_id: str):
+    return client.post("/api/v1/export/responses", json={
+        "file_id": file_id, "response_column": "RESPUESTA", "format": "xlsx",
+    })
+
+
+def test_xlsx_sheet_is_built_while_admitted(client, upload, monkeypatch):
+    file_id = upload(_DF)["file_id"]
+    admitted = []
+    cell_rows = exports._cell_rows
+
+    def recorded(chunk):
+        admitted.append(len(memory._active))
+        return cell_rows(chunk)
+
+    monkeypatch.setattr(exports, "_cell_rows", recorded)
+
+    response = _export(client, file_id)
+    assert response.status_code == 200, response.text
+    assert admitted and all(admitted)
+    sheet = load_workbook(io.BytesIO(response.content), read_only=True)["Datos"]
+    assert len(list(sheet.iter_rows())) == 1 + 20  # header + the rows with a response
+
+
+def test_xlsx_rows_are_capped(client, upload, monkeypatch):
+    file_id = upload(_DF)["file_id"]
+    monkeypatch.setattr(settings, "EXPORT_XLSX_MAX_ROWS", 19)
+    assert _export(client, file_id).status_code == 400
+    monkeypatch.setattr(settings, "EXPORT_XLSX_MAX_ROWS", 20)
+    assert _export(client, file_id).status_code == 200
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.artifacts import artifact_get, artifact_set
+from app.core.config import settings
+from app.core.memory import rss
+
+_DF = pd.DataFrame({
+    "PREGUNTA": ["1", "2"] * 20,
+    "DEPARTAMENTO": ["A", "B", "B", "A"] * 10,
+    "RESPUESTA": ["4", "muy buena clase, excelente profesor"] * 20,
+})
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/api/v1/topics", {"response_column": "RESPUESTA"}),
+    ("/api/v1/export/responses", {"response_column": "RESPUESTA"}),
+    ("/api/v1/rollups/query", {"pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA"}),
+])
+def test_tokenizing_routes_are_admitted_by_memory(client, upload, monkeypatch, path, body):
+    file_id = upload(_DF)["file_id"]
+    # Over budget even with every cached artifact released
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", 1)
+    response = client.post(path, json={"file_id": file_id, **body})
+    assert response.status_code == 503, response.text
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", 0)
+    assert client.post(path, json={"file_id": file_id, **body}).status_code == 200
+
+
+def test_cached_artifacts_are_released_for_new_analyses(client, upload, monkeypatch):
+    monkeypatch.setattr(settings, "ARTIFACT_CACHE_MAX_MB", 0)
+    file_id = upload(_DF)["file_id"]
+    # Other files' warm artifacts, 100 MB each, fill the budget
+    for filler in ("filler-1", "filler-2"):
+        artifact_set(filler, "array", np.ones(100 * 2**20 // 8))
+    monkeypatch.setattr(settings, "MEMORY_BUDGET_MB", rss() // 2**20 - 100)
+
+    response = client.post("/api/v1/topics", json={"file_id": file_id, "response_column": "RESPUESTA"})
+    assert response.status_code == 200, response.text
+    assert artifact_get("filler-1", "array") is None
+    assert artifact_get("filler-2", "array") is None
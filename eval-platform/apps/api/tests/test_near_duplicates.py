@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from app.services.near_duplicates import NearDuplicates, signatures
+
+
+def test_empty_text_last_has_a_signature():
+    # "" used to read past the end of the shingle buffer (IndexError)
+    sigs = signatures(["excelente profesor", ""])
+    assert sigs.shape == (2, 64)
+
+
+def test_empty_text_signature_does_not_depend_on_neighbours():
+    assert (signatures(["", "abc"])[0] == signatures(["xyz", ""])[1]).all()
+    assert (signatures(["", "abc"])[1] == signatures(["abc"])[0]).all()
+
+
+def test_responses_cleaning_to_empty_are_one_cluster():
+    series = pd.Series(["excelente profesor", "excelente profesora", "-", "?"])
+    dups = NearDuplicates(series, 0.5)
+    representatives, weights = dups.collapse(np.arange(len(series)))
+    assert sorted(weights.tolist()) == [2, 2]
+    assert len(representatives) == 2
+
+
+def test_analyze_collapse_with_symbol_last_response(client, upload):
+    df = pd.DataFrame({
+        "DEPARTAMENTO": ["A", "A", "B", "B"],
+        "RESPUESTA": ["excelente profesor", "excelente profesora", "muy buena clase", "-"],
+    })
+    file_id = upload(df)["file_id"]
+    response = client.post("/api/v1/analyze", json={
+        "file_id": file_id, "response_column": "RESPUESTA", "collapse_near_duplicates": True,
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["general"]["summary"]["total_responses"] == 4
@@ -0,0 +1,46 @@
+import time
+
+import pandas as pd
+
+from app.services.text_analyzer import extract_known_names
+
+# Every name part of each evaluee is mentioned equally often: top_names is
+# all ties, so its order is the known names' order
+_DF = pd.DataFrame({
+    "EVALUADO": ["Ana López Ruiz"] * 3 + ["Beto Díaz Soto"] * 3,
+    "PREGUNTA": ["1"] * 6,
+    "RESPUESTA": [
+        "Ana explica bien, López y Ruiz también",
+        "Ruiz, López y Ana son puntuales",
+        "Gracias Ana López Ruiz",
+        "Soto y Díaz, con Beto, excelentes",
+        "Beto Díaz Soto explica muy bien",
+        "Díaz Beto Soto",
+    ],
+})
+_QUESTIONS = [{"question_number": "1", "analysis_type": "qualitative"}]
+
+
+def test_known_names_are_sorted():
+    assert extract_known_names(_DF) == ("Ana", "Beto", "Díaz", "López", "Ruiz", "Soto")
+
+
+def test_reports_match_filtered_multi_analyze(client, upload):
+    file_id = upload(_DF)["file_id"]
+    columns = {"pregunta_column": "PREGUNTA", "respuesta_column": "RESPUESTA", "questions": _QUESTIONS}
+    started = client.post("/api/v1/reports/evaluees", json={"file_id": file_id, **columns})
+    assert started.status_code == 202, started.text
+
+    deadline = time.monotonic() + 60
+    while (status := client.get(started.json()["status_url"]).json())["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+    assert status["status"] == "done", status
+
+    for evaluee in status["evaluees"]:
+        report = client.get(f"{started.json()['status_url']}/evaluees/{evaluee['index']}").json()
+        filtered = client.post("/api/v1/multi-analyze", json={
+            "file_id": file_id, **columns, "filters": {"EVALUADO": [evaluee["evaluee"]]},
+        })
+        assert filtered.status_code == 200, filtered.text
+        assert report["questions"] == filtered.json()["questions"]
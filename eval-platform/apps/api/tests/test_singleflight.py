@@ -0,0 +1,45 @@
+import asyncio
+
+from app.core import singleflight
+
+
+def _workers(monkeypatch, published: dict) -> list:
+    """Another worker's view of a shared cache holding *published*; returns the keys set."""
+    writes = []
+    monkeypatch.setattr(singleflight, "cache_shared", lambda: True)
+    monkeypatch.setattr(singleflight, "cache_lock", lambda key, ttl: "token")
+    monkeypatch.setattr(singleflight, "cache_unlock", lambda key, token: None)
+    monkeypatch.setattr(singleflight, "cache_get", lambda key: published.get(key))
+    monkeypatch.setattr(singleflight, "cache_set", lambda key, value, ttl: writes.append(key))
+    return writes
+
+
+def _flight(key: str, compute, stored=None):
+    return asyncio.run(singleflight.single_flight(key, compute, route="test", stored=stored))
+
+
+def test_lock_holder_takes_a_result_published_just_before(monkeypatch):
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        return "fresh"
+
+    # The previous holder published and unlocked before this caller looked
+    _workers(monkeypatch, {"flight:a": "published"})
+    assert _flight("a", compute) == "published"
+    assert _flight("b", compute, stored=lambda: "stored") == "stored"
+    assert computed == []
+
+
+def test_stored_results_are_not_published_again(monkeypatch):
+    stored = {}
+
+    async def compute():
+        stored["result"] = "fresh"
+        return "fresh"
+
+    writes = _workers(monkeypatch, {})
+    assert _flight("c", compute, stored=lambda: stored.get("result")) == "fresh"
+    assert _flight("d", compute) == "fresh"
+    assert writes == ["flight:d"]
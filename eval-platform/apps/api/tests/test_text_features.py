@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from app.core.artifacts import artifact_get
+from app.services.text_analyzer import analyze_by_group, analyze_responses, search_responses
+from app.services.text_features import TextFeatures
+
+_RESPONSES = [
+    "Excelente profesor, explica muy bien los temas",
+    "Ninguna",
+    None,
+    "Sería bueno que dejara menos tareas y más ejemplos",
+    "El profesor Martínez es muy puntual y respetuoso",
+    "Excelente profesor, explica muy bien los temas",
+    "ok",
+    "No me gustó la organización del curso, muy confusa",
+    "Recomiendo que suba las presentaciones a tiempo",
+    None,
+    "Muy buena clase, aprendí mucho sobre el tema",
+    "Ninguna",
+    "Las tareas son excesivas y la evaluación es injusta",
+    "Martínez explica con paciencia, excelente",
+]
+_GROUPS = ["A", "B", "A", "B", "A", "A", "B", "B", "A", "B", "A", "B", "A", "B"]
+_KNOWN = {"Martínez", "Pedro"}
+
+
+def _series() -> pd.Series:
+    return pd.Series(_RESPONSES, dtype=object)
+
+
+def _rows(series: pd.Series, every: int = 1) -> np.ndarray:
+    return np.flatnonzero(series.notna().to_numpy())[::every]
+
+
+def test_analyze_matches_per_row_analysis():
+    series = _series()
+    features = TextFeatures(series)
+    for rows in (_rows(series), _rows(series, 2)):
+        texts = series.iloc[rows].astype(str).tolist()
+        assert features.analyze(rows, series, _KNOWN) == analyze_responses(texts, _KNOWN)
+
+
+def test_analyze_by_group_matches_per_row_analysis():
+    series = _series()
+    features = TextFeatures(series)
+    rows = _rows(series)
+    groups = [_GROUPS[r] for r in rows]
+    texts = series.iloc[rows].astype(str).tolist()
+    assert features.analyze_by_group(rows, series, groups, _KNOWN) == analyze_by_group(texts, groups, _KNOWN)
+
+
+def test_extended_features_match_a_fresh_build():
+    series = _series()
+    features = TextFeatures(series.iloc[:6])
+    features.extend(series.iloc[6:])
+    rows = _rows(series)
+    assert features.analyze(rows, series, _KNOWN) == TextFeatures(series).analyze(rows, series, _KNOWN)
+
+
+def test_search_matches_scan():
+    series = _series()
+    rows = _rows(series)
+    texts = series.iloc[rows].astype(str).tolist()
+    for query, limit in (("profesor", 50), ("tareas", 1), ("nada", 50)):
+        assert TextFeatures(series).search(rows, series, query, limit) == search_responses(texts, query, limit)
+
+
+def test_cold_drilldown_scans_without_tokenizing(client, upload):
+    df = pd.DataFrame({"DEPARTAMENTO": _GROUPS, "RESPUESTA": _RESPONSES})
+    file_id = upload(df)["file_id"]
+    body = {"file_id": file_id, "response_column": "RESPUESTA", "query": "excelente", "department": "A"}
+
+    cold = client.post("/api/v1/drilldown", json=body)
+    assert cold.status_code == 200, cold.text
+    assert artifact_get(file_id, ("text_features", "RESPUESTA")) is None
+
+    assert client.post("/api/v1/analyze", json={"file_id": file_id, "response_column": "RESPUESTA"}).status_code == 200
+    assert artifact_get(file_id, ("text_features", "RESPUESTA")) is not None
+    warm = client.post("/api/v1/drilldown", json=body)
+    assert warm.json() == cold.json()
+    assert cold.json()["total_matches"] == 2
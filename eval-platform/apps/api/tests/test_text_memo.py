@@ -0,0 +1,58 @@
+from app.core.config import settings
+from app.services.text_analyzer import (
+    GroupedTextAccumulator,
+    analyze_responses,
+    analyze_texts,
+    classify_sentiment,
+    clear_text_memo,
+    extract_names,
+    is_suggestion,
+    names_in_texts,
+    tokenize,
+)
+
+_TEXTS = [
+    "Excelente profesor, explica muy bien",
+    "Ninguna",
+    "Excelente profesor, explica muy bien",
+    "Sería bueno que dejara menos tareas",
+    "La maestra Ana López es muy paciente",
+    "ok",
+    "Pésima organización del curso",
+    "Ninguna",
+]
+_GROUPS = ["A", "B", "A", "B", "A", "B", "A", "B"]
+
+
+def _unmemoized(monkeypatch, fn):
+    """fn() with the memo empty and unable to keep anything."""
+    clear_text_memo()
+    with monkeypatch.context() as m:
+        m.setattr(settings, "TEXT_MEMO_SIZE", 0)
+        return fn()
+
+
+def test_memoized_analyses_match_direct_calls():
+    clear_text_memo()
+    direct = [(tuple(tokenize(t)), classify_sentiment(t), is_suggestion(t)) for t in _TEXTS]
+    assert analyze_texts(_TEXTS) == direct  # filling the memo
+    assert analyze_texts(_TEXTS) == direct  # from the memo
+
+
+def test_name_matches_follow_each_name_sets_order():
+    known = {"Ana", "López", "Martínez"}
+    reordered = set(sorted(known, reverse=True))
+    for names in (known, reordered, None):
+        assert names_in_texts(_TEXTS, names) == [tuple(extract_names(t, names)) for t in _TEXTS]
+
+
+def test_memoized_results_match_unmemoized(monkeypatch):
+    known = {"Ana", "López"}
+
+    def run():
+        grouped = GroupedTextAccumulator(known).add(_TEXTS, _GROUPS).result()
+        return analyze_responses(_TEXTS, known), grouped
+
+    cold = _unmemoized(monkeypatch, run)
+    run()  # fills the memo
+    assert run() == cold